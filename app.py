@@ -1,14 +1,27 @@
+import time
+
+_inicio_importacao = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
-from config.database import init_db
 from routes.auth_routes import auth_bp
 from routes.user_routes import user_bp
 from routes.entrada_routes import entrada_bp
 from routes.saida_routes import saida_bp
+from routes.lote_routes import lote_bp
+from routes.importacao_routes import importacao_bp
+from routes.exportacao_routes import exportacao_bp
 from routes.analise_routes import analise_bp
+from routes.dashboard_routes import dashboard_bp
 from routes.investimento_routes import investimento_bp
+from routes.carteira_routes import carteira_bp
 from routes.smtp_routes import smtp_bp
 from routes.recuperacao_senha_routes import recuperacao_bp
+from routes.metricas_routes import metricas_bp
+from routes.saude_routes import saude_bp
+from controllers.investimento_controller import iniciar_prefetch
+from config.inicializacao import registrar_inicializacao
+from config.database import init_db
 from dotenv import load_dotenv
 import os
 
@@ -20,23 +33,30 @@ CORS(
     resources={r"/api/*": {"origins": "*"}},
     supports_credentials=True,
     allow_headers="*",
+    expose_headers=["X-Proximo-Cursor"],
 )
 
 # Configurações
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 
-# Inicializar banco de dados
-init_db()
+# O banco é inicializado no primeiro uso (config/database.py), não na importação
 
 # Registrar blueprints (rotas)
 app.register_blueprint(auth_bp, url_prefix="/api")
 app.register_blueprint(user_bp, url_prefix="/api")
 app.register_blueprint(entrada_bp, url_prefix="/api")
 app.register_blueprint(saida_bp, url_prefix="/api")
+app.register_blueprint(lote_bp, url_prefix="/api")
+app.register_blueprint(importacao_bp, url_prefix="/api")
+app.register_blueprint(exportacao_bp, url_prefix="/api")
 app.register_blueprint(analise_bp, url_prefix="/api")
+app.register_blueprint(dashboard_bp, url_prefix="/api")
 app.register_blueprint(investimento_bp, url_prefix="/api")
+app.register_blueprint(carteira_bp, url_prefix="/api")
 app.register_blueprint(recuperacao_bp, url_prefix="/api")
 app.register_blueprint(smtp_bp, url_prefix="/api")
+app.register_blueprint(metricas_bp, url_prefix="/api")
+app.register_blueprint(saude_bp, url_prefix="/api")
 
 
 @app.route("/", methods=["GET"])
@@ -54,6 +74,8 @@ def home():
                 "PUT /api/mudar-senha",
             ],
             "usuario": ["GET /api/usuario", "POST /api/questionario"],
+            "saude": ["GET /api/saude", "GET /api/pronto"],
+            "dashboard": ["GET /api/dashboard"],
             "entradas": [
                 "POST /api/entrada",
                 "GET /api/entradas",
@@ -66,16 +88,51 @@ def home():
                 "PUT /api/saida/<id>",
                 "DELETE /api/saida/<id>",
             ],
+            "lote": ["POST /api/lote"],
+            "importacao": ["POST /api/importar"],
+            "exportacao": ["GET /api/exportar"],
             "analises": [
                 "GET /api/balanco",
+                "GET /api/balanco/serie",
+                "GET /api/previsao",
                 "GET /api/proximas-saidas",
                 "GET /api/categorias-gastos",
             ],
-            "investimentos": ["GET /api/investimentos"],
+            "investimentos": ["GET /api/investimentos", "GET /api/investimentos/visao-geral"],
+            "carteira": [
+                "GET /api/carteira",
+                "POST /api/carteira/lote",
+                "DELETE /api/carteira/<ticker>/lote/<id>",
+                "DELETE /api/carteira/<ticker>",
+                "GET /api/carteira/avaliacao",
+            ],
         },
     }, 200
 
 
+# Pré-carga de cotações em segundo plano. Desligada por padrão na Vercel,
+# onde o processo não roda entre requisições.
+_prefetch_pendente = os.getenv("PREFETCH_MERCADO", "false" if os.getenv("VERCEL") else "true").lower() in ("1", "true", "yes", "on")
+
+
+@app.before_request
+def _iniciar_prefetch():
+    # Só na primeira requisição: importar o app não abre conexões nem chama
+    # APIs externas, e com `gunicorn --preload` a thread nasce no worker, não no pai
+    global _prefetch_pendente
+    if _prefetch_pendente:
+        _prefetch_pendente = False
+        iniciar_prefetch()
+
+registrar_inicializacao((time.perf_counter() - _inicio_importacao) * 1000)
+
+
 if __name__ == "__main__":
+    # Conecta e aplica as migrações pendentes (DB_AUTO_MIGRATE) antes de aceitar
+    # requisições; sem banco a API sobe assim mesmo e /api/pronto responde 503
+    try:
+        init_db()
+    except Exception:
+        pass
     # Evita erro WinError 10038 no Windows ao usar reloader
     app.run(debug=True, host="0.0.0.0", port=5000, use_reloader=False)
@@ -1,6 +1,10 @@
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from importlib.util import find_spec
+from config.monitor_pool import criar_monitor
 import os
+import threading
+import time
 
 load_dotenv()
 
@@ -8,47 +12,205 @@ load_dotenv()
 # Configurações do MongoDB
 MONGODB_URL = os.getenv('MONGODB_URL')
 DATABASE_NAME = os.getenv('DATABASE_NAME')
+# Timeout do ping da verificação de prontidão (ms)
+READINESS_TIMEOUT_MS = int(os.getenv('DB_READINESS_TIMEOUT_MS', '2000'))
 
-# Variáveis globais para o banco
+# Bibliotecas exigidas por cada algoritmo de compressão (zlib é da stdlib)
+_BIBLIOTECAS_COMPRESSAO = {'zstd': 'zstandard', 'snappy': 'snappy', 'zlib': None}
+
+
+def _inteiro(nome, padrao=None):
+    valor = os.getenv(nome)
+    if valor is None or valor.strip() == '':
+        return padrao
+    return int(valor)
+
+
+def _compressores():
+    """
+    MONGO_COMPRESSORS em ordem de preferência (ex.: "zstd,snappy,zlib").
+    Algoritmos cuja biblioteca não está instalada são ignorados.
+    """
+    disponiveis = []
+    for nome in (os.getenv('MONGO_COMPRESSORS') or '').split(','):
+        nome = nome.strip().lower()
+        if nome not in _BIBLIOTECAS_COMPRESSAO:
+            continue
+        biblioteca = _BIBLIOTECAS_COMPRESSAO[nome]
+        if biblioteca and find_spec(biblioteca) is None:
+            print(f"⚠️ Compressão {nome} ignorada: pacote {biblioteca} não instalado")
+            continue
+        disponiveis.append(nome)
+    return disponiveis
+
+
+def opcoes_cliente():
+    """
+    Opções do MongoClient a partir das variáveis de ambiente.
+    Variáveis ausentes mantêm o padrão do driver, exceto o timeout de seleção de
+    servidor (5 s em vez de 30 s, para a API falhar rápido sem banco).
+    """
+    opcoes = {
+        'maxPoolSize': _inteiro('MONGO_MAX_POOL_SIZE', 100),
+        'minPoolSize': _inteiro('MONGO_MIN_POOL_SIZE', 0),
+        'serverSelectionTimeoutMS': _inteiro('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        'connectTimeoutMS': _inteiro('MONGO_CONNECT_TIMEOUT_MS', 10000),
+        'socketTimeoutMS': _inteiro('MONGO_SOCKET_TIMEOUT_MS'),
+        'maxIdleTimeMS': _inteiro('MONGO_MAX_IDLE_TIME_MS'),
+        'waitQueueTimeoutMS': _inteiro('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        'appname': os.getenv('MONGO_APP_NAME', 'gefi-api'),
+    }
+    compressores = _compressores()
+    if compressores:
+        opcoes['compressors'] = ','.join(compressores)
+        if 'zlib' in compressores:
+            opcoes['zlibCompressionLevel'] = _inteiro('MONGO_ZLIB_LEVEL', -1)
+    return {chave: valor for chave, valor in opcoes.items() if valor is not None}
+
+# Variáveis globais para o banco (preenchidas no primeiro uso)
 client = None
 db = None
 usuarios_collection = None
 entradas_collection = None
 saidas_collection = None
+resumo_mensal_collection = None
+cache_collection = None
+cotacoes_collection = None
+posicoes_collection = None
 
-def init_db():
-    """Inicializa a conexão com o MongoDB"""
-    global client, db, usuarios_collection, entradas_collection, saidas_collection
-    
-    try:
-        client = MongoClient(MONGODB_URL)
-        db = client[DATABASE_NAME]
-        
-        # Collections
-        usuarios_collection = db['usuario']
-        entradas_collection = db['entrada']
-        saidas_collection = db['saida']
-        
-        # Testar conexão
-        client.server_info()
+_lock = threading.RLock()
+_inicializado = False
+
+
+def _migrar_por_padrao():
+    # Na Vercel não há subida de servidor: as migrações rodam pela linha de comando
+    padrao = 'false' if os.getenv('VERCEL') else 'true'
+    return os.getenv('DB_AUTO_MIGRATE', padrao).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _conectar(migrar, verificar):
+    """Cria o client e as collections; só faz I/O se `verificar` ou `migrar`"""
+    global client, db, usuarios_collection, entradas_collection, saidas_collection, resumo_mensal_collection
+    global cache_collection, cotacoes_collection, posicoes_collection
+
+    opcoes = opcoes_cliente()
+    monitor = criar_monitor(opcoes['maxPoolSize'])
+
+    # O MongoClient conecta em segundo plano: criá-lo não bloqueia
+    novo_client = MongoClient(MONGODB_URL, event_listeners=[monitor], **opcoes)
+    novo_db = novo_client[DATABASE_NAME]
+
+    if verificar:
+        novo_client.server_info()
         print("✅ Conectado ao MongoDB com sucesso!")
-        
+
+    client = novo_client
+    db = novo_db
+
+    # Collections
+    usuarios_collection = db['usuario']
+    entradas_collection = db['entrada']
+    saidas_collection = db['saida']
+    resumo_mensal_collection = db['resumo_mensal']
+    cache_collection = db['cache']
+    cotacoes_collection = db['cotacao_historico']
+    posicoes_collection = db['posicao']
+
+    # As migrações usam os getters; como o lock é reentrante, a mesma thread
+    # passa direto e as demais esperam a inicialização terminar
+    if migrar:
+        from config.migrations import aplicar_migracoes
+        try:
+            aplicar_migracoes(db)
+        except Exception as e:
+            # Não impede a API de subir; rode `python -m config.migrations` para detalhes
+            print(f"⚠️ Falha ao aplicar migrações: {e}")
+
+
+def init_db(migrar=None):
+    """
+    Inicializa a conexão com o MongoDB e testa o servidor (usado pela linha de
+    comando e na subida do servidor, antes de aceitar requisições).
+    Por padrão aplica as migrações pendentes (desative com DB_AUTO_MIGRATE=false).
+    """
+    global _inicializado
+
+    if migrar is None:
+        migrar = _migrar_por_padrao()
+
+    with _lock:
+        try:
+            _conectar(migrar, verificar=True)
+            _inicializado = True
+        except Exception as e:
+            print(f"❌ Erro ao conectar ao MongoDB: {e}")
+            raise
+
+
+def _garantir_conexao():
+    """
+    Inicializa o banco uma única vez por processo, na primeira consulta.
+    Só cria o client: migrações nunca rodam dentro de uma requisição.
+    """
+    global _inicializado
+
+    if _inicializado:
+        return
+    with _lock:
+        if db is None:
+            _conectar(migrar=False, verificar=False)
+            _inicializado = True
+
+
+def verificar_conexao():
+    """
+    Faz um ping no servidor para a verificação de prontidão.
+    Retorna (ok, latência em ms, erro ou None).
+    """
+    inicio = time.perf_counter()
+    try:
+        _garantir_conexao()
+        client.admin.command('ping', maxTimeMS=READINESS_TIMEOUT_MS)
+        return True, round((time.perf_counter() - inicio) * 1000, 1), None
     except Exception as e:
-        print(f"❌ Erro ao conectar ao MongoDB: {e}")
-        raise
+        return False, round((time.perf_counter() - inicio) * 1000, 1), str(e)
 
 def get_db():
     """Retorna a instância do banco de dados"""
+    _garantir_conexao()
     return db
 
 def get_usuarios_collection():
     """Retorna a collection de usuários"""
+    _garantir_conexao()
     return usuarios_collection
 
 def get_entradas_collection():
     """Retorna a collection de entradas"""
+    _garantir_conexao()
     return entradas_collection
 
 def get_saidas_collection():
     """Retorna a collection de saídas"""
-    return saidas_collection
\ No newline at end of file
+    _garantir_conexao()
+    return saidas_collection
+
+def get_resumo_mensal_collection():
+    """Retorna a collection de resumos mensais"""
+    _garantir_conexao()
+    return resumo_mensal_collection
+
+def get_cache_collection():
+    """Retorna a collection do cache compartilhado (CACHE_BACKEND=mongodb)"""
+    _garantir_conexao()
+    return cache_collection
+
+def get_cotacoes_collection():
+    """Retorna a collection time-series do histórico de cotações"""
+    _garantir_conexao()
+    return cotacoes_collection
+
+def get_posicoes_collection():
+    """Retorna a collection de posições da carteira"""
+    _garantir_conexao()
+    return posicoes_collection
@@ -0,0 +1,96 @@
+"""
+Orçamento de tempo de inicialização da API.
+
+Em ambientes serverless (Vercel) cada cold start importa `app.py`, então a
+importação não pode abrir conexões nem carregar bibliotecas pesadas. O tempo
+medido fica em `GET /api/metricas` e pode ser verificado pela linha de comando
+(retorna 1 se estourar o orçamento, para uso em CI):
+
+    python -m config.inicializacao            # mede a importação de app.py
+    python -m config.inicializacao --vezes 5  # menor tempo entre 5 execuções
+"""
+import json
+import os
+import subprocess
+import sys
+
+from utils import metricas
+
+# Orçamento da importação de app.py (ms)
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '1500'))
+# Módulos que só devem ser carregados quando usados
+MODULOS_PESADOS = ('yfinance', 'pandas', 'numpy')
+
+_medicao = {}
+
+
+def registrar_inicializacao(duracao_ms):
+    """Guarda o tempo de importação do app e avisa se passou do orçamento"""
+    _medicao['importacao_ms'] = round(duracao_ms, 1)
+    if duracao_ms > STARTUP_BUDGET_MS:
+        print(f"⚠️ Importação do app levou {duracao_ms:.0f} ms (orçamento: {STARTUP_BUDGET_MS:.0f} ms)")
+
+
+metricas.registrar('inicializacao', lambda: {**_medicao, 'orcamento_ms': STARTUP_BUDGET_MS})
+
+
+# Executado em um processo novo para medir um cold start de verdade
+_SCRIPT_MEDICAO = """
+import json, sys, time
+inicio = time.perf_counter()
+import app
+duracao = (time.perf_counter() - inicio) * 1000
+import config.database as database
+print(json.dumps({
+    'ms': duracao,
+    'pesados': [m for m in %r if m in sys.modules],
+    'conectou': database.client is not None,
+}))
+"""
+
+
+def medir(vezes=3):
+    """
+    Importa app.py em `vezes` processos novos.
+    Retorna o menor tempo (ms), os módulos pesados carregados e se houve conexão ao banco.
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultados = []
+    for _ in range(vezes):
+        saida = subprocess.run(
+            [sys.executable, '-c', _SCRIPT_MEDICAO % (MODULOS_PESADOS,)],
+            cwd=raiz, capture_output=True, text=True, check=True,
+            # Sem pré-carga de cotações: a medição não deve chamar APIs externas
+            env={**os.environ, 'PREFETCH_MERCADO': 'false'},
+        )
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    melhor = min(resultados, key=lambda r: r['ms'])
+    return melhor['ms'], melhor['pesados'], melhor['conectou']
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    argv = sys.argv[1:] if argv is None else argv
+    vezes = int(argv[argv.index('--vezes') + 1]) if '--vezes' in argv else 3
+
+    duracao, pesados, conectou = medir(vezes)
+    falhas = 0
+
+    if duracao > STARTUP_BUDGET_MS:
+        falhas += 1
+        print(f"❌ Importação: {duracao:.0f} ms (orçamento: {STARTUP_BUDGET_MS:.0f} ms)")
+    else:
+        print(f"✅ Importação: {duracao:.0f} ms (orçamento: {STARTUP_BUDGET_MS:.0f} ms)")
+
+    if pesados:
+        falhas += 1
+        print(f"❌ Módulos pesados carregados na importação: {', '.join(pesados)}")
+    if conectou:
+        falhas += 1
+        print("❌ A importação abriu conexão com o MongoDB")
+
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
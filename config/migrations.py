@@ -0,0 +1,274 @@
+"""
+Migrações versionadas do MongoDB (índices e ajustes de schema).
+
+Cada migração é identificada por uma versão inteira crescente e só é aplicada
+uma vez: as versões já executadas ficam registradas na collection
+`_migracoes`. O runner é chamado por `init_db()` na subida do servidor
+(`python app.py`; desative com `DB_AUTO_MIGRATE=false`, que já é o padrão na
+Vercel), nunca no caminho de uma requisição, e pela linha de comando:
+
+    python -m config.migrations migrar     # aplica migrações pendentes
+    python -m config.migrations status     # lista aplicadas/pendentes
+    python -m config.migrations verificar  # explain() das consultas principais
+    python -m config.migrations reconstruir-resumo [usuario_id]  # recalcula resumo_mensal
+"""
+from datetime import datetime
+import os
+import sys
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+MIGRACOES_COLLECTION = '_migracoes'
+
+
+def _m001_indices_transacoes(db):
+    """Índices compostos (usuario_id, data) em entrada/saida e parcial de recorrentes"""
+    db['entrada'].create_index(
+        [('usuario_id', ASCENDING), ('data', DESCENDING)],
+        name='usuario_data'
+    )
+    db['saida'].create_index(
+        [('usuario_id', ASCENDING), ('data', DESCENDING)],
+        name='usuario_data'
+    )
+    db['saida'].create_index(
+        [('usuario_id', ASCENDING), ('data', ASCENDING)],
+        name='usuario_recorrentes_data',
+        partialFilterExpression={'eh_recorrente': True}
+    )
+
+
+def _m002_indices_unicos_usuario(db):
+    """Índices únicos de email e CPF em usuario"""
+    db['usuario'].create_index([('email', ASCENDING)], name='email_unico', unique=True)
+    db['usuario'].create_index([('cpf', ASCENDING)], name='cpf_unico', unique=True)
+
+
+def _m003_indices_paginacao(db):
+    """Substitui (usuario_id, data) por (usuario_id, data, _id) para o keyset da paginação"""
+    for nome in ('entrada', 'saida'):
+        db[nome].create_index(
+            [('usuario_id', ASCENDING), ('data', DESCENDING), ('_id', DESCENDING)],
+            name='usuario_data_id'
+        )
+        if 'usuario_data' in db[nome].index_information():
+            db[nome].drop_index('usuario_data')
+
+
+def _m004_resumo_mensal(db):
+    """
+    Índice único do resumo mensal. A carga inicial a partir das transações é um
+    passo separado (`reconstruir-resumo`): ela percorre todas as transações e não
+    deve rodar dentro da primeira requisição nem em vários processos ao mesmo tempo.
+    """
+    db['resumo_mensal'].create_index(
+        [('usuario_id', ASCENDING), ('ano', ASCENDING), ('mes', ASCENDING)],
+        name='usuario_ano_mes',
+        unique=True
+    )
+
+
+def _m005_indices_importacao(db):
+    """Índice único parcial do hash de importação (deduplicação de extratos)"""
+    for nome in ('entrada', 'saida'):
+        db[nome].create_index(
+            [('usuario_id', ASCENDING), ('hash_importacao', ASCENDING)],
+            name='usuario_hash_importacao',
+            unique=True,
+            partialFilterExpression={'hash_importacao': {'$exists': True}}
+        )
+
+
+def _m006_indice_ttl_cache(db):
+    """Índice TTL do cache compartilhado: o MongoDB remove os itens vencidos"""
+    db['cache'].create_index('expira_em', name='expira_em_ttl', expireAfterSeconds=0)
+
+
+
+def _m007_historico_cotacoes(db):
+    """
+    Collection time-series do histórico de cotações (MongoDB 5.0+): os pontos
+    são agrupados em buckets por ticker (metaField) e comprimidos pelo servidor.
+    HISTORICO_RETENCAO_DIAS, se definido, descarta os pontos mais antigos.
+    """
+    if 'cotacao_historico' not in db.list_collection_names():
+        opcoes = {}
+        retencao = os.getenv('HISTORICO_RETENCAO_DIAS')
+        if retencao:
+            opcoes['expireAfterSeconds'] = int(retencao) * 86400
+        db.create_collection(
+            'cotacao_historico',
+            timeseries={'timeField': 'data', 'metaField': 'ticker', 'granularity': 'minutes'},
+            **opcoes
+        )
+    db['cotacao_historico'].create_index(
+        [('ticker', ASCENDING), ('data', ASCENDING)], name='ticker_data'
+    )
+
+
+def _m008_indice_posicoes(db):
+    """Uma posição por (usuario_id, ticker) na carteira"""
+    db['posicao'].create_index(
+        [('usuario_id', ASCENDING), ('ticker', ASCENDING)],
+        name='usuario_ticker',
+        unique=True
+    )
+
+
+# (versão, nome, função) — sempre acrescente no final com versão maior
+MIGRACOES = [
+    (1, 'indices_transacoes', _m001_indices_transacoes),
+    (2, 'indices_unicos_usuario', _m002_indices_unicos_usuario),
+    (3, 'indices_paginacao', _m003_indices_paginacao),
+    (4, 'resumo_mensal', _m004_resumo_mensal),
+    (5, 'indices_importacao', _m005_indices_importacao),
+    (6, 'indice_ttl_cache', _m006_indice_ttl_cache),
+    (7, 'historico_cotacoes', _m007_historico_cotacoes),
+    (8, 'indice_posicoes', _m008_indice_posicoes),
+]
+
+
+# Consultas dos models que devem ser atendidas por índice: (nome, collection, filtro, ordenação)
+_AGORA = datetime.utcnow()
+CONSULTAS_VERIFICADAS = [
+    ('EntradaModel.listar_por_usuario', 'entrada',
+     {'usuario_id': ''}, [('data', DESCENDING)]),
+    ('EntradaModel.listar_paginado', 'entrada',
+     {'usuario_id': '', '$or': [{'data': {'$lt': _AGORA}}, {'data': _AGORA, '_id': {'$lt': ObjectId()}}]},
+     [('data', DESCENDING), ('_id', DESCENDING)]),
+    ('EntradaModel.buscar_por_periodo', 'entrada',
+     {'usuario_id': '', 'data': {'$gte': _AGORA, '$lt': _AGORA}}, None),
+    ('SaidaModel.listar_por_usuario', 'saida',
+     {'usuario_id': ''}, [('data', DESCENDING)]),
+    ('SaidaModel.listar_paginado', 'saida',
+     {'usuario_id': '', '$or': [{'data': {'$lt': _AGORA}}, {'data': _AGORA, '_id': {'$lt': ObjectId()}}]},
+     [('data', DESCENDING), ('_id', DESCENDING)]),
+    ('SaidaModel.buscar_por_periodo', 'saida',
+     {'usuario_id': '', 'data': {'$gte': _AGORA, '$lt': _AGORA}}, None),
+    ('SaidaModel.buscar_recorrentes_proximas', 'saida',
+     {'usuario_id': '', 'eh_recorrente': True, 'data': {'$gte': _AGORA, '$lt': _AGORA}},
+     [('data', ASCENDING)]),
+    ('UsuarioModel.buscar_por_email', 'usuario', {'email': ''}, None),
+    ('UsuarioModel.buscar_por_cpf', 'usuario', {'cpf': ''}, None),
+    ('ResumoMensalModel.buscar', 'resumo_mensal', {'usuario_id': '', 'ano': 0, 'mes': 0}, None),
+]
+
+
+def versoes_aplicadas(db):
+    """Retorna o conjunto de versões já registradas"""
+    return {doc['_id'] for doc in db[MIGRACOES_COLLECTION].find({}, {'_id': 1})}
+
+
+def aplicar_migracoes(db):
+    """
+    Aplica, em ordem, as migrações ainda não registradas.
+    Para na primeira falha (as seguintes podem depender dela).
+    Retorna a lista de versões aplicadas nesta execução.
+    """
+    aplicadas = versoes_aplicadas(db)
+    novas = []
+
+    for versao, nome, funcao in MIGRACOES:
+        if versao in aplicadas:
+            continue
+
+        funcao(db)
+        db[MIGRACOES_COLLECTION].update_one(
+            {'_id': versao},
+            {'$set': {'nome': nome, 'aplicada_em': datetime.utcnow()}},
+            upsert=True
+        )
+        novas.append(versao)
+        print(f"🗂️  Migração {versao:03d} ({nome}) aplicada")
+
+    return novas
+
+
+def _estagios(plano):
+    """Percorre a árvore do plano vencedor coletando (estágio, índice)"""
+    estagios = []
+    while plano:
+        estagios.append((plano.get('stage'), plano.get('indexName')))
+        if 'inputStage' in plano:
+            plano = plano['inputStage']
+        elif plano.get('inputStages'):
+            plano = plano['inputStages'][0]
+        else:
+            plano = None
+    return estagios
+
+
+def verificar_cobertura(db):
+    """
+    Executa explain() nas consultas principais e informa se cada uma usa índice.
+    Retorna lista de dicts: {consulta, collection, indice, coberta, estagios}.
+    """
+    relatorio = []
+    for nome, collection, filtro, ordenacao in CONSULTAS_VERIFICADAS:
+        cursor = db[collection].find(filtro)
+        if ordenacao:
+            cursor = cursor.sort(ordenacao)
+
+        plano = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        # Em servidores com o engine SBE o plano clássico fica em 'queryPlan'
+        plano = plano.get('queryPlan', plano)
+        estagios = _estagios(plano)
+        indices = [indice for estagio, indice in estagios if estagio == 'IXSCAN' and indice]
+
+        relatorio.append({
+            'consulta': nome,
+            'collection': collection,
+            'indice': indices[0] if indices else None,
+            'coberta': bool(indices) and 'COLLSCAN' not in [e for e, _ in estagios],
+            'estagios': [e for e, _ in estagios],
+        })
+    return relatorio
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando"""
+    from config.database import init_db, get_db
+
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv else 'migrar'
+
+    if comando not in ('migrar', 'status', 'verificar', 'reconstruir-resumo'):
+        print(f"Comando desconhecido: {comando}. Use migrar, status, verificar ou reconstruir-resumo.")
+        return 2
+
+    init_db(migrar=False)
+    db = get_db()
+
+    if comando == 'migrar':
+        novas = aplicar_migracoes(db)
+        if not novas:
+            print("✅ Nenhuma migração pendente")
+        return 0
+
+    if comando == 'status':
+        aplicadas = versoes_aplicadas(db)
+        for versao, nome, _ in MIGRACOES:
+            marca = '✅' if versao in aplicadas else '⏳'
+            print(f"{marca} {versao:03d} {nome}")
+        return 0
+
+    if comando == 'reconstruir-resumo':
+        from models.resumo_mensal_model import ResumoMensalModel
+        usuario_id = argv[1] if len(argv) > 1 else None
+        total = ResumoMensalModel.reconstruir(usuario_id)
+        print(f"✅ {total} resumo(s) mensal(is) reconstruído(s)")
+        return 0
+
+    falhas = 0
+    for item in verificar_cobertura(db):
+        if item['coberta']:
+            print(f"✅ {item['consulta']}: índice {item['indice']}")
+        else:
+            falhas += 1
+            print(f"❌ {item['consulta']}: {' -> '.join(item['estagios'])}")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Métricas do pool de conexões do MongoDB.
+
+Um ConnectionPoolListener conta checkouts, esperas e tempo de espera por
+conexão, para dimensionar workers/threads contra o tamanho do pool. Os
+contadores aparecem em `GET /api/metricas` como `mongodb_pool`.
+"""
+import threading
+import time
+
+from pymongo import monitoring
+
+from utils import metricas
+
+
+class MonitorPool(monitoring.ConnectionPoolListener):
+    """
+    O evento de checkout do driver não traz a duração, então o início de cada
+    checkout é guardado por thread (o checkout acontece na thread que pediu).
+    Uma espera é um checkout iniciado com todas as conexões do pool em uso.
+    """
+
+    def __init__(self, tamanho_maximo):
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._em_uso = {}  # endereço do servidor -> conexões emprestadas
+        self._contadores = {
+            'conexoes_abertas': 0,
+            'conexoes_criadas': 0,
+            'conexoes_fechadas': 0,
+            'checkouts': 0,
+            'checkouts_falhos': 0,
+            'falhas_timeout': 0,
+            'esperas': 0,
+            'espera_total_ms': 0.0,
+            'espera_maxima_ms': 0.0,
+            'em_uso_maximo': 0,
+            'pools_limpos': 0,
+        }
+
+    def _fim_espera(self):
+        inicio = getattr(self._local, 'inicio', None)
+        self._local.inicio = None
+        return (time.perf_counter() - inicio) * 1000 if inicio is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.inicio = time.perf_counter()
+        with self._lock:
+            if self.tamanho_maximo and self._em_uso.get(event.address, 0) >= self.tamanho_maximo:
+                self._contadores['esperas'] += 1
+
+    def connection_checked_out(self, event):
+        espera = self._fim_espera()
+        with self._lock:
+            c = self._contadores
+            c['checkouts'] += 1
+            c['espera_total_ms'] += espera
+            c['espera_maxima_ms'] = max(c['espera_maxima_ms'], espera)
+            self._em_uso[event.address] = self._em_uso.get(event.address, 0) + 1
+            c['em_uso_maximo'] = max(c['em_uso_maximo'], sum(self._em_uso.values()))
+
+    def connection_check_out_failed(self, event):
+        espera = self._fim_espera()
+        with self._lock:
+            c = self._contadores
+            c['checkouts_falhos'] += 1
+            c['espera_total_ms'] += espera
+            c['espera_maxima_ms'] = max(c['espera_maxima_ms'], espera)
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                c['falhas_timeout'] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._em_uso[event.address] = max(self._em_uso.get(event.address, 0) - 1, 0)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._contadores['conexoes_criadas'] += 1
+            self._contadores['conexoes_abertas'] += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._contadores['conexoes_fechadas'] += 1
+            self._contadores['conexoes_abertas'] = max(self._contadores['conexoes_abertas'] - 1, 0)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._contadores['pools_limpos'] += 1
+
+    # Eventos sem contador
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def resumo(self):
+        with self._lock:
+            c = dict(self._contadores)
+            em_uso = sum(self._em_uso.values())
+        tentativas = c['checkouts'] + c['checkouts_falhos']
+        return {
+            **c,
+            'espera_total_ms': round(c['espera_total_ms'], 1),
+            'espera_maxima_ms': round(c['espera_maxima_ms'], 1),
+            'espera_media_ms': round(c['espera_total_ms'] / tentativas, 3) if tentativas else 0.0,
+            'em_uso': em_uso,
+            'tamanho_maximo': self.tamanho_maximo,
+        }
+
+
+def criar_monitor(tamanho_maximo):
+    """Cria o listener e o registra nas métricas (substitui um anterior)"""
+    monitor = MonitorPool(tamanho_maximo)
+    metricas.registrar('mongodb_pool', monitor.resumo)
+    return monitor
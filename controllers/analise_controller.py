@@ -1,10 +1,88 @@
-from flask import request, jsonify
-from models.entrada_model import EntradaModel
+from flask import request, jsonify, g
 from models.saida_model import SaidaModel
-from datetime import datetime
+from models.resumo_mensal_model import ResumoMensalModel
+from models.analise_model import AnaliseModel
+from datetime import datetime, timedelta
+from utils.cache_usuario import CacheUsuario
+
+# granularidade da query -> unidade do $dateTrunc
+GRANULARIDADES = {'mes': 'month', 'semana': 'week', 'dia': 'day'}
+MAX_INTERVALOS_SERIE = 400
+
+# Previsões por usuário, invalidadas a cada escrita de entrada/saída (também
+# as feitas em outro worker, com CACHE_BACKEND=mongodb) e vencidas após
+# CACHE_USUARIO_TTL segundos
+_cache_previsao = CacheUsuario(depende_de=('entradas', 'saidas'))
+
+
+def _ler_ano_mes(valor, campo):
+    """Converte 'YYYY-MM' no primeiro dia do mês"""
+    try:
+        return datetime.strptime(valor, '%Y-%m')
+    except (TypeError, ValueError):
+        raise ValueError(f'Parâmetro "{campo}" deve estar no formato YYYY-MM')
+
+
+def _proximo_mes(data):
+    return datetime(data.year + 1, 1, 1) if data.month == 12 else datetime(data.year, data.month + 1, 1)
+
+
+def _deslocar_meses(data, meses):
+    """Primeiro dia do mês `meses` antes (negativo) ou depois de `data`"""
+    total = data.year * 12 + data.month - 1 + meses
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def _intervalos(inicio, fim, granularidade):
+    """Gera o início de cada intervalo entre inicio (inclusivo) e fim (exclusivo)"""
+    if granularidade == 'mes':
+        atual = inicio
+        while atual < fim:
+            yield atual
+            atual = _proximo_mes(atual)
+        return
+
+    passo = timedelta(days=7 if granularidade == 'semana' else 1)
+    # Semanas começam na segunda-feira, como no $dateTrunc
+    atual = inicio - timedelta(days=inicio.weekday()) if granularidade == 'semana' else inicio
+    while atual < fim:
+        yield atual
+        atual += passo
+
 
 class AnaliseController:
     
+    @staticmethod
+    def formatar_balanco(mes, ano, resumo):
+        """Monta a resposta de balanço a partir do resumo mensal (ou None)"""
+        resumo = resumo or {}
+        total_entradas = resumo.get('total_entradas', 0)
+        total_saidas = resumo.get('total_saidas', 0)
+        return {
+            'mes': mes,
+            'ano': ano,
+            'total_entradas': total_entradas,
+            'total_saidas': total_saidas,
+            'balanco': total_entradas - total_saidas,
+            'quantidade_entradas': resumo.get('quantidade_entradas', 0),
+            'quantidade_saidas': resumo.get('quantidade_saidas', 0)
+        }
+    
+    @staticmethod
+    def formatar_ocorrencias(ocorrencias):
+        """Formata a lista de (data, saida) das saídas recorrentes"""
+        return [
+            {
+                'id': str(saida['_id']),
+                'descricao': saida['descricao'],
+                'valor': saida['valor'],
+                'categoria': saida['categoria'],
+                'data': data.isoformat(),
+                'frequencia': saida.get('frequencia', 'mensal')
+            }
+            for data, saida in ocorrencias
+        ]
+    
     @staticmethod
     def calcular_balanco(usuario_id):
         """Calcula o balanço financeiro do usuário"""
@@ -13,54 +91,131 @@ class AnaliseController:
             mes = request.args.get('mes', datetime.utcnow().month, type=int)
             ano = request.args.get('ano', datetime.utcnow().year, type=int)
             
-            # Define início e fim do mês
-            inicio_mes = datetime(ano, mes, 1)
-            if mes == 12:
-                fim_mes = datetime(ano + 1, 1, 1)
-            else:
-                fim_mes = datetime(ano, mes + 1, 1)
+            if not 1 <= mes <= 12:
+                return jsonify({'erro': 'Mês deve estar entre 1 e 12'}), 400
+            if not 1 <= ano < 9999:
+                return jsonify({'erro': 'Ano inválido'}), 400
+            
+            # Totais e contagens vêm do resumo mensal materializado (somados das
+            # transações enquanto o resumo do usuário não foi carregado)
+            resumo = ResumoMensalModel.obter(g.usuario, ano, mes)
+            
+            return jsonify(AnaliseController.formatar_balanco(mes, ano, resumo)), 200
+            
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao calcular balanço: {str(e)}'}), 500
+    
+    @staticmethod
+    def serie_balanco(usuario_id):
+        """
+        Série de balanço em vários meses, calculada em uma única agregação.
+        Query: inicio=YYYY-MM, fim=YYYY-MM (inclusivo), granularidade=mes|semana|dia.
+        Retorna arrays paralelos: labels, entradas, saidas, saldo.
+        """
+        try:
+            hoje = datetime.utcnow()
+            granularidade = request.args.get('granularidade', 'mes')
+            if granularidade not in GRANULARIDADES:
+                return jsonify({'erro': 'Granularidade deve ser mes, semana ou dia'}), 400
+            
+            try:
+                inicio = _ler_ano_mes(request.args.get('inicio', f'{hoje.year}-01'), 'inicio')
+                fim = _proximo_mes(_ler_ano_mes(request.args.get('fim', hoje.strftime('%Y-%m')), 'fim'))
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+            
+            if fim <= inicio:
+                return jsonify({'erro': 'Parâmetro "fim" deve ser igual ou posterior a "inicio"'}), 400
             
-            # Buscar entradas e saídas do período
-            entradas = EntradaModel.buscar_por_periodo(usuario_id, inicio_mes, fim_mes)
-            saidas = SaidaModel.buscar_por_periodo(usuario_id, inicio_mes, fim_mes)
+            intervalos = list(_intervalos(inicio, fim, granularidade))
+            if len(intervalos) > MAX_INTERVALOS_SERIE:
+                return jsonify({'erro': f'Período muito longo: máximo de {MAX_INTERVALOS_SERIE} intervalos'}), 400
             
-            total_entradas = sum(e['valor'] for e in entradas)
-            total_saidas = sum(s['valor'] for s in saidas)
-            balanco = total_entradas - total_saidas
+            totais = AnaliseModel.serie_por_periodo(usuario_id, inicio, fim, GRANULARIDADES[granularidade])
+            
+            formato = '%Y-%m' if granularidade == 'mes' else '%Y-%m-%d'
+            labels, entradas, saidas, saldo = [], [], [], []
+            for intervalo in intervalos:
+                valores = totais.get(intervalo, {'entradas': 0, 'saidas': 0})
+                labels.append(intervalo.strftime(formato))
+                entradas.append(valores['entradas'])
+                saidas.append(valores['saidas'])
+                saldo.append(valores['entradas'] - valores['saidas'])
             
             return jsonify({
-                'mes': mes,
-                'ano': ano,
-                'total_entradas': total_entradas,
-                'total_saidas': total_saidas,
-                'balanco': balanco,
-                'quantidade_entradas': len(entradas),
-                'quantidade_saidas': len(saidas)
+                'granularidade': granularidade,
+                'labels': labels,
+                'entradas': entradas,
+                'saidas': saidas,
+                'saldo': saldo
             }), 200
             
         except Exception as e:
-            return jsonify({'erro': f'Erro ao calcular balanço: {str(e)}'}), 500
+            return jsonify({'erro': f'Erro ao calcular série de balanço: {str(e)}'}), 500
     
     @staticmethod
-    def proximas_saidas(usuario_id):
-        """Lista as próximas saídas recorrentes"""
+    def previsao(usuario_id):
+        """
+        Projeta o balanço dos próximos meses (query: meses, de 3 a 12; padrão 6).
+        Usa média e tendência por categoria dos últimos meses completos mais as
+        ocorrências das saídas recorrentes.
+        """
         try:
-            hoje = datetime.utcnow()
-            fim_mes = datetime(hoje.year, hoje.month + 1 if hoje.month < 12 else 1, 1)
+            meses = request.args.get('meses', 6, type=int)
+            if not 3 <= meses <= 12:
+                return jsonify({'erro': 'Parâmetro "meses" deve estar entre 3 e 12'}), 400
+            
+            mes_atual = _deslocar_meses(datetime.utcnow(), 0)
+            inicio_previsao = _deslocar_meses(mes_atual, 1)
             
-            saidas = SaidaModel.buscar_recorrentes_proximas(usuario_id, hoje, fim_mes)
+            usuario = g.usuario
             
-            saidas_formatadas = []
-            for saida in saidas:
-                saidas_formatadas.append({
-                    'id': str(saida['_id']),
-                    'descricao': saida['descricao'],
-                    'valor': saida['valor'],
-                    'categoria': saida['categoria'],
-                    'data': saida['data'].isoformat()
-                })
+            def calcular():
+                # numpy/pandas só são carregados quando a previsão é calculada
+                from utils import previsao
+                
+                # Histórico só de meses completos; o mês atual fica de fora
+                inicio_historico = _deslocar_meses(mes_atual, -previsao.JANELA_HISTORICO)
+                fim_historico = mes_atual
+                fim_previsao = _deslocar_meses(inicio_previsao, meses)
+                
+                historico = AnaliseModel.historico_mensal_por_categoria(usuario_id, inicio_historico, fim_historico)
+                recorrencias = SaidaModel.ocorrencias_no_intervalo(usuario_id, inicio_previsao, fim_previsao)
+                saldo_inicial = ResumoMensalModel.saldo(usuario)
+                return previsao.projetar(historico, recorrencias, inicio_previsao, meses, saldo_inicial)
             
-            return jsonify(saidas_formatadas), 200
+            resultado = _cache_previsao.obter(usuario_id, (meses, inicio_previsao), calcular)
+            return jsonify(resultado), 200
+            
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao calcular previsão: {str(e)}'}), 500
+    
+    @staticmethod
+    def proximas_saidas(usuario_id):
+        """
+        Lista as próximas ocorrências das saídas recorrentes.
+        Query: limite (padrão 5) ou inicio/fim (datas ISO) para todas as ocorrências da janela.
+        """
+        try:
+            inicio = request.args.get('inicio')
+            fim = request.args.get('fim')
+            
+            if inicio or fim:
+                if not (inicio and fim):
+                    return jsonify({'erro': 'Informe "inicio" e "fim" juntos'}), 400
+                try:
+                    data_inicio = datetime.fromisoformat(inicio.replace('Z', '')).replace(tzinfo=None)
+                    data_fim = datetime.fromisoformat(fim.replace('Z', '')).replace(tzinfo=None)
+                except ValueError:
+                    return jsonify({'erro': 'Datas devem estar no formato ISO (YYYY-MM-DD)'}), 400
+                if (data_fim - data_inicio).days > 366:
+                    return jsonify({'erro': 'Janela máxima de 366 dias'}), 400
+                ocorrencias = SaidaModel.ocorrencias_no_intervalo(usuario_id, data_inicio, data_fim)
+            else:
+                limite = min(max(request.args.get('limite', 5, type=int), 1), 100)
+                ocorrencias = SaidaModel.proximas_ocorrencias(usuario_id, limite, datetime.utcnow())
+            
+            return jsonify(AnaliseController.formatar_ocorrencias(ocorrencias)), 200
             
         except Exception as e:
             return jsonify({'erro': f'Erro ao buscar próximas saídas: {str(e)}'}), 500
@@ -72,21 +227,13 @@ class AnaliseController:
             mes = request.args.get('mes', datetime.utcnow().month, type=int)
             ano = request.args.get('ano', datetime.utcnow().year, type=int)
             
-            inicio_mes = datetime(ano, mes, 1)
-            if mes == 12:
-                fim_mes = datetime(ano + 1, 1, 1)
-            else:
-                fim_mes = datetime(ano, mes + 1, 1)
-            
-            resultados = SaidaModel.agrupar_por_categoria(usuario_id, inicio_mes, fim_mes)
+            if not 1 <= mes <= 12:
+                return jsonify({'erro': 'Mês deve estar entre 1 e 12'}), 400
+            if not 1 <= ano < 9999:
+                return jsonify({'erro': 'Ano inválido'}), 400
             
-            categorias = []
-            for r in resultados:
-                categorias.append({
-                    'categoria': r['_id'],
-                    'total': r['total'],
-                    'quantidade': r['quantidade']
-                })
+            resumo = ResumoMensalModel.obter(g.usuario, ano, mes)
+            categorias = ResumoMensalModel.categorias(resumo, 'saidas')
             
             return jsonify(categorias), 200
             
@@ -3,6 +3,7 @@ from models.usuario_model import UsuarioModel
 from utils.validators import validar_email, validar_cpf, validar_senha
 from utils.auth import gerar_token
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 
 class AuthController:
     
@@ -48,6 +49,9 @@ class AuthController:
                 'usuario_id': str(usuario_id)
             }), 201
             
+        except DuplicateKeyError:
+            # Cadastro concorrente barrado pelos índices únicos de email/cpf
+            return jsonify({'erro': 'Email ou CPF já cadastrado'}), 409
         except Exception as e:
             return jsonify({'erro': f'Erro ao cadastrar: {str(e)}'}), 500
     
@@ -122,7 +126,11 @@ class AuthController:
             if not validar_senha(senha_nova):
                 return jsonify({'erro': 'Nova senha deve ter no mínimo 6 caracteres'}), 400
             
+            # Sempre do banco: o documento em cache (g.usuario) pode ter a senha
+            # antiga se ela foi trocada por outro worker
             usuario = UsuarioModel.buscar_por_id(usuario_id)
+            if not usuario:
+                return jsonify({'erro': 'Usuário não encontrado'}), 404
             
             if not UsuarioModel.verificar_senha(senha_atual, usuario['senha']):
                 return jsonify({'erro': 'Senha atual incorreta'}), 401
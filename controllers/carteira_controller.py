@@ -0,0 +1,154 @@
+import re
+from datetime import datetime, timedelta
+from flask import request, jsonify
+from models.carteira_model import CarteiraModel
+from models.cotacao_model import CotacaoModel
+from controllers.investimento_controller import cotacoes_atuais, PERIODOS_HISTORICO
+from utils.cache_usuario import CacheUsuario
+from utils.validators import validar_valor, converter_data
+
+# Avaliação por usuário; descartada a cada escrita na carteira
+_cache_avaliacao = CacheUsuario(depende_de=('carteira',), max_chaves=1)
+
+_PADRAO_TICKER = re.compile(r'^[A-Z0-9]{4,12}$')
+
+
+def _avaliacao(usuario_id):
+    """
+    AvaliacaoCarteira do usuário (numpy/pandas só são carregados aqui).
+    A chave é a versão das posições no banco, então uma escrita feita por
+    outro worker também descarta a avaliação guardada neste.
+    """
+    from utils.carteira import AvaliacaoCarteira
+    return _cache_avaliacao.obter(
+        usuario_id, CarteiraModel.versao(usuario_id), lambda: AvaliacaoCarteira(CarteiraModel.listar(usuario_id))
+    )
+
+
+class CarteiraController:
+
+    @staticmethod
+    def listar(usuario_id):
+        """Lista as posições do usuário com preço médio e lotes"""
+        try:
+            posicoes = CarteiraModel.listar(usuario_id)
+            return jsonify([
+                {
+                    'ticker': posicao['ticker'],
+                    'quantidade': posicao['quantidade'],
+                    'preco_medio': round(posicao['custo_total'] / posicao['quantidade'], 2)
+                    if posicao['quantidade'] > 0 else None,
+                    'custo': round(posicao['custo_total'], 2),
+                    'lotes': [
+                        {
+                            'id': str(lote['id']),
+                            'data': lote['data'].isoformat(),
+                            'quantidade': lote['quantidade'],
+                            'preco': lote['preco'],
+                        }
+                        for lote in posicao.get('lotes', [])
+                    ],
+                }
+                for posicao in posicoes
+            ]), 200
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao listar carteira: {str(e)}'}), 500
+
+    @staticmethod
+    def adicionar_lote(usuario_id):
+        """Registra uma compra: ticker, quantidade, preco e data (opcional)"""
+        try:
+            dados = request.get_json() or {}
+            ticker = (dados.get('ticker') or '').strip().upper()
+            quantidade = dados.get('quantidade')
+            preco = dados.get('preco')
+
+            if not _PADRAO_TICKER.match(ticker):
+                return jsonify({'erro': 'Ticker inválido'}), 400
+            if not validar_valor(quantidade):
+                return jsonify({'erro': 'Quantidade deve ser maior que zero'}), 400
+            if not validar_valor(preco):
+                return jsonify({'erro': 'Preço deve ser maior que zero'}), 400
+
+            data = converter_data(dados.get('data', datetime.utcnow().isoformat()))
+            if data is None:
+                return jsonify({'erro': 'Data inválida'}), 400
+
+            lote_id = CarteiraModel.adicionar_lote(usuario_id, ticker, quantidade, preco, data)
+
+            return jsonify({
+                'mensagem': 'Lote adicionado com sucesso',
+                'id': str(lote_id)
+            }), 201
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao adicionar lote: {str(e)}'}), 500
+
+    @staticmethod
+    def remover_lote(usuario_id, ticker, lote_id):
+        """Remove um lote de compra da posição"""
+        try:
+            if not CarteiraModel.remover_lote(usuario_id, ticker.upper(), lote_id):
+                return jsonify({'erro': 'Lote não encontrado'}), 404
+
+            return jsonify({'mensagem': 'Lote removido com sucesso'}), 200
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao remover lote: {str(e)}'}), 500
+
+    @staticmethod
+    def deletar(usuario_id, ticker):
+        """Remove a posição inteira de um ticker"""
+        try:
+            if not CarteiraModel.deletar(usuario_id, ticker.upper()):
+                return jsonify({'erro': 'Posição não encontrada'}), 404
+
+            return jsonify({'mensagem': 'Posição removida com sucesso'}), 200
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao remover posição: {str(e)}'}), 500
+
+    @staticmethod
+    def avaliar(usuario_id):
+        """
+        Valor atual, lucro/prejuízo e alocação por posição e a série diária
+        (valor e retorno) no período (query: periodo, padrão 1M).
+        """
+        try:
+            periodo = request.args.get('periodo', '1M').strip().upper()
+            if periodo not in PERIODOS_HISTORICO:
+                return jsonify({'erro': f'Período inválido. Use: {", ".join(PERIODOS_HISTORICO)}'}), 400
+
+            avaliacao = _avaliacao(usuario_id)
+            cotacoes = cotacoes_atuais(avaliacao.tickers) if avaliacao.tickers else {}
+            inicio = datetime.utcnow() - timedelta(days=PERIODOS_HISTORICO[periodo])
+
+            with avaliacao.lock:
+                recalculadas = avaliacao.atualizar_precos({
+                    ticker: quote['preco'] for ticker, quote in cotacoes.items() if quote.get('preco') is not None
+                })
+                posicoes, totais = avaliacao.posicoes()
+                serie = avaliacao.serie(
+                    inicio,
+                    # Até agora: o motor descarta os pontos de hoje, que vêm das cotações atuais
+                    lambda de, _: CotacaoModel.fechamentos_diarios(avaliacao.tickers, de.to_pydatetime(), datetime.utcnow())
+                ) if avaliacao.tickers else []
+
+            for posicao in posicoes:
+                cotacao = cotacoes.get(posicao['ticker'], {})
+                posicao['variacao_dia_percentual'] = cotacao.get('variacao_percentual')
+                if cotacao.get('stale'):
+                    posicao['stale'] = True
+                    posicao['idade_s'] = cotacao.get('idade_s')
+
+            return jsonify({
+                'posicoes': posicoes,
+                'totais': totais,
+                'periodo': periodo,
+                'serie': serie,
+                'posicoes_recalculadas': recalculadas,
+            }), 200
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao avaliar carteira: {str(e)}'}), 500
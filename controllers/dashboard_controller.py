@@ -0,0 +1,52 @@
+from flask import request, jsonify, g
+from concurrent.futures import ThreadPoolExecutor
+from models.usuario_model import UsuarioModel
+from models.saida_model import SaidaModel
+from models.resumo_mensal_model import ResumoMensalModel
+from controllers.analise_controller import AnaliseController
+from controllers.user_controller import UserController
+from datetime import datetime
+
+# Consultas independentes do dashboard rodam em paralelo (o MongoClient é thread-safe)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dashboard')
+
+class DashboardController:
+    
+    @staticmethod
+    def carregar(usuario_id):
+        """
+        Tudo que a tela inicial precisa em uma chamada: usuário (de g), balanço e
+        gastos por categoria do mês (um único documento de resumo, ou a soma das
+        transações enquanto o resumo do usuário não foi carregado) e próximas
+        saídas recorrentes (regras em cache por usuário).
+        Query: mes, ano, limite (próximas saídas, padrão 5).
+        """
+        try:
+            hoje = datetime.utcnow()
+            mes = request.args.get('mes', hoje.month, type=int)
+            ano = request.args.get('ano', hoje.year, type=int)
+            limite = min(max(request.args.get('limite', 5, type=int), 1), 100)
+            
+            if not 1 <= mes <= 12:
+                return jsonify({'erro': 'Mês deve estar entre 1 e 12'}), 400
+            if not 1 <= ano < 9999:
+                return jsonify({'erro': 'Ano inválido'}), 400
+            
+            # Já carregado por token_obrigatorio
+            usuario = g.get('usuario') or UsuarioModel.buscar_por_id(usuario_id)
+            if not usuario:
+                return jsonify({'erro': 'Usuário não encontrado'}), 404
+            
+            futuro_resumo = _executor.submit(ResumoMensalModel.obter, usuario, ano, mes)
+            futuro_proximas = _executor.submit(SaidaModel.proximas_ocorrencias, usuario_id, limite, hoje)
+            resumo = futuro_resumo.result()
+            
+            return jsonify({
+                'usuario': UserController.formatar(usuario),
+                'balanco': AnaliseController.formatar_balanco(mes, ano, resumo),
+                'categorias_gastos': ResumoMensalModel.categorias(resumo, 'saidas'),
+                'proximas_saidas': AnaliseController.formatar_ocorrencias(futuro_proximas.result())
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao carregar dashboard: {str(e)}'}), 500
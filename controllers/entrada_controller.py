@@ -1,30 +1,72 @@
 from flask import request, jsonify
 from models.entrada_model import EntradaModel
 from datetime import datetime
+from utils.paginacao import parametros_listagem
+from utils.validators import validar_valor, converter_data
 
 class EntradaController:
     
+    @staticmethod
+    def validar_criacao(dados):
+        """
+        Valida o corpo de criação de uma entrada.
+        Retorna (campos para EntradaModel.criar, None) ou (None, mensagem de erro).
+        """
+        descricao = (dados.get('descricao') or '').strip()
+        valor = dados.get('valor', 0)
+        categoria = (dados.get('categoria') or 'Outros').strip()
+        data = dados.get('data', datetime.utcnow().isoformat())
+        
+        if not descricao:
+            return None, 'Descrição é obrigatória'
+        
+        if not validar_valor(valor):
+            return None, 'Valor deve ser maior que zero'
+        
+        data_obj = converter_data(data)
+        if data_obj is None:
+            return None, 'Data inválida'
+        
+        return {
+            'descricao': descricao,
+            'valor': valor,
+            'categoria': categoria,
+            'data': data_obj
+        }, None
+    
+    @staticmethod
+    def validar_atualizacao(dados, entrada=None):
+        """
+        Valida o corpo de atualização de uma entrada.
+        Retorna (campos para $set, None) ou (None, mensagem de erro).
+        """
+        atualizacao = {}
+        if 'descricao' in dados:
+            atualizacao['descricao'] = (dados['descricao'] or '').strip()
+        if 'valor' in dados:
+            if not validar_valor(dados['valor']):
+                return None, 'Valor deve ser maior que zero'
+            atualizacao['valor'] = float(dados['valor'])
+        if 'categoria' in dados:
+            atualizacao['categoria'] = (dados['categoria'] or 'Outros').strip()
+        if 'data' in dados:
+            atualizacao['data'] = converter_data(dados['data'])
+            if atualizacao['data'] is None:
+                return None, 'Data inválida'
+        
+        return atualizacao, None
+    
     @staticmethod
     def criar(usuario_id):
         """Cria uma nova entrada financeira"""
         try:
             dados = request.get_json()
             
-            descricao = dados.get('descricao', '').strip()
-            valor = dados.get('valor', 0)
-            categoria = dados.get('categoria', 'Outros').strip()
-            data = dados.get('data', datetime.utcnow().isoformat())
+            campos, erro = EntradaController.validar_criacao(dados)
+            if erro:
+                return jsonify({'erro': erro}), 400
             
-            if not descricao:
-                return jsonify({'erro': 'Descrição é obrigatória'}), 400
-            
-            if valor <= 0:
-                return jsonify({'erro': 'Valor deve ser maior que zero'}), 400
-            
-            # Converter data
-            data_obj = datetime.fromisoformat(data.replace('Z', '+00:00'))
-            
-            entrada_id = EntradaModel.criar(usuario_id, descricao, valor, categoria, data_obj)
+            entrada_id = EntradaModel.criar(usuario_id, **campos)
             
             return jsonify({
                 'mensagem': 'Entrada criada com sucesso',
@@ -36,9 +78,18 @@ class EntradaController:
     
     @staticmethod
     def listar(usuario_id):
-        """Lista todas as entradas do usuário"""
+        """
+        Lista as entradas do usuário, paginadas por cursor.
+        Query: limite, cursor, inicio, fim, categoria.
+        O cursor da próxima página vai no header X-Proximo-Cursor.
+        """
         try:
-            entradas = EntradaModel.listar_por_usuario(usuario_id)
+            try:
+                parametros = parametros_listagem(request.args)
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+            
+            entradas, proximo_cursor = EntradaModel.listar_paginado(usuario_id, **parametros)
             
             entradas_formatadas = []
             for entrada in entradas:
@@ -50,7 +101,10 @@ class EntradaController:
                     'data': entrada['data'].isoformat()
                 })
             
-            return jsonify(entradas_formatadas), 200
+            resposta = jsonify(entradas_formatadas)
+            if proximo_cursor:
+                resposta.headers['X-Proximo-Cursor'] = proximo_cursor
+            return resposta, 200
             
         except Exception as e:
             return jsonify({'erro': f'Erro ao listar entradas: {str(e)}'}), 500
@@ -66,17 +120,9 @@ class EntradaController:
             if not entrada:
                 return jsonify({'erro': 'Entrada não encontrada'}), 404
             
-            atualizacao = {}
-            if 'descricao' in dados:
-                atualizacao['descricao'] = dados['descricao'].strip()
-            if 'valor' in dados:
-                if dados['valor'] <= 0:
-                    return jsonify({'erro': 'Valor deve ser maior que zero'}), 400
-                atualizacao['valor'] = float(dados['valor'])
-            if 'categoria' in dados:
-                atualizacao['categoria'] = dados['categoria'].strip()
-            if 'data' in dados:
-                atualizacao['data'] = datetime.fromisoformat(dados['data'].replace('Z', '+00:00'))
+            atualizacao, erro = EntradaController.validar_atualizacao(dados, entrada)
+            if erro:
+                return jsonify({'erro': erro}), 400
             
             EntradaModel.atualizar(entrada_id, usuario_id, atualizacao)
             
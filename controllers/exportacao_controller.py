@@ -0,0 +1,104 @@
+from flask import request, jsonify, Response, stream_with_context
+from datetime import datetime
+import csv
+import io
+import json
+from models.exportacao_model import ExportacaoModel
+from utils.paginacao import parametros_periodo
+
+COLUNAS = ('tipo', 'id', 'data', 'descricao', 'valor', 'categoria', 'eh_recorrente', 'frequencia')
+# Caracteres acumulados antes de cada envio
+TAMANHO_BLOCO = 64 * 1024
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+class ExportacaoController:
+
+    @staticmethod
+    def _linha(tipo, documento):
+        data = documento.get('data')
+        return {
+            'tipo': tipo,
+            'id': str(documento['_id']),
+            'data': data.isoformat() if data else None,
+            'descricao': documento.get('descricao'),
+            'valor': documento.get('valor'),
+            'categoria': documento.get('categoria'),
+            'eh_recorrente': documento.get('eh_recorrente', False),
+            'frequencia': documento.get('frequencia'),
+        }
+
+    @staticmethod
+    def _agrupar(partes):
+        """Junta as linhas em blocos de ~TAMANHO_BLOCO para não enviar uma escrita por linha"""
+        bloco, tamanho = [], 0
+        for parte in partes:
+            bloco.append(parte)
+            tamanho += len(parte)
+            if tamanho >= TAMANHO_BLOCO:
+                yield ''.join(bloco)
+                bloco, tamanho = [], 0
+        if bloco:
+            yield ''.join(bloco)
+
+    @staticmethod
+    def _gerar_ndjson(transacoes):
+        for tipo, documento in transacoes:
+            yield json.dumps(ExportacaoController._linha(tipo, documento), ensure_ascii=False) + '\n'
+
+    @staticmethod
+    def _gerar_csv(transacoes):
+        # Um único buffer reaproveitado: cada linha é escrita, enviada e descartada
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=COLUNAS, delimiter=';')
+
+        def esvaziar():
+            texto = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return texto
+
+        # BOM para o Excel abrir os acentos corretamente
+        escritor.writeheader()
+        yield '\ufeff' + esvaziar()
+        for tipo, documento in transacoes:
+            escritor.writerow(ExportacaoController._linha(tipo, documento))
+            yield esvaziar()
+
+    @staticmethod
+    def exportar(usuario_id):
+        """
+        Exporta o histórico de entradas e saídas em ordem cronológica.
+        Query: formato=csv|ndjson (padrão csv), inicio, fim e categoria opcionais.
+        A resposta é gerada enquanto o cursor do MongoDB é lido, então o uso de
+        memória não depende da quantidade de transações.
+        """
+        try:
+            formato = (request.args.get('formato') or 'csv').lower()
+            if formato not in FORMATOS:
+                return jsonify({'erro': 'Formato deve ser csv ou ndjson'}), 400
+
+            try:
+                parametros = parametros_periodo(request.args)
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+
+            transacoes = ExportacaoModel.transacoes(
+                usuario_id, parametros['data_inicio'], parametros['data_fim'], parametros['categoria']
+            )
+            gerador = ExportacaoController._agrupar(
+                ExportacaoController._gerar_csv(transacoes) if formato == 'csv'
+                else ExportacaoController._gerar_ndjson(transacoes)
+            )
+
+            nome = f"gefi-exportacao-{datetime.utcnow():%Y%m%d}.{formato}"
+            return Response(
+                stream_with_context(gerador),
+                mimetype=FORMATOS[formato],
+                headers={'Content-Disposition': f'attachment; filename="{nome}"'}
+            )
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao exportar: {str(e)}'}), 500
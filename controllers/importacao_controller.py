@@ -0,0 +1,154 @@
+from flask import request, jsonify, Response, stream_with_context
+from itertools import chain
+import json
+import os
+from config.database import get_entradas_collection, get_saidas_collection
+from models.entrada_model import EntradaModel
+from models.saida_model import SaidaModel
+from models.importacao_model import ImportacaoModel
+from utils.cache_usuario import notificar_escrita
+from utils import importacao
+
+FORMATOS = {'csv': importacao.ler_csv, 'ofx': importacao.ler_ofx}
+# Documentos por insert_many
+TAMANHO_LOTE = 1000
+# Limite de linhas por arquivo (mantém o controle de duplicatas em memória limitado)
+MAX_LINHAS = int(os.getenv('IMPORT_MAX_LINHAS', '100000'))
+# Erros de linha devolvidos em detalhe (os demais só entram na contagem)
+MAX_ERROS_DETALHADOS = 100
+
+# tipo no resumo mensal -> (model, collection)
+_DESTINOS = {
+    'entradas': (EntradaModel, get_entradas_collection),
+    'saidas': (SaidaModel, get_saidas_collection),
+}
+
+class ImportacaoController:
+
+    @staticmethod
+    def _formato():
+        formato = (request.args.get('formato') or request.form.get('formato') or '').lower()
+        if not formato:
+            nome = (request.files['arquivo'].filename or '').lower()
+            formato = 'ofx' if nome.endswith('.ofx') else 'csv'
+        return formato
+
+    @staticmethod
+    def _processar(usuario_id, transacoes):
+        """
+        Consome as transações em lotes e gera eventos:
+        {'evento': 'erro', 'linha', 'erro'} para linhas rejeitadas,
+        {'evento': 'progresso', ...contadores} a cada lote gravado e
+        {'evento': 'concluido', ...contadores} ao final.
+        """
+        contadores = {'linhas': 0, 'inseridas': 0, 'duplicadas': 0, 'erros': 0}
+        pendentes = {tipo: ([], []) for tipo in _DESTINOS}  # tipo -> (documentos, linhas)
+        ocorrencias = {}
+
+        def erro(linha, mensagem):
+            contadores['erros'] += 1
+            if contadores['erros'] <= MAX_ERROS_DETALHADOS:
+                return {'evento': 'erro', 'linha': linha, 'erro': mensagem}
+            return None
+
+        def gravar(tipo):
+            documentos, linhas = pendentes[tipo]
+            _, collection = _DESTINOS[tipo]
+            inseridos, duplicados, falhas = ImportacaoModel.inserir_lote(
+                usuario_id, tipo, collection(), documentos
+            )
+            contadores['inseridas'] += inseridos
+            contadores['duplicadas'] += duplicados
+            if inseridos:
+                notificar_escrita(usuario_id, tipo)
+            eventos = [erro(linhas[posicao], mensagem) for posicao, mensagem in falhas]
+            pendentes[tipo] = ([], [])
+            return [evento for evento in eventos if evento]
+
+        for transacao in transacoes:
+            contadores['linhas'] += 1
+            if contadores['linhas'] > MAX_LINHAS:
+                contadores['linhas'] -= 1
+                evento = erro(transacao['linha'], f'Limite de {MAX_LINHAS} linhas por arquivo atingido')
+                if evento:
+                    yield evento
+                break
+
+            if 'erro' in transacao:
+                evento = erro(transacao['linha'], transacao['erro'])
+                if evento:
+                    yield evento
+                continue
+
+            tipo = transacao['tipo']
+            model, _ = _DESTINOS[tipo]
+            documento = model.montar(
+                usuario_id, transacao['descricao'], transacao['valor'],
+                transacao['categoria'], transacao['data']
+            )
+
+            chave = importacao.hash_transacao(usuario_id, transacao, 0)
+            ocorrencia = ocorrencias.get(chave, 0)
+            ocorrencias[chave] = ocorrencia + 1
+            documento['hash_importacao'] = (
+                chave if ocorrencia == 0 else importacao.hash_transacao(usuario_id, transacao, ocorrencia)
+            )
+            documento['origem'] = 'importacao'
+
+            documentos, linhas = pendentes[tipo]
+            documentos.append(documento)
+            linhas.append(transacao['linha'])
+            if len(documentos) >= TAMANHO_LOTE:
+                yield from gravar(tipo)
+                yield {'evento': 'progresso', **contadores}
+
+        for tipo, (documentos, _) in pendentes.items():
+            if documentos:
+                yield from gravar(tipo)
+
+        yield {'evento': 'concluido', **contadores}
+
+    @staticmethod
+    def importar(usuario_id):
+        """
+        Importa um extrato bancário (CSV ou OFX) enviado no campo multipart "arquivo".
+        Valores negativos (ou coluna "tipo") viram saídas; os demais, entradas.
+        Transações já importadas (hash de conteúdo) ou já lançadas à mão (mesmo
+        dia, valor e descrição) são ignoradas e contadas em `duplicadas`.
+        Com ?progresso=true a resposta é NDJSON com os eventos conforme o arquivo
+        é processado; sem ele, um JSON com o resumo final.
+        """
+        try:
+            if 'arquivo' not in request.files:
+                return jsonify({'erro': 'Envie o extrato no campo "arquivo"'}), 400
+
+            formato = ImportacaoController._formato()
+            if formato not in FORMATOS:
+                return jsonify({'erro': 'Formato deve ser csv ou ofx'}), 400
+
+            transacoes = FORMATOS[formato](request.files['arquivo'].stream)
+            try:
+                # Lê o cabeçalho antes de responder para devolver 400 em arquivo inválido
+                primeira = next(transacoes, None)
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+            if primeira is None:
+                return jsonify({'erro': 'Nenhuma transação encontrada no arquivo'}), 400
+
+            eventos = ImportacaoController._processar(usuario_id, chain([primeira], transacoes))
+
+            if request.args.get('progresso', '').lower() in ('1', 'true'):
+                linhas = (json.dumps(evento, ensure_ascii=False) + '\n' for evento in eventos)
+                return Response(stream_with_context(linhas), mimetype='application/x-ndjson')
+
+            erros = []
+            for evento in eventos:
+                if evento['evento'] == 'erro':
+                    erros.append({'linha': evento['linha'], 'erro': evento['erro']})
+                elif evento['evento'] == 'concluido':
+                    resumo = {chave: valor for chave, valor in evento.items() if chave != 'evento'}
+
+            return jsonify({**resumo, 'detalhes_erros': erros}), 200
+
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao importar extrato: {str(e)}'}), 500
@@ -1,14 +1,118 @@
-from flask import jsonify, request
+from flask import Response, jsonify, request
+import asyncio
 import os
 import time
-from datetime import datetime
-import httpx
-import yfinance as yf
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from models.cotacao_model import CotacaoModel, INTERVALOS
+from utils.cache_ttl import CacheTTL
+from utils.armazenamento import criar_armazenamento
+from utils import http_cliente, http_async, agendador, tesouro, transmissao, metricas
+from utils.validators import converter_data
 
-# Cache em memória
-_CACHE = {}
 _CACHE_TTL = int(os.getenv("INVEST_CACHE_TTL", "300"))  # 5 minutos padrão
 
+# Cache em memória: LRU limitado, com itens vencidos servidos por mais
+# INVEST_CACHE_STALE segundos enquanto são renovados em segundo plano. Com
+# CACHE_BACKEND=mongodb os workers também compartilham o que já buscaram
+_CACHE = CacheTTL(
+    "investimentos",
+    max_itens=int(os.getenv("INVEST_CACHE_MAX", "2000")),
+    ttl=_CACHE_TTL,
+    janela_stale=int(os.getenv("INVEST_CACHE_STALE", "300")),
+    armazenamento=criar_armazenamento("investimentos"),
+)
+
+# Tickers desconhecidos ficam em cache negativo por menos tempo
+_CACHE_TTL_NEGATIVO = int(os.getenv("INVEST_CACHE_TTL_NEGATIVO", "60"))
+
+# Limite de símbolos por requisição do plano da Brapi
+BRAPI_MAX_TICKERS = max(int(os.getenv("BRAPI_MAX_TICKERS", "10")), 1)
+
+# Prazo (s) de cada chamada nas buscas em paralelo
+INVEST_PRAZO = float(os.getenv("INVEST_PRAZO", "8"))
+
+# Investimentos sugeridos por /investimentos
+CATALOGO = [
+    {
+        "id": "1",
+        "nome": "Tesouro Selic",
+        "tipo": "Renda Fixa",
+        "rendimento": "12.5% ao ano",
+        "risco": "Baixo",
+        "liquidez": "Diária",
+    },
+    {
+        "id": "2",
+        "nome": "CDB",
+        "tipo": "Renda Fixa",
+        "rendimento": "13% ao ano",
+        "risco": "Baixo",
+        "liquidez": "90 dias",
+    },
+    {
+        "id": "3",
+        "nome": "Fundo Imobiliário KNRI11",
+        "ticker": "KNRI11",
+        "tipo": "Renda Variável",
+        "rendimento": "8% ao ano + valorização",
+        "risco": "Médio",
+        "liquidez": "2 dias úteis",
+    },
+    {
+        "id": "4",
+        "nome": "Ações VALE3",
+        "ticker": "VALE3",
+        "tipo": "Renda Variável",
+        "rendimento": "Variável",
+        "risco": "Alto",
+        "liquidez": "2 dias úteis",
+    },
+]
+
+# Tickers da visão geral quando a requisição não informa nenhum
+TICKERS_VISAO_GERAL = tuple(inv["ticker"] for inv in CATALOGO if "ticker" in inv)
+MAX_TICKERS_VISAO_GERAL = 50
+
+# Pré-carga em segundo plano: quantos tickers mais pedidos manter aquecidos
+PREFETCH_TOP_TICKERS = int(os.getenv("PREFETCH_TOP_TICKERS", "20"))
+
+# Contagem de pedidos por ticker (para a pré-carga), com decaimento
+_demanda = Counter()
+_demanda_lock = threading.Lock()
+_DEMANDA_MAX = 1000
+
+# Última resposta boa de cada chave, servida com "stale" quando a API falha
+# ou o circuito está aberto (sem prazo de validade, só limite de itens)
+_ULTIMOS_BONS = OrderedDict()
+_ULTIMOS_BONS_MAX = int(os.getenv("INVEST_CACHE_MAX", "2000"))
+_ultimos_bons_lock = threading.Lock()
+
+# Histórico: um ponto por ticker quando o preço muda ou a cada
+# HISTORICO_INTERVALO_MINIMO segundos, gravado fora da requisição
+HISTORICO_INTERVALO_MINIMO = int(os.getenv("HISTORICO_INTERVALO_MINIMO", "60"))
+# Pontos por gráfico: alvo ao escolher o intervalo e máximo aceito
+HISTORICO_MAX_PONTOS = 500
+HISTORICO_LIMITE_PONTOS = 5000
+PERIODOS_HISTORICO = {"1D": 1, "5D": 5, "1M": 30, "3M": 90, "6M": 180, "1A": 365, "5A": 1825}
+_ultimo_historico = {}  # ticker -> (preço, instante da gravação)
+_historico_lock = threading.Lock()
+_executor_historico = ThreadPoolExecutor(max_workers=1, thread_name_prefix="historico-cotacoes")
+
+# Última leitura do Tesouro: validadores da resposta (ETag/Last-Modified) para
+# a requisição condicional e o índice por tipo/vencimento dos títulos, montado
+# junto com eles e mantido enquanto a API responder 304
+_tesouro = {"etag": None, "modificado": None, "titulos": None, "indice": None, "assinatura": None}
+_tesouro_lock = threading.Lock()
+_TAMANHO_PEDACO_TESOURO = 64 * 1024
+
+# Cotações ao vivo (SSE): toda busca na Brapi publica os preços novos para os
+# streams abertos; com streams abertos os tickers assinados são renovados pelo cache
+_publicador = transmissao.Publicador("cotacoes", lambda tickers: _get_brapi_quotes(tickers))
+metricas.registrar("transmissao", _publicador.resumo)
+
 # URLs das APIs
 BRAPI_BASE_URL = "https://brapi.dev/api"
 TESOURO_API_URL = (
@@ -18,66 +122,438 @@ TESOURO_API_URL = (
 
 def _set_cache(key: str, data, ttl: int = None):
     """Armazena dados no cache com TTL"""
-    now = time.time()
-    _CACHE[key] = {
-        "data": data,
-        "expires_at": now + (ttl if ttl is not None else _CACHE_TTL),
-    }
+    _CACHE.definir(key, data, ttl)
 
 
 def _get_cache(key: str):
     """Recupera dados do cache se válidos"""
-    now = time.time()
-    entry = _CACHE.get(key)
-    if entry and entry.get("expires_at", 0) > now:
-        return entry.get("data")
-    return None
+    return _CACHE.obter(key)
+
+
+def _guardar_ultimo_bom(key: str, data):
+    if not data:
+        return
+    with _ultimos_bons_lock:
+        _ULTIMOS_BONS[key] = (data, time.time())
+        _ULTIMOS_BONS.move_to_end(key)
+        while len(_ULTIMOS_BONS) > _ULTIMOS_BONS_MAX:
+            _ULTIMOS_BONS.popitem(last=False)
+
+
+def _ultimo_bom(key: str):
+    """
+    Última resposta boa de `key` marcada com "stale": true e "idade_s" (cada item,
+    se for lista), ou None se nunca houve uma.
+    """
+    with _ultimos_bons_lock:
+        item = _ULTIMOS_BONS.get(key)
+    if item is None:
+        return None
+    data, guardado_em = item
+    marca = {"stale": True, "idade_s": int(time.time() - guardado_em)}
+    if isinstance(data, list):
+        return [{**elemento, **marca} for elemento in data]
+    return {**data, **marca}
+
+
+def _gravar_historico(cotacoes: dict):
+    try:
+        CotacaoModel.registrar(cotacoes)
+    except Exception as e:
+        print(f"Erro ao gravar histórico de cotações: {e}")
+
+
+def _registrar_historico(cotacoes: dict):
+    """Envia ao histórico as cotações com preço novo (ou antigas o bastante), em segundo plano"""
+    agora = time.monotonic()
+    novas = {}
+    with _historico_lock:
+        for ticker, quote in cotacoes.items():
+            anterior = _ultimo_historico.get(ticker)
+            if (anterior is None or anterior[0] != quote.get("preco")
+                    or agora - anterior[1] >= HISTORICO_INTERVALO_MINIMO):
+                novas[ticker] = quote
+                _ultimo_historico[ticker] = (quote.get("preco"), agora)
+    if novas:
+        # O pymongo bloqueia: não pode rodar no event loop das buscas
+        _executor_historico.submit(_gravar_historico, novas)
+
+
+def _utc(data: datetime):
+    """Datas com fuso viram UTC sem fuso (como o pymongo devolve)"""
+    if data.tzinfo is not None:
+        return data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def _registrar_demanda(tickers):
+    with _demanda_lock:
+        _demanda.update(tickers)
+        if len(_demanda) > _DEMANDA_MAX:
+            # Decaimento: metade das contagens, descarta os que zeraram
+            for ticker, total in list(_demanda.items()):
+                if total // 2:
+                    _demanda[ticker] = total // 2
+                else:
+                    del _demanda[ticker]
+
+
+def tickers_quentes(quantidade: int = PREFETCH_TOP_TICKERS):
+    """Tickers do catálogo seguidos dos mais pedidos (até `quantidade` extras)"""
+    with _demanda_lock:
+        mais_pedidos = [ticker for ticker, _ in _demanda.most_common(quantidade)]
+    return list(dict.fromkeys([*TICKERS_VISAO_GERAL, *mais_pedidos]))
+
+
+def _formatar_brapi(stock: dict):
+    """Converte um item de `results` da Brapi no formato de cotação da API"""
+    return {
+        "preco": stock.get("regularMarketPrice"),
+        "variacao": stock.get("regularMarketChange"),
+        "variacao_percentual": stock.get("regularMarketChangePercent"),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "nome": stock.get("shortName") or stock.get("longName"),
+        "fonte": "brapi",
+    }
+
+
+def _parse_em_alta(data: dict):
+    """Ações com variação positiva da resposta de /quote/list"""
+    em_alta = []
+
+    for stock in data.get("stocks", []):
+        # Filtrar apenas ações com variação positiva
+        change_pct = stock.get("change")
+        if change_pct and change_pct > 0:
+            em_alta.append(
+                {
+                    "ticker": stock.get("stock"),
+                    "nome": stock.get("name"),
+                    "preco": stock.get("close"),
+                    "variacao_percentual": change_pct,
+                    "volume": stock.get("volume"),
+                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                }
+            )
+
+    return em_alta
+
+
+def _formatar_tesouro(item: dict):
+    """Um título da resposta da API do Tesouro"""
+    tipo = tesouro.classificar(item.get("NomeTitulo"))
+    return {
+        "codigo": item.get("NomeTitulo", ""),
+        "nome": item.get("NomeTitulo", ""),
+        "vencimento": item.get("DataVencimento", ""),
+        "taxa_compra": item.get("TaxaCompra"),
+        "taxa_venda": item.get("TaxaVenda"),
+        "preco_unitario": item.get("PrecoUnitario"),
+        "valor_minimo": item.get("ValorMinimo"),
+        "tipo": "Tesouro Direto",
+        "indexador": tesouro.TIPOS.get(tipo),
+    }
+
+
+def _assinatura_tesouro(titulos: list):
+    """Identifica o conteúdo da lista, para reconhecer cópias vindas do cache compartilhado"""
+    return hash(tuple(
+        (t.get("codigo"), t.get("vencimento"), t.get("taxa_compra"), t.get("taxa_venda"), t.get("preco_unitario"))
+        for t in titulos
+    ))
+
+
+def _indice_tesouro(titulos: list):
+    """
+    Índice de `titulos`. Normalmente é o montado por `_fetch_tesouro`; uma
+    cópia (último resultado bom, cache de outro worker) com o mesmo conteúdo
+    reaproveita o índice, e só uma lista diferente monta outro.
+    """
+    with _tesouro_lock:
+        indice = _tesouro["indice"]
+        if indice is not None and indice.titulos is titulos:
+            return indice
+        assinatura_atual = _tesouro["assinatura"]
+
+    assinatura = _assinatura_tesouro(titulos)
+    if indice is not None and assinatura == assinatura_atual:
+        return indice
+    indice = tesouro.IndiceTesouro(titulos)
+    with _tesouro_lock:
+        _tesouro.update(indice=indice, assinatura=assinatura)
+    return indice
+
+
+def _params_em_alta():
+    return {
+        "sortBy": "change",
+        "sortOrder": "desc",
+        "limit": 10,
+        "token": os.getenv("BRAPI_TOKEN", ""),
+    }
+
+
+async def _fetch_brapi_lote(tickers: list):
+    """
+    Uma requisição à Brapi para até BRAPI_MAX_TICKERS símbolos.
+    Retorna {ticker: cotação} (tickers desconhecidos ficam de fora) ou None em erro.
+    """
+    url = f"{BRAPI_BASE_URL}/quote/{','.join(tickers)}"
+
+    response = await http_async.get("brapi", url, params={"token": os.getenv("BRAPI_TOKEN", "")})
+
+    if response.status_code == 404:
+        if len(tickers) == 1:
+            return {}
+        # Um ticker inválido derruba o lote inteiro: divide para achar os válidos
+        meio = len(tickers) // 2
+        partes = await asyncio.gather(
+            _fetch_brapi_lote(tickers[:meio]), _fetch_brapi_lote(tickers[meio:])
+        )
+        if all(parte is None for parte in partes):
+            return None
+        return {ticker: quote for parte in partes if parte for ticker, quote in parte.items()}
+
+    if response.status_code != 200:
+        print(f"Brapi retornou {response.status_code} para {','.join(tickers)}")
+        return None
+
+    return {
+        stock.get("symbol", ""): _formatar_brapi(stock)
+        for stock in response.json().get("results", [])
+    }
+
+
+async def _buscar_cotacoes(tickers: list):
+    """
+    Busca `tickers` na Brapi com os lotes de BRAPI_MAX_TICKERS em paralelo.
+    Tickers desconhecidos entram no cache negativo. Retorna {ticker: cotação}.
+    """
+    lotes = [tickers[i:i + BRAPI_MAX_TICKERS] for i in range(0, len(tickers), BRAPI_MAX_TICKERS)]
+    respostas = await asyncio.gather(*(_fetch_brapi_lote(lote) for lote in lotes), return_exceptions=True)
+
+    encontrados = {}
+    for lote, cotacoes in zip(lotes, respostas):
+        if isinstance(cotacoes, Exception):
+            print(f"Erro ao buscar Brapi: {cotacoes}")
+            continue
+        if cotacoes is None:
+            continue
+
+        for ticker in lote:
+            if ticker in cotacoes:
+                encontrados[ticker] = cotacoes[ticker]
+                _guardar_ultimo_bom(f"brapi:quote:{ticker}", cotacoes[ticker])
+            else:
+                # Ticker desconhecido: cache negativo curto para não repetir a consulta
+                _set_cache(f"brapi:quote:{ticker}", {}, ttl=_CACHE_TTL_NEGATIVO)
+    _registrar_historico(encontrados)
+    _publicador.publicar(encontrados)
+    return encontrados
+
+
+async def _buscar_cotacoes_por_chave(chaves: list):
+    """`_buscar_cotacoes` com as chaves do cache ("brapi:quote:<ticker>")"""
+    cotacoes = await _buscar_cotacoes([chave.split(":", 2)[2] for chave in chaves])
+    return {f"brapi:quote:{ticker}": quote for ticker, quote in cotacoes.items()}
 
 
 def _get_brapi_quotes(tickers: list):
-    """Busca cotações via Brapi (fonte primária)"""
+    """
+    Busca cotações via Brapi (fonte primária) com cache por ticker.
+    Só os tickers ausentes/expirados no cache são buscados, em lotes de até
+    BRAPI_MAX_TICKERS por requisição; o resultado é mesclado com o cache.
+    Requisições simultâneas pelo mesmo ticker compartilham a mesma busca.
+    Se a Brapi falhar, usa a última cotação boa de cada ticker (com "stale").
+    """
     if not tickers:
         return {}
+    _registrar_demanda(tickers)
+
+    def buscar(chaves):
+        cotacoes = http_async.reunir({"cotacoes": _buscar_cotacoes_por_chave(chaves)}, INVEST_PRAZO)["cotacoes"]
+        if isinstance(cotacoes, Exception):
+            print(f"Erro ao buscar Brapi: {cotacoes!r}")
+            return {}
+        return cotacoes
+
+    cached = _CACHE.obter_varios([f"brapi:quote:{ticker}" for ticker in tickers], buscar)
+    quotes = {}
+    for ticker in tickers:
+        quote = cached.get(f"brapi:quote:{ticker}")
+        if quote is None:
+            quote = _ultimo_bom(f"brapi:quote:{ticker}")
+        if quote:
+            quotes[ticker] = quote
+    return quotes
 
-    cache_key = f'brapi:quotes:{",".join(sorted(tickers))}'
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
 
+def cotacoes_atuais(tickers: list):
+    """Cotações de `tickers` pelo cache/Brapi (última boa, com "stale", se a Brapi falhar)"""
+    return _get_brapi_quotes(list(tickers))
+
+
+def _fetch_em_alta():
+    """Ações com maior variação positiva do dia na Brapi (None em erro)"""
     try:
-        tickers_str = ",".join(tickers)
-        url = f"{BRAPI_BASE_URL}/quote/{tickers_str}"
-
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(url, params={"token": os.getenv("BRAPI_TOKEN", "")})
-
-            if response.status_code == 200:
-                data = response.json()
-                results = {}
-
-                for stock in data.get("results", []):
-                    ticker = stock.get("symbol", "")
-                    results[ticker] = {
-                        "preco": stock.get("regularMarketPrice"),
-                        "variacao": stock.get("regularMarketChange"),
-                        "variacao_percentual": stock.get("regularMarketChangePercent"),
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "nome": stock.get("shortName") or stock.get("longName"),
-                        "fonte": "brapi",
-                    }
-
-                _set_cache(cache_key, results)
-                return results
+        # Usar endpoint da Brapi para ações mais negociadas
+        response = http_cliente.get("brapi", f"{BRAPI_BASE_URL}/quote/list", params=_params_em_alta())
+        if response.status_code == 200:
+            em_alta = _parse_em_alta(response.json())
+            _guardar_ultimo_bom("investimentos:em_alta", em_alta)
+            return em_alta
+    except agendador.OrcamentoEsgotado:
+        raise
     except Exception as e:
-        print(f"Erro ao buscar Brapi: {e}")
+        print(f"Erro ao buscar ações em alta: {e}")
+
+    return None
 
-    return {}
+
+async def _fetch_em_alta_async():
+    response = await http_async.get("brapi", f"{BRAPI_BASE_URL}/quote/list", params=_params_em_alta())
+    if response.status_code != 200:
+        raise RuntimeError(f"Brapi retornou {response.status_code}")
+    em_alta = _parse_em_alta(response.json())
+    _guardar_ultimo_bom("investimentos:em_alta", em_alta)
+    return em_alta
+
+
+def _fetch_tesouro():
+    """
+    Títulos do Tesouro Direto na API oficial (None em erro).
+    Requisição condicional (If-None-Match/If-Modified-Since): se a API
+    responder 304 os títulos já lidos são reaproveitados. O corpo é lido aos
+    pedaços e cada título é convertido assim que chega.
+    """
+    headers = {}
+    with _tesouro_lock:
+        anteriores = _tesouro["titulos"]
+        if anteriores is not None:
+            if _tesouro["etag"]:
+                headers["If-None-Match"] = _tesouro["etag"]
+            if _tesouro["modificado"]:
+                headers["If-Modified-Since"] = _tesouro["modificado"]
+
+    try:
+        response = http_cliente.get("tesouro", TESOURO_API_URL, headers=headers, stream=True)
+        try:
+            if response.status_code == 304 and anteriores is not None:
+                # Mesmos títulos: o índice montado com eles continua valendo
+                titulos = anteriores
+            elif response.status_code == 200:
+                titulos = [
+                    _formatar_tesouro(item)
+                    for item in tesouro.itens_da_lista(response.iter_bytes(_TAMANHO_PEDACO_TESOURO))
+                ]
+                indice = tesouro.IndiceTesouro(titulos)
+                assinatura = _assinatura_tesouro(titulos)
+                with _tesouro_lock:
+                    _tesouro.update(
+                        etag=response.headers.get("ETag"),
+                        modificado=response.headers.get("Last-Modified"),
+                        titulos=titulos,
+                        indice=indice,
+                        assinatura=assinatura,
+                    )
+            else:
+                return None
+        finally:
+            response.close()
+        _guardar_ultimo_bom("tesouro:titulos", titulos)
+        return titulos
+    except agendador.OrcamentoEsgotado:
+        raise
+    except Exception as e:
+        print(f"Erro ao buscar Tesouro Direto: {e}")
+
+    return None
+
+
+async def _fetch_tesouro_async():
+    # A leitura é síncrona (streaming + requisição condicional): roda fora do event loop
+    titulos = await asyncio.to_thread(_fetch_tesouro)
+    if titulos is None:
+        raise RuntimeError("API do Tesouro indisponível")
+    return titulos
+
+
+def _prefetch_cotacoes():
+    """
+    Renova as cotações dos tickers quentes. Só entram os lotes que cabem no
+    orçamento; cada requisição (inclusive divisões e repetições) é descontada
+    ao ser enviada.
+    """
+    tickers = tickers_quentes()
+    lotes = min(-(-len(tickers) // BRAPI_MAX_TICKERS), agendador.orcamento.disponivel())
+    if lotes <= 0:
+        raise agendador.OrcamentoEsgotado("Sem orçamento para as cotações")
+    tickers = tickers[:lotes * BRAPI_MAX_TICKERS]
+
+    cotacoes = http_async.reunir({"cotacoes": _buscar_cotacoes(tickers)}, INVEST_PRAZO)["cotacoes"]
+    if isinstance(cotacoes, Exception):
+        raise cotacoes
+    for ticker, quote in cotacoes.items():
+        _set_cache(f"brapi:quote:{ticker}", quote)
+
+
+def _prefetch_em_alta():
+    em_alta = _fetch_em_alta()
+    if em_alta is None:
+        raise RuntimeError("Brapi indisponível")
+    _set_cache("investimentos:em_alta", em_alta, ttl=600)
+
+
+def _prefetch_tesouro():
+    titulos = _fetch_tesouro()
+    if titulos is None:
+        raise RuntimeError("API do Tesouro indisponível")
+    _set_cache("tesouro:titulos", titulos, ttl=3600)
+
+
+_prefetch_lock = threading.Lock()
+_prefetch_iniciado = False
+
+
+def iniciar_prefetch():
+    """
+    Agenda a renovação das cotações quentes, ações em alta e Tesouro antes de
+    expirarem (a 80% do TTL), só no horário do pregão. Idempotente: o app
+    chama na primeira requisição de cada processo.
+    """
+    global _prefetch_iniciado
+    with _prefetch_lock:
+        if _prefetch_iniciado:
+            return
+        _prefetch_iniciado = True
+        agendador.agendar("cotacoes", max(int(_CACHE_TTL * 0.8), 30), _prefetch_cotacoes)
+        agendador.agendar("em_alta", 480, _prefetch_em_alta)
+        agendador.agendar("tesouro", 2880, _prefetch_tesouro)
+        agendador.iniciar()
+
+
+def _resposta_cotacao(ticker: str, quote: dict):
+    """Cotação de um ticker no formato de /investimentos/cotacao"""
+    result = {
+        "ticker": ticker,
+        "preco": quote.get("preco"),
+        "variacao": quote.get("variacao"),
+        "variacao_percentual": quote.get("variacao_percentual"),
+        "timestamp": quote.get("timestamp"),
+        "fonte": quote.get("fonte"),
+    }
+    if quote.get("stale"):
+        result["stale"] = True
+        result["idade_s"] = quote.get("idade_s")
+    return result
 
 
 def _get_yfinance_fallback(ticker: str):
     """Fallback desabilitado - Yahoo Finance bloqueia requisições constantemente"""
     # yfinance não é confiável para uso em produção (rate limits agressivos)
     # Brapi é a fonte primária e suficiente para o mercado brasileiro
+    # Se for reativado, importe yfinance aqui dentro: ele carrega o pandas e
+    # deixaria o cold start lento
     return None
 
 
@@ -86,42 +562,7 @@ class InvestimentoController:
     @staticmethod
     def listar():
         """Lista investimentos sugeridos com cotações reais"""
-        investimentos = [
-            {
-                "id": "1",
-                "nome": "Tesouro Selic",
-                "tipo": "Renda Fixa",
-                "rendimento": "12.5% ao ano",
-                "risco": "Baixo",
-                "liquidez": "Diária",
-            },
-            {
-                "id": "2",
-                "nome": "CDB",
-                "tipo": "Renda Fixa",
-                "rendimento": "13% ao ano",
-                "risco": "Baixo",
-                "liquidez": "90 dias",
-            },
-            {
-                "id": "3",
-                "nome": "Fundo Imobiliário KNRI11",
-                "ticker": "KNRI11",
-                "tipo": "Renda Variável",
-                "rendimento": "8% ao ano + valorização",
-                "risco": "Médio",
-                "liquidez": "2 dias úteis",
-            },
-            {
-                "id": "4",
-                "nome": "Ações VALE3",
-                "ticker": "VALE3",
-                "tipo": "Renda Variável",
-                "rendimento": "Variável",
-                "risco": "Alto",
-                "liquidez": "2 dias úteis",
-            },
-        ]
+        investimentos = [dict(inv) for inv in CATALOGO]
 
         # Buscar cotações para investimentos com ticker
         tickers = [inv["ticker"] for inv in investimentos if "ticker" in inv]
@@ -149,6 +590,9 @@ class InvestimentoController:
                     inv["variacao_percentual"] = quote.get("variacao_percentual")
                     inv["timestamp"] = quote.get("timestamp")
                     inv["fonte"] = quote.get("fonte", "brapi")
+                    if quote.get("stale"):
+                        inv["stale"] = True
+                        inv["idade_s"] = quote.get("idade_s")
 
         return jsonify(investimentos), 200
 
@@ -186,106 +630,247 @@ class InvestimentoController:
         if len(tickers) == 1:
             t = tickers[0]
             if t in quotes:
-                result = {
-                    "ticker": t,
-                    "preco": quotes[t].get("preco"),
-                    "variacao": quotes[t].get("variacao"),
-                    "variacao_percentual": quotes[t].get("variacao_percentual"),
-                    "timestamp": quotes[t].get("timestamp"),
-                    "fonte": quotes[t].get("fonte"),
-                }
-                return jsonify(result), 200
+                return jsonify(_resposta_cotacao(t, quotes[t])), 200
             return jsonify({"erro": f"Não foi possível obter dados para {t}"}), 404
 
         # Múltiplos tickers
         return jsonify(quotes), 200
 
     @staticmethod
-    def em_alta():
-        """Retorna ações em alta (maior variação positiva do dia)"""
-        cache_key = "investimentos:em_alta"
-        cached = _get_cache(cache_key)
-        if cached:
-            return jsonify(cached), 200
+    def transmitir():
+        """
+        Stream SSE de cotações (?tickers=VALE3,PETR4): um evento "cotacao" por
+        ticker com o preço atual e outro a cada preço novo. Comentários de
+        heartbeat mantêm a conexão; um evento "encerrado" avisa quando o stream
+        fecha por ociosidade ou duração máxima (o EventSource reconecta).
+        """
+        tickers = list(dict.fromkeys(
+            t.strip().upper() for t in request.args.get("tickers", request.args.get("ticker", "")).split(",")
+            if t.strip()
+        ))
+        if not tickers:
+            return jsonify({"erro": 'Parâmetro "tickers" é obrigatório.'}), 400
+        if len(tickers) > transmissao.SSE_MAX_TICKERS:
+            return jsonify({"erro": f"Máximo de {transmissao.SSE_MAX_TICKERS} tickers por stream."}), 400
 
         try:
-            # Usar endpoint da Brapi para ações mais negociadas
-            url = f"{BRAPI_BASE_URL}/quote/list"
-
-            with httpx.Client(timeout=15.0) as client:
-                response = client.get(
-                    url,
-                    params={
-                        "sortBy": "change",
-                        "sortOrder": "desc",
-                        "limit": 10,
-                        "token": os.getenv("BRAPI_TOKEN", ""),
-                    },
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    em_alta = []
-
-                    for stock in data.get("stocks", []):
-                        # Filtrar apenas ações com variação positiva
-                        change_pct = stock.get("change")
-                        if change_pct and change_pct > 0:
-                            em_alta.append(
-                                {
-                                    "ticker": stock.get("stock"),
-                                    "nome": stock.get("name"),
-                                    "preco": stock.get("close"),
-                                    "variacao_percentual": change_pct,
-                                    "volume": stock.get("volume"),
-                                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                                }
-                            )
-
-                    _set_cache(cache_key, em_alta, ttl=600)  # Cache de 10 minutos
-                    return jsonify(em_alta), 200
-        except Exception as e:
-            print(f"Erro ao buscar ações em alta: {e}")
+            assinatura = _publicador.assinar(tickers)
+        except transmissao.LimiteAssinaturas as e:
+            return jsonify({"erro": str(e)}), 503, {"Retry-After": str(max(int(transmissao.SSE_INTERVALO), 1))}
+
+        def eventos():
+            inicio = ultimo_evento = time.monotonic()
+            enviados = {}  # ticker -> último preço enviado a este cliente
+            sequencia = 0
+            try:
+                yield f"retry: {int(transmissao.SSE_INTERVALO * 1000)}\n\n"
+                # Assina antes de ler o preço atual: nenhuma mudança fica entre os dois
+                atualizacoes = _get_brapi_quotes(tickers)
+                while True:
+                    for ticker, quote in atualizacoes.items():
+                        if enviados.get(ticker) == quote.get("preco"):
+                            continue
+                        enviados[ticker] = quote.get("preco")
+                        sequencia += 1
+                        yield transmissao.formatar_evento("cotacao", _resposta_cotacao(ticker, quote), sequencia)
+                        ultimo_evento = time.monotonic()
+
+                    agora = time.monotonic()
+                    if agora - ultimo_evento >= transmissao.SSE_TEMPO_OCIOSO:
+                        yield transmissao.formatar_evento("encerrado", {"motivo": "ocioso"})
+                        return
+                    if agora - inicio >= transmissao.SSE_DURACAO_MAXIMA:
+                        yield transmissao.formatar_evento("encerrado", {"motivo": "duracao_maxima"})
+                        return
+
+                    atualizacoes = assinatura.aguardar(transmissao.SSE_HEARTBEAT)
+                    if assinatura.encerrada:
+                        return
+                    if not atualizacoes:
+                        # Heartbeat: também é o que revela um cliente que já desconectou
+                        yield ": ping\n\n"
+            finally:
+                _publicador.cancelar(assinatura)
+
+        resposta = Response(
+            eventos(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # O gerador só roda o finally se chegou a começar (HEAD, por exemplo, não começa)
+        resposta.call_on_close(lambda: _publicador.cancelar(assinatura))
+        return resposta
 
-        return jsonify({"erro": "Não foi possível buscar investimentos em alta"}), 500
+    @staticmethod
+    def visao_geral():
+        """
+        Cotações, ações em alta e títulos do Tesouro em uma chamada.
+        O que não está no cache é buscado em paralelo (asyncio), então o tempo
+        é o da API mais lenta; buscas iguais em andamento são compartilhadas. Partes que falharem usam a última resposta boa
+        (com "stale"); sem ela vêm como null e listadas em "indisponiveis".
+        """
+        inicio = time.perf_counter()
+        tickers_param = request.args.get("tickers", "").strip()
+        tickers = [t.strip().upper() for t in tickers_param.split(",") if t.strip()] or list(TICKERS_VISAO_GERAL)
+        tickers = list(dict.fromkeys(tickers))
+        if len(tickers) > MAX_TICKERS_VISAO_GERAL:
+            return jsonify({"erro": f"Máximo de {MAX_TICKERS_VISAO_GERAL} tickers"}), 400
+        _registrar_demanda(tickers)
+
+        # Tudo pelo cache (single-flight, stale-while-revalidate, L2 em uma
+        # consulta): só o que falta é buscado, em paralelo
+        chaves = [f"brapi:quote:{ticker}" for ticker in tickers]
+        resultados = http_async.reunir({
+            "cotacoes": _CACHE.obter_varios_async(chaves, _buscar_cotacoes_por_chave),
+            "em_alta": _CACHE.obter_ou_calcular_async("investimentos:em_alta", _fetch_em_alta_async, ttl=600),
+            "tesouro": _CACHE.obter_ou_calcular_async("tesouro:titulos", _fetch_tesouro_async, ttl=3600),
+        }, INVEST_PRAZO)
+
+        indisponiveis = []
+        for nome, resultado in resultados.items():
+            if isinstance(resultado, Exception):
+                print(f"Erro na visão geral ({nome}): {resultado!r}")
+
+        cotacoes_cache = resultados["cotacoes"] if isinstance(resultados["cotacoes"], dict) else {}
+        cotacoes = {}
+        for ticker, chave in zip(tickers, chaves):
+            # Ausente (lote com erro, prazo): última cotação boa
+            quote = cotacoes_cache.get(chave)
+            if quote is None:
+                quote = _ultimo_bom(chave)
+            if quote:
+                cotacoes[ticker] = quote
+        if isinstance(resultados["cotacoes"], Exception) and not cotacoes:
+            indisponiveis.append("cotacoes")
+
+        em_alta = resultados["em_alta"]
+        if em_alta is None or isinstance(em_alta, Exception):
+            em_alta = _ultimo_bom("investimentos:em_alta")
+            if em_alta is None:
+                indisponiveis.append("em_alta")
+
+        tesouro = resultados["tesouro"]
+        if tesouro is None or isinstance(tesouro, Exception):
+            tesouro = _ultimo_bom("tesouro:titulos")
+            if tesouro is None:
+                indisponiveis.append("tesouro")
+
+        return jsonify({
+            "cotacoes": {ticker: cotacoes[ticker] for ticker in tickers if ticker in cotacoes},
+            "em_alta": em_alta,
+            "tesouro": tesouro,
+            "indisponiveis": indisponiveis,
+            "tempo_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }), 200
 
     @staticmethod
-    def listar_tesouro():
-        """Lista títulos do Tesouro Direto disponíveis (API oficial)"""
-        cache_key = "tesouro:titulos"
-        cached = _get_cache(cache_key)
-        if cached:
-            return jsonify(cached), 200
+    def historico():
+        """
+        Histórico de preços de um ticker em candles (OHLC), agregado no MongoDB a
+        partir das cotações já buscadas (não chama a Brapi).
+        Parâmetros: ticker, inicio/fim (ISO) ou periodo (1D, 5D, 1M, 3M, 6M, 1A,
+        5A), intervalo (1min ... 1mes; escolhido pelo período se omitido).
+        """
+        ticker = request.args.get("ticker", "").strip().upper()
+        if not ticker:
+            return jsonify({"erro": 'Parâmetro "ticker" é obrigatório.'}), 400
+
+        fim_param = request.args.get("fim", "").strip()
+        fim = converter_data(fim_param) if fim_param else datetime.utcnow()
+        if fim is None:
+            return jsonify({"erro": 'Parâmetro "fim" deve ser uma data ISO (YYYY-MM-DD)'}), 400
+        fim = _utc(fim)
+        if fim_param and len(fim_param) == 10:
+            # Só a data (YYYY-MM-DD): o dia informado entra no período
+            fim += timedelta(days=1)
+
+        periodo = request.args.get("periodo", "").strip().upper()
+        if request.args.get("inicio"):
+            inicio = converter_data(request.args["inicio"])
+            if inicio is None:
+                return jsonify({"erro": 'Parâmetro "inicio" deve ser uma data ISO (YYYY-MM-DD)'}), 400
+            inicio = _utc(inicio)
+        elif periodo:
+            if periodo not in PERIODOS_HISTORICO:
+                return jsonify({"erro": f'Período inválido. Use: {", ".join(PERIODOS_HISTORICO)}'}), 400
+            inicio = fim - timedelta(days=PERIODOS_HISTORICO[periodo])
+        else:
+            inicio = fim - timedelta(days=PERIODOS_HISTORICO["1M"])
+
+        if inicio >= fim:
+            return jsonify({"erro": '"inicio" deve ser anterior a "fim"'}), 400
+
+        duracao = (fim - inicio).total_seconds()
+        intervalo = request.args.get("intervalo", "").strip().lower()
+        if not intervalo:
+            # Menor intervalo que cabe em HISTORICO_MAX_PONTOS pontos
+            intervalo = next(
+                (nome for nome, (_, _, segundos) in INTERVALOS.items() if duracao / segundos <= HISTORICO_MAX_PONTOS),
+                "1mes",
+            )
+        elif intervalo not in INTERVALOS:
+            return jsonify({"erro": f'Intervalo inválido. Use: {", ".join(INTERVALOS)}'}), 400
+        if duracao / INTERVALOS[intervalo][2] > HISTORICO_LIMITE_PONTOS:
+            return jsonify({"erro": f"Intervalo muito pequeno para o período (máximo de {HISTORICO_LIMITE_PONTOS} pontos)"}), 400
 
         try:
-            with httpx.Client(timeout=15.0) as client:
-                response = client.get(TESOURO_API_URL)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    titulos = []
-
-                    # Processar resposta da API do Tesouro
-                    for item in data.get("response", {}).get("data", []):
-                        titulos.append(
-                            {
-                                "codigo": item.get("NomeTitulo", ""),
-                                "nome": item.get("NomeTitulo", ""),
-                                "vencimento": item.get("DataVencimento", ""),
-                                "taxa_compra": item.get("TaxaCompra"),
-                                "taxa_venda": item.get("TaxaVenda"),
-                                "preco_unitario": item.get("PrecoUnitario"),
-                                "valor_minimo": item.get("ValorMinimo"),
-                                "tipo": "Tesouro Direto",
-                            }
-                        )
-
-                    _set_cache(cache_key, titulos, ttl=3600)  # Cache de 1 hora
-                    return jsonify(titulos), 200
+            pontos = CotacaoModel.ohlc(ticker, inicio, fim, intervalo)
         except Exception as e:
-            print(f"Erro ao buscar Tesouro Direto: {e}")
+            print(f"Erro ao buscar histórico de {ticker}: {e}")
+            return jsonify({"erro": "Erro ao buscar histórico"}), 500
+
+        for ponto in pontos:
+            ponto["data"] = ponto["data"].isoformat() + "Z"
+        return jsonify({
+            "ticker": ticker,
+            "intervalo": intervalo,
+            "inicio": inicio.isoformat() + "Z",
+            "fim": fim.isoformat() + "Z",
+            "pontos": pontos,
+        }), 200
 
-        # Fallback: dados estáticos
+    @staticmethod
+    def em_alta():
+        """Retorna ações em alta (maior variação positiva do dia)"""
+        em_alta = _CACHE.obter_ou_calcular(
+            "investimentos:em_alta", _fetch_em_alta, ttl=600  # Cache de 10 minutos
+        )
+        if em_alta is None:
+            # API fora ou circuito aberto: última resposta boa, marcada como stale
+            em_alta = _ultimo_bom("investimentos:em_alta")
+        if em_alta is not None:
+            return jsonify(em_alta), 200
+
+        return jsonify({"erro": "Não foi possível buscar investimentos em alta"}), 500
+
+    @staticmethod
+    def listar_tesouro():
+        """
+        Lista títulos do Tesouro Direto disponíveis (API oficial).
+        Filtros opcionais servidos pelo índice: tipo (selic, ipca, prefixado,
+        renda, educa) e vencimento_ate (YYYY-MM-DD).
+        """
+        tipo = None
+        if request.args.get("tipo"):
+            tipo = tesouro.normalizar_tipo(request.args["tipo"])
+            if tipo is None:
+                return jsonify({"erro": f'Tipo inválido. Use: {", ".join(tesouro.TIPOS.values())}'}), 400
+        vencimento_ate = None
+        if request.args.get("vencimento_ate"):
+            vencimento_ate = converter_data(request.args["vencimento_ate"])
+            if vencimento_ate is None:
+                return jsonify({"erro": 'Parâmetro "vencimento_ate" deve ser uma data ISO (YYYY-MM-DD)'}), 400
+            vencimento_ate = vencimento_ate.date()
+
+        titulos = _CACHE.obter_ou_calcular(
+            "tesouro:titulos", _fetch_tesouro, ttl=3600  # Cache de 1 hora
+        )
+        if titulos is None:
+            titulos = _ultimo_bom("tesouro:titulos")
+        if titulos is not None:
+            return jsonify(_indice_tesouro(titulos).filtrar(tipo, vencimento_ate)), 200
+
+        # Fallback: dados estáticos (só se nunca houve resposta da API)
         tesouro_fallback = [
             {
                 "codigo": "Tesouro Selic 2029",
@@ -305,4 +890,4 @@ class InvestimentoController:
             },
         ]
 
-        return jsonify(tesouro_fallback), 200
+        return jsonify(tesouro.IndiceTesouro(tesouro_fallback).filtrar(tipo, vencimento_ate)), 200
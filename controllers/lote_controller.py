@@ -0,0 +1,107 @@
+from flask import request, jsonify
+from bson import ObjectId
+from bson.errors import InvalidId
+from config.database import get_entradas_collection, get_saidas_collection
+from models.entrada_model import EntradaModel
+from models.saida_model import SaidaModel
+from models.lote_model import LoteModel
+from controllers.entrada_controller import EntradaController
+from controllers.saida_controller import SaidaController
+
+MAX_OPERACOES = 500
+OPERACOES = ('criar', 'atualizar', 'deletar')
+
+# tipo da operação -> (model, controller com as validações, collection, tipo no resumo mensal)
+_TIPOS = {
+    'entrada': (EntradaModel, EntradaController, get_entradas_collection, 'entradas'),
+    'saida': (SaidaModel, SaidaController, get_saidas_collection, 'saidas'),
+}
+
+class LoteController:
+    
+    @staticmethod
+    def _preparar(usuario_id, indice, operacao):
+        """Valida uma operação do lote. Retorna (operação normalizada, None) ou (None, erro)"""
+        if not isinstance(operacao, dict):
+            return None, 'Operação deve ser um objeto'
+        
+        op = operacao.get('op')
+        tipo = operacao.get('tipo')
+        dados = operacao.get('dados') or {}
+        
+        if op not in OPERACOES:
+            return None, 'Campo "op" deve ser criar, atualizar ou deletar'
+        if tipo not in _TIPOS:
+            return None, 'Campo "tipo" deve ser entrada ou saida'
+        if not isinstance(dados, dict):
+            return None, 'Campo "dados" deve ser um objeto'
+        
+        model, controller, _, _ = _TIPOS[tipo]
+        preparada = {'indice': indice, 'op': op, 'tipo': tipo}
+        
+        if op == 'criar':
+            campos, erro = controller.validar_criacao(dados)
+            if erro:
+                return None, erro
+            preparada['documento'] = {'_id': ObjectId(), **model.montar(usuario_id, **campos)}
+            return preparada, None
+        
+        try:
+            preparada['id'] = ObjectId(operacao.get('id'))
+        except (InvalidId, TypeError):
+            return None, 'Campo "id" inválido'
+        preparada['dados'] = dados
+        return preparada, None
+    
+    @staticmethod
+    def sincronizar(usuario_id):
+        """
+        Executa um lote de operações de entradas e saídas em uma requisição.
+        Body: {"operacoes": [{"op": "criar|atualizar|deletar", "tipo": "entrada|saida",
+               "id": "...", "dados": {...}, "ref": "id local opcional"}]}
+        Cada collection recebe um bulk_write não ordenado; o resultado de cada
+        operação volta na mesma posição do array enviado.
+        """
+        try:
+            dados = request.get_json(silent=True) or {}
+            operacoes = dados.get('operacoes')
+            
+            if not isinstance(operacoes, list) or not operacoes:
+                return jsonify({'erro': 'Envie uma lista "operacoes" não vazia'}), 400
+            if len(operacoes) > MAX_OPERACOES:
+                return jsonify({'erro': f'Máximo de {MAX_OPERACOES} operações por lote'}), 400
+            
+            resultados = {}
+            por_tipo = {tipo: [] for tipo in _TIPOS}
+            for indice, operacao in enumerate(operacoes):
+                preparada, erro = LoteController._preparar(usuario_id, indice, operacao)
+                if erro:
+                    resultados[indice] = {'status': 400, 'erro': erro}
+                else:
+                    por_tipo[preparada['tipo']].append(preparada)
+            
+            for tipo, preparadas in por_tipo.items():
+                if not preparadas:
+                    continue
+                _, controller, collection, tipo_resumo = _TIPOS[tipo]
+                resultados.update(LoteModel.executar(
+                    usuario_id, tipo_resumo, collection(), preparadas, controller.validar_atualizacao
+                ))
+            
+            resposta = []
+            for indice, operacao in enumerate(operacoes):
+                resultado = {'indice': indice, **resultados[indice]}
+                if isinstance(operacao, dict) and 'ref' in operacao:
+                    resultado['ref'] = operacao['ref']
+                resposta.append(resultado)
+            
+            sucesso = sum(1 for r in resposta if r['status'] < 400)
+            return jsonify({
+                'resultados': resposta,
+                'total': len(resposta),
+                'sucesso': sucesso,
+                'falhas': len(resposta) - sucesso
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'erro': f'Erro ao processar lote: {str(e)}'}), 500
@@ -1,15 +1,17 @@
 from flask import jsonify, request
 from models.usuario_model import UsuarioModel
-from config.database import get_usuarios_collection
 from utils.email_sender import send_email
+from utils.armazenamento import criar_armazenamento
 import random
 import string
-from datetime import datetime, timedelta
+import time
 import os
-import bcrypt
 
-# Armazenamento temporário de códigos (em produção, use Redis ou banco)
-_codigos_recuperacao = {}
+# Códigos de recuperação por e-mail. Com CACHE_BACKEND=mongodb ficam no banco,
+# então o código gerado em um worker vale no worker que recebe a redefinição
+_codigos_recuperacao = criar_armazenamento('recuperacao_senha')
+VALIDADE_CODIGO = 15 * 60  # segundos
+MAX_TENTATIVAS = 3
 
 class RecuperacaoSenhaController:
     
@@ -37,11 +39,11 @@ class RecuperacaoSenhaController:
             codigo = RecuperacaoSenhaController.gerar_codigo()
             
             # Armazenar código com validade de 15 minutos
-            _codigos_recuperacao[email] = {
+            _codigos_recuperacao.definir(email, {
                 'codigo': codigo,
-                'expira_em': datetime.utcnow() + timedelta(minutes=15),
+                'expira_em': time.time() + VALIDADE_CODIGO,
                 'tentativas': 0
-            }
+            }, VALIDADE_CODIGO)
             
             # Enviar e-mail real
             assunto = "Código de recuperação - GeFi"
@@ -97,42 +99,35 @@ class RecuperacaoSenhaController:
             if len(nova_senha) < 6:
                 return jsonify({'erro': 'A senha deve ter no mínimo 6 caracteres'}), 400
             
-            # Verificar se existe código para este e-mail
-            info_codigo = _codigos_recuperacao.get(email)
+            # Contar a tentativa antes de comparar (incremento atômico): requisições
+            # simultâneas não conseguem passar do limite
+            info_codigo = _codigos_recuperacao.incrementar(email, 'tentativas')
             if not info_codigo:
                 return jsonify({'erro': 'Código inválido ou expirado'}), 400
             
             # Verificar se código expirou
-            if datetime.utcnow() > info_codigo['expira_em']:
-                del _codigos_recuperacao[email]
+            if time.time() > info_codigo['expira_em']:
+                _codigos_recuperacao.remover(email)
                 return jsonify({'erro': 'Código expirado. Solicite um novo código'}), 400
             
             # Verificar tentativas (máximo 3)
-            if info_codigo['tentativas'] >= 3:
-                del _codigos_recuperacao[email]
+            if info_codigo['tentativas'] > MAX_TENTATIVAS:
+                _codigos_recuperacao.remover(email)
                 return jsonify({'erro': 'Número máximo de tentativas excedido. Solicite um novo código'}), 400
             
             # Verificar se o código está correto
             if info_codigo['codigo'] != codigo:
-                info_codigo['tentativas'] += 1
-                tentativas_restantes = 3 - info_codigo['tentativas']
+                tentativas_restantes = MAX_TENTATIVAS - info_codigo['tentativas']
                 return jsonify({
                     'erro': f'Código incorreto. {tentativas_restantes} tentativa(s) restante(s)'
                 }), 400
             
-            # Atualizar senha do usuário
-            usuarios_collection = get_usuarios_collection()
-            senha_hash = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt())
-            resultado = usuarios_collection.update_one(
-                {'email': email},
-                {'$set': {'senha': senha_hash}}
-            )
-            
-            if resultado.modified_count == 0:
+            # Atualizar senha do usuário (também invalida o cache de autenticação)
+            if not UsuarioModel.atualizar_senha_por_email(email, nova_senha):
                 return jsonify({'erro': 'Erro ao atualizar senha'}), 500
             
             # Remover código usado
-            del _codigos_recuperacao[email]
+            _codigos_recuperacao.remover(email)
             
             print(f"✅ Senha redefinida com sucesso para {email}")
             
@@ -145,13 +140,7 @@ class RecuperacaoSenhaController:
     @staticmethod
     def limpar_codigos_expirados():
         """Remove códigos expirados (executar periodicamente)"""
-        agora = datetime.utcnow()
-        emails_expirados = [
-            email for email, info in _codigos_recuperacao.items()
-            if agora > info['expira_em']
-        ]
-        for email in emails_expirados:
-            del _codigos_recuperacao[email]
+        removidos = _codigos_recuperacao.limpar_expirados()
         
-        if emails_expirados:
-            print(f"🧹 Removidos {len(emails_expirados)} códigos expirados")
+        if removidos:
+            print(f"🧹 Removidos {removidos} códigos expirados")
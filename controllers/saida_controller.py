@@ -1,32 +1,103 @@
 from flask import request, jsonify
 from models.saida_model import SaidaModel
 from datetime import datetime
+from utils.paginacao import parametros_listagem
+from utils.validators import validar_valor, converter_data
+from utils.recorrencia import FREQUENCIAS
 
 class SaidaController:
     
+    @staticmethod
+    def validar_criacao(dados):
+        """
+        Valida o corpo de criação de uma saída.
+        Retorna (campos para SaidaModel.criar, None) ou (None, mensagem de erro).
+        """
+        descricao = (dados.get('descricao') or '').strip()
+        valor = dados.get('valor', 0)
+        categoria = (dados.get('categoria') or 'Outros').strip()
+        data = dados.get('data', datetime.utcnow().isoformat())
+        frequencia = dados.get('frequencia')
+        
+        if not descricao:
+            return None, 'Descrição é obrigatória'
+        
+        if not validar_valor(valor):
+            return None, 'Valor deve ser maior que zero'
+        
+        if frequencia and frequencia not in FREQUENCIAS:
+            return None, 'Frequência deve ser mensal, semanal ou anual'
+        
+        data_obj = converter_data(data)
+        if data_obj is None:
+            return None, 'Data inválida'
+        
+        # Datas da recorrência também chegam ao model já convertidas
+        datas_recorrencia = {}
+        for campo in ('data_primeira_recorrencia', 'data_fim_recorrencia'):
+            valor_data = dados.get(campo)
+            datas_recorrencia[campo] = converter_data(valor_data) if valor_data else None
+            if valor_data and datas_recorrencia[campo] is None:
+                return None, 'Data inválida'
+        
+        return {
+            'descricao': descricao,
+            'valor': valor,
+            'categoria': categoria,
+            'data': data_obj,
+            'eh_recorrente': dados.get('eh_recorrente', False),
+            'data_primeira_recorrencia': datas_recorrencia['data_primeira_recorrencia'],
+            'frequencia': frequencia,
+            'data_fim_recorrencia': datas_recorrencia['data_fim_recorrencia']
+        }, None
+    
+    @staticmethod
+    def validar_atualizacao(dados, saida):
+        """
+        Valida o corpo de atualização de uma saída existente.
+        Retorna (campos para $set, None) ou (None, mensagem de erro).
+        """
+        atualizacao = {}
+        if 'descricao' in dados:
+            atualizacao['descricao'] = (dados['descricao'] or '').strip()
+        if 'valor' in dados:
+            if not validar_valor(dados['valor']):
+                return None, 'Valor deve ser maior que zero'
+            atualizacao['valor'] = float(dados['valor'])
+        if 'categoria' in dados:
+            atualizacao['categoria'] = (dados['categoria'] or 'Outros').strip()
+        if 'data' in dados:
+            atualizacao['data'] = converter_data(dados['data'])
+            if atualizacao['data'] is None:
+                return None, 'Data inválida'
+            if saida.get('eh_recorrente'):
+                # Em recorrentes a data é a primeira ocorrência da regra
+                atualizacao['data_primeira_recorrencia'] = atualizacao['data']
+        if 'eh_recorrente' in dados:
+            atualizacao['eh_recorrente'] = dados['eh_recorrente']
+        if 'frequencia' in dados:
+            if dados['frequencia'] not in FREQUENCIAS:
+                return None, 'Frequência deve ser mensal, semanal ou anual'
+            atualizacao['frequencia'] = dados['frequencia']
+        if 'data_fim_recorrencia' in dados:
+            data_fim = dados['data_fim_recorrencia']
+            atualizacao['data_fim_recorrencia'] = converter_data(data_fim) if data_fim else None
+            if data_fim and atualizacao['data_fim_recorrencia'] is None:
+                return None, 'Data inválida'
+        
+        return atualizacao, None
+    
     @staticmethod
     def criar(usuario_id):
         """Cria uma nova saída financeira"""
         try:
             dados = request.get_json()
             
-            descricao = dados.get('descricao', '').strip()
-            valor = dados.get('valor', 0)
-            categoria = dados.get('categoria', 'Outros').strip()
-            data = dados.get('data', datetime.utcnow().isoformat())
-            eh_recorrente = dados.get('eh_recorrente', False)
-            data_primeira_recorrencia = dados.get('data_primeira_recorrencia')
+            campos, erro = SaidaController.validar_criacao(dados)
+            if erro:
+                return jsonify({'erro': erro}), 400
             
-            if not descricao:
-                return jsonify({'erro': 'Descrição é obrigatória'}), 400
-            
-            if valor <= 0:
-                return jsonify({'erro': 'Valor deve ser maior que zero'}), 400
-            
-            # Converter data
-            data_obj = datetime.fromisoformat(data.replace('Z', '+00:00'))
-            
-            saida_id = SaidaModel.criar(usuario_id, descricao, valor, categoria, data_obj, eh_recorrente)
+            saida_id = SaidaModel.criar(usuario_id, **campos)
             
             return jsonify({
                 'mensagem': 'Saída criada com sucesso',
@@ -38,9 +109,18 @@ class SaidaController:
     
     @staticmethod
     def listar(usuario_id):
-        """Lista todas as saídas do usuário"""
+        """
+        Lista as saídas do usuário, paginadas por cursor.
+        Query: limite, cursor, inicio, fim, categoria.
+        O cursor da próxima página vai no header X-Proximo-Cursor.
+        """
         try:
-            saidas = SaidaModel.listar_por_usuario(usuario_id)
+            try:
+                parametros = parametros_listagem(request.args)
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+            
+            saidas, proximo_cursor = SaidaModel.listar_paginado(usuario_id, **parametros)
             
             saidas_formatadas = []
             for saida in saidas:
@@ -50,10 +130,14 @@ class SaidaController:
                     'valor': saida['valor'],
                     'categoria': saida['categoria'],
                     'data': saida['data'].isoformat(),
-                    'eh_recorrente': saida.get('eh_recorrente', False)
+                    'eh_recorrente': saida.get('eh_recorrente', False),
+                    'frequencia': saida.get('frequencia')
                 })
             
-            return jsonify(saidas_formatadas), 200
+            resposta = jsonify(saidas_formatadas)
+            if proximo_cursor:
+                resposta.headers['X-Proximo-Cursor'] = proximo_cursor
+            return resposta, 200
             
         except Exception as e:
             return jsonify({'erro': f'Erro ao listar saídas: {str(e)}'}), 500
@@ -69,19 +153,9 @@ class SaidaController:
             if not saida:
                 return jsonify({'erro': 'Saída não encontrada'}), 404
             
-            atualizacao = {}
-            if 'descricao' in dados:
-                atualizacao['descricao'] = dados['descricao'].strip()
-            if 'valor' in dados:
-                if dados['valor'] <= 0:
-                    return jsonify({'erro': 'Valor deve ser maior que zero'}), 400
-                atualizacao['valor'] = float(dados['valor'])
-            if 'categoria' in dados:
-                atualizacao['categoria'] = dados['categoria'].strip()
-            if 'data' in dados:
-                atualizacao['data'] = datetime.fromisoformat(dados['data'].replace('Z', '+00:00'))
-            if 'eh_recorrente' in dados:
-                atualizacao['eh_recorrente'] = dados['eh_recorrente']
+            atualizacao, erro = SaidaController.validar_atualizacao(dados, saida)
+            if erro:
+                return jsonify({'erro': erro}), 400
             
             SaidaModel.atualizar(saida_id, usuario_id, atualizacao)
             
@@ -1,25 +1,31 @@
-from flask import request, jsonify
+from flask import request, jsonify, g
 from models.usuario_model import UsuarioModel
 
 class UserController:
     
+    @staticmethod
+    def formatar(usuario):
+        """Dados públicos do usuário (sem a senha)"""
+        return {
+            'id': str(usuario['_id']),
+            'nome': usuario['nome'],
+            'email': usuario['email'],
+            'cpf': usuario['cpf'],
+            'respostas_questionario': usuario.get('respostas_questionario', {}),
+            'data_criacao': usuario['data_criacao'].isoformat()
+        }
+    
     @staticmethod
     def get_usuario(usuario_id):
         """Busca dados do usuário autenticado"""
         try:
-            usuario = UsuarioModel.buscar_por_id(usuario_id)
+            # Já carregado por token_obrigatorio
+            usuario = g.get('usuario') or UsuarioModel.buscar_por_id(usuario_id)
             
             if not usuario:
                 return jsonify({'erro': 'Usuário não encontrado'}), 404
             
-            return jsonify({
-                'id': str(usuario['_id']),
-                'nome': usuario['nome'],
-                'email': usuario['email'],
-                'cpf': usuario['cpf'],
-                'respostas_questionario': usuario.get('respostas_questionario', {}),
-                'data_criacao': usuario['data_criacao'].isoformat()
-            }), 200
+            return jsonify(UserController.formatar(usuario)), 200
             
         except Exception as e:
             return jsonify({'erro': f'Erro ao buscar usuário: {str(e)}'}), 500
@@ -0,0 +1,91 @@
+from config.database import get_entradas_collection, get_saidas_collection
+
+class AnaliseModel:
+
+    @staticmethod
+    def serie_por_periodo(usuario_id, data_inicio, data_fim, unidade):
+        """
+        Totais de entradas e saídas agrupados por intervalo ($dateTrunc) em uma
+        única agregação sobre as duas collections.
+        `unidade` é 'month', 'week' (início na segunda) ou 'day'.
+        Retorna {inicio_do_intervalo: {'entradas': total, 'saidas': total}}.
+        """
+        entradas = get_entradas_collection()
+        saidas = get_saidas_collection()
+
+        filtro = {
+            'usuario_id': usuario_id,
+            'data': {'$gte': data_inicio, '$lt': data_fim}
+        }
+        truncar = {'date': '$data', 'unit': unidade}
+        if unidade == 'week':
+            truncar['startOfWeek'] = 'monday'
+
+        pipeline = [
+            {'$match': filtro},
+            {'$project': {'_id': 0, 'valor': 1, 'data': 1, 'tipo': {'$literal': 'entradas'}}},
+            {
+                '$unionWith': {
+                    'coll': saidas.name,
+                    'pipeline': [
+                        {'$match': filtro},
+                        {'$project': {'_id': 0, 'valor': 1, 'data': 1, 'tipo': {'$literal': 'saidas'}}}
+                    ]
+                }
+            },
+            {
+                '$group': {
+                    '_id': {'intervalo': {'$dateTrunc': truncar}, 'tipo': '$tipo'},
+                    'total': {'$sum': '$valor'}
+                }
+            }
+        ]
+
+        serie = {}
+        for grupo in entradas.aggregate(pipeline):
+            intervalo = serie.setdefault(grupo['_id']['intervalo'], {'entradas': 0, 'saidas': 0})
+            intervalo[grupo['_id']['tipo']] = grupo['total']
+
+        return serie
+
+    @staticmethod
+    def historico_mensal_por_categoria(usuario_id, data_inicio, data_fim):
+        """
+        Totais mensais por tipo e categoria no período, em uma única agregação.
+        Saídas recorrentes ficam de fora: elas entram na previsão pela própria regra.
+        Retorna lista de {tipo, ano, mes, categoria, total}.
+        """
+        entradas = get_entradas_collection()
+        saidas = get_saidas_collection()
+
+        periodo = {'$gte': data_inicio, '$lt': data_fim}
+        projecao = {
+            '_id': 0,
+            'valor': 1,
+            'categoria': {'$ifNull': ['$categoria', 'Outros']},
+            'ano': {'$year': '$data'},
+            'mes': {'$month': '$data'}
+        }
+
+        pipeline = [
+            {'$match': {'usuario_id': usuario_id, 'data': periodo}},
+            {'$project': {**projecao, 'tipo': {'$literal': 'entradas'}}},
+            {
+                '$unionWith': {
+                    'coll': saidas.name,
+                    'pipeline': [
+                        {'$match': {'usuario_id': usuario_id, 'data': periodo, 'eh_recorrente': {'$ne': True}}},
+                        {'$project': {**projecao, 'tipo': {'$literal': 'saidas'}}}
+                    ]
+                }
+            },
+            {
+                '$group': {
+                    '_id': {'tipo': '$tipo', 'ano': '$ano', 'mes': '$mes', 'categoria': '$categoria'},
+                    'total': {'$sum': '$valor'}
+                }
+            },
+            {'$replaceWith': {'$mergeObjects': ['$_id', {'total': '$total'}]}}
+        ]
+
+        return list(entradas.aggregate(pipeline))
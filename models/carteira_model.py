@@ -0,0 +1,94 @@
+from datetime import datetime
+from bson import ObjectId
+from config.database import get_posicoes_collection
+from utils.cache_usuario import notificar_escrita
+
+class CarteiraModel:
+    """
+    Uma posição por (usuario_id, ticker):
+
+        {usuario_id, ticker, quantidade, custo_total,
+         lotes: [{id, data, quantidade, preco}], atualizado_em}
+
+    `quantidade` e `custo_total` são mantidos com $inc a cada lote, então o
+    preço médio (custo_total / quantidade) não precisa percorrer os lotes.
+    """
+
+    @staticmethod
+    def adicionar_lote(usuario_id, ticker, quantidade, preco, data):
+        """Registra uma compra; cria a posição se for o primeiro lote do ticker"""
+        posicoes = get_posicoes_collection()
+        lote = {
+            'id': ObjectId(),
+            'data': data,
+            'quantidade': float(quantidade),
+            'preco': float(preco),
+        }
+        posicoes.update_one(
+            {'usuario_id': usuario_id, 'ticker': ticker},
+            {
+                '$push': {'lotes': lote},
+                '$inc': {'quantidade': lote['quantidade'], 'custo_total': lote['quantidade'] * lote['preco']},
+                '$set': {'atualizado_em': datetime.utcnow()},
+            },
+            upsert=True
+        )
+        notificar_escrita(usuario_id, 'carteira')
+        return lote['id']
+
+    @staticmethod
+    def remover_lote(usuario_id, ticker, lote_id):
+        """Remove um lote e desconta do total; remove a posição se era o último"""
+        posicoes = get_posicoes_collection()
+        lote_id = ObjectId(lote_id)
+        posicao = posicoes.find_one(
+            {'usuario_id': usuario_id, 'ticker': ticker, 'lotes.id': lote_id},
+            {'lotes': {'$elemMatch': {'id': lote_id}}}
+        )
+        if not posicao:
+            return False
+
+        lote = posicao['lotes'][0]
+        # O filtro por lotes.id impede descontar duas vezes em remoções simultâneas
+        resultado = posicoes.update_one(
+            {'_id': posicao['_id'], 'lotes.id': lote_id},
+            {
+                '$pull': {'lotes': {'id': lote_id}},
+                '$inc': {'quantidade': -lote['quantidade'], 'custo_total': -lote['quantidade'] * lote['preco']},
+                '$set': {'atualizado_em': datetime.utcnow()},
+            }
+        )
+        posicoes.delete_one({'_id': posicao['_id'], 'lotes': {'$size': 0}})
+        notificar_escrita(usuario_id, 'carteira')
+        return resultado.modified_count > 0
+
+    @staticmethod
+    def deletar(usuario_id, ticker):
+        """Remove a posição inteira do ticker"""
+        posicoes = get_posicoes_collection()
+        resultado = posicoes.delete_one({'usuario_id': usuario_id, 'ticker': ticker})
+        if resultado.deleted_count:
+            notificar_escrita(usuario_id, 'carteira')
+        return resultado.deleted_count > 0
+
+    @staticmethod
+    def listar(usuario_id):
+        """Posições do usuário em ordem de ticker"""
+        posicoes = get_posicoes_collection()
+        return list(posicoes.find({'usuario_id': usuario_id}).sort('ticker', 1))
+
+    @staticmethod
+    def versao(usuario_id):
+        """
+        (posições, último atualizado_em) do usuário: muda a cada compra, remoção
+        de lote ou de posição, em qualquer processo. Consulta barata para validar
+        resultados em cache.
+        """
+        posicoes = get_posicoes_collection()
+        resultado = list(posicoes.aggregate([
+            {'$match': {'usuario_id': usuario_id}},
+            {'$group': {'_id': None, 'posicoes': {'$sum': 1}, 'atualizado_em': {'$max': '$atualizado_em'}}}
+        ]))
+        if not resultado:
+            return (0, None)
+        return (resultado[0]['posicoes'], resultado[0]['atualizado_em'])
@@ -0,0 +1,95 @@
+from datetime import datetime
+from config.database import get_cotacoes_collection
+
+# Fuso usado para alinhar os buckets (dia/semana/mês começam à meia-noite de Brasília)
+FUSO_MERCADO = 'America/Sao_Paulo'
+
+# intervalo -> (unit, binSize) do $dateTrunc e duração aproximada em segundos
+INTERVALOS = {
+    '1min': ('minute', 1, 60),
+    '5min': ('minute', 5, 300),
+    '15min': ('minute', 15, 900),
+    '30min': ('minute', 30, 1800),
+    '1h': ('hour', 1, 3600),
+    '4h': ('hour', 4, 14400),
+    '1d': ('day', 1, 86400),
+    '1sem': ('week', 1, 604800),
+    '1mes': ('month', 1, 2592000),
+}
+
+
+class CotacaoModel:
+    """
+    Histórico de cotações na collection time-series `cotacao_historico`:
+
+        {ticker, data, preco, variacao, variacao_percentual, fonte}
+
+    `ticker` é o metaField e `data` o timeField (migração 7).
+    """
+
+    @staticmethod
+    def registrar(cotacoes, data=None):
+        """Grava um ponto por ticker de {ticker: cotação}; ignora cotações sem preço"""
+        data = data or datetime.utcnow()
+        documentos = [
+            {
+                'ticker': ticker,
+                'data': data,
+                'preco': float(quote['preco']),
+                'variacao': quote.get('variacao'),
+                'variacao_percentual': quote.get('variacao_percentual'),
+                'fonte': quote.get('fonte'),
+            }
+            for ticker, quote in cotacoes.items()
+            if quote.get('preco') is not None
+        ]
+        if documentos:
+            get_cotacoes_collection().insert_many(documentos, ordered=False)
+        return len(documentos)
+
+    @staticmethod
+    def ohlc(ticker, data_inicio, data_fim, intervalo):
+        """
+        Candles (abertura, máxima, mínima, fechamento) de `ticker` em
+        [data_inicio, data_fim), agregados no servidor em buckets de `intervalo`.
+        """
+        unidade, tamanho, _ = INTERVALOS[intervalo]
+        truncar = {'date': '$data', 'unit': unidade, 'binSize': tamanho, 'timezone': FUSO_MERCADO}
+        if unidade == 'week':
+            truncar['startOfWeek'] = 'monday'
+
+        pipeline = [
+            {'$match': {'ticker': ticker, 'data': {'$gte': data_inicio, '$lt': data_fim}}},
+            {'$sort': {'data': 1}},
+            {'$group': {
+                '_id': {'$dateTrunc': truncar},
+                'abertura': {'$first': '$preco'},
+                'maxima': {'$max': '$preco'},
+                'minima': {'$min': '$preco'},
+                'fechamento': {'$last': '$preco'},
+                'amostras': {'$sum': 1},
+            }},
+            {'$sort': {'_id': 1}},
+            {'$project': {
+                '_id': 0, 'data': '$_id', 'abertura': 1, 'maxima': 1,
+                'minima': 1, 'fechamento': 1, 'amostras': 1,
+            }},
+        ]
+        return list(get_cotacoes_collection().aggregate(pipeline))
+
+    @staticmethod
+    def fechamentos_diarios(tickers, data_inicio, data_fim):
+        """Último preço de cada ticker por dia (fuso do mercado): [{ticker, data, fechamento}]"""
+        pipeline = [
+            {'$match': {'ticker': {'$in': list(tickers)}, 'data': {'$gte': data_inicio, '$lt': data_fim}}},
+            {'$sort': {'data': 1}},
+            {'$group': {
+                '_id': {
+                    'ticker': '$ticker',
+                    'dia': {'$dateTrunc': {'date': '$data', 'unit': 'day', 'timezone': FUSO_MERCADO}},
+                },
+                'fechamento': {'$last': '$preco'},
+            }},
+            {'$project': {'_id': 0, 'ticker': '$_id.ticker', 'data': '$_id.dia', 'fechamento': 1}},
+        ]
+        return list(get_cotacoes_collection().aggregate(pipeline))
@@ -1,15 +1,17 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from config.database import get_entradas_collection
+from utils.paginacao import paginar, filtro_periodo
+from models.resumo_mensal_model import ResumoMensalModel
+from utils.cache_usuario import notificar_escrita
 
 class EntradaModel:
     
     @staticmethod
-    def criar(usuario_id, descricao, valor, categoria, data):
-        """Cria uma nova entrada"""
-        entradas = get_entradas_collection()
-        
-        nova_entrada = {
+    def montar(usuario_id, descricao, valor, categoria, data):
+        """Monta o documento de uma nova entrada (sem gravar)"""
+        return {
             'usuario_id': usuario_id,
             'descricao': descricao,
             'valor': float(valor),
@@ -17,8 +19,17 @@ class EntradaModel:
             'data': data,
             'criado_em': datetime.utcnow()
         }
+    
+    @staticmethod
+    def criar(usuario_id, descricao, valor, categoria, data):
+        """Cria uma nova entrada"""
+        entradas = get_entradas_collection()
+        
+        nova_entrada = EntradaModel.montar(usuario_id, descricao, valor, categoria, data)
         
         resultado = entradas.insert_one(nova_entrada)
+        ResumoMensalModel.registrar(usuario_id, 'entradas', nova_entrada)
+        notificar_escrita(usuario_id, 'entradas')
         return resultado.inserted_id
     
     @staticmethod
@@ -27,6 +38,16 @@ class EntradaModel:
         entradas = get_entradas_collection()
         return list(entradas.find({'usuario_id': usuario_id}).sort('data', -1))
     
+    @staticmethod
+    def listar_paginado(usuario_id, limite, cursor=None, data_inicio=None, data_fim=None, categoria=None):
+        """
+        Lista entradas do usuário por página (keyset em data/_id).
+        Retorna (documentos, proximo_cursor).
+        """
+        entradas = get_entradas_collection()
+        filtro = filtro_periodo(usuario_id, data_inicio, data_fim, categoria)
+        return paginar(entradas, filtro, limite, cursor)
+    
     @staticmethod
     def buscar_por_id(entrada_id, usuario_id):
         """Busca uma entrada específica do usuário"""
@@ -41,22 +62,31 @@ class EntradaModel:
         """Atualiza uma entrada"""
         entradas = get_entradas_collection()
         
-        entradas.update_one(
+        anterior = entradas.find_one_and_update(
             {'_id': ObjectId(entrada_id), 'usuario_id': usuario_id},
-            {'$set': dados}
+            {'$set': dados},
+            return_document=ReturnDocument.BEFORE
         )
+        if anterior:
+            ResumoMensalModel.substituir(usuario_id, 'entradas', anterior, {**anterior, **dados})
+            notificar_escrita(usuario_id, 'entradas')
     
     @staticmethod
     def deletar(entrada_id, usuario_id):
         """Deleta uma entrada"""
         entradas = get_entradas_collection()
         
-        resultado = entradas.delete_one({
+        removida = entradas.find_one_and_delete({
             '_id': ObjectId(entrada_id),
             'usuario_id': usuario_id
         })
         
-        return resultado.deleted_count > 0
+        if not removida:
+            return False
+        
+        ResumoMensalModel.registrar(usuario_id, 'entradas', removida, sinal=-1)
+        notificar_escrita(usuario_id, 'entradas')
+        return True
     
     @staticmethod
     def buscar_por_periodo(usuario_id, data_inicio, data_fim):
@@ -0,0 +1,41 @@
+import heapq
+from datetime import datetime
+from pymongo import ASCENDING
+from config.database import get_entradas_collection, get_saidas_collection
+from utils.paginacao import filtro_periodo
+
+# Documentos trazidos do servidor por round trip
+TAMANHO_BATCH = 500
+
+# Só os campos exportados
+PROJECAO = {
+    '_id': 1, 'descricao': 1, 'valor': 1, 'categoria': 1, 'data': 1,
+    'eh_recorrente': 1, 'frequencia': 1,
+}
+
+class ExportacaoModel:
+
+    @staticmethod
+    def _cursor(collection, filtro, tipo):
+        # (data, _id) crescentes: percorre o índice (usuario_id, data, _id) de trás pra frente
+        cursor = (
+            collection.find(filtro, PROJECAO)
+            .sort([('data', ASCENDING), ('_id', ASCENDING)])
+            .batch_size(TAMANHO_BATCH)
+        )
+        for documento in cursor:
+            yield tipo, documento
+
+    @staticmethod
+    def transacoes(usuario_id, data_inicio=None, data_fim=None, categoria=None):
+        """
+        Gera (tipo, documento) de entradas e saídas do usuário em ordem cronológica.
+        As duas collections são lidas por cursores e intercaladas sem carregar o
+        histórico em memória.
+        """
+        filtro = filtro_periodo(usuario_id, data_inicio, data_fim, categoria)
+        return heapq.merge(
+            ExportacaoModel._cursor(get_entradas_collection(), filtro, 'entrada'),
+            ExportacaoModel._cursor(get_saidas_collection(), filtro, 'saida'),
+            key=lambda item: (item[1].get('data') or datetime.min, item[1]['_id'])
+        )
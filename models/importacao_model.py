@@ -0,0 +1,84 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from pymongo.errors import BulkWriteError
+from models.resumo_mensal_model import ResumoMensalModel
+from utils.importacao import chave_conteudo
+
+# Código do MongoDB para violação de índice único
+_CHAVE_DUPLICADA = 11000
+
+class ImportacaoModel:
+    """
+    Grava transações importadas de extratos. Duas deduplicações:
+
+    - Entre importações: índice único (usuario_id, hash_importacao); o que já
+      foi importado é rejeitado pelo servidor.
+    - Contra lançamentos manuais: uma linha com o mesmo dia, valor e descrição
+      (sem acento/caixa) de uma transação cadastrada à mão é pulada. Cada
+      lançamento casa com uma linha só, então duas compras iguais no extrato e
+      uma cadastrada gravam uma.
+
+    Os dois casos são contados como duplicados.
+    """
+
+    @staticmethod
+    def _lancamentos_manuais(usuario_id, collection, documentos):
+        """Contagem por chave_conteudo das transações manuais nos dias do lote (índice usuario_id/data)"""
+        datas = [doc['data'] for doc in documentos]
+        inicio = datetime.combine(min(datas).date(), time())
+        fim = datetime.combine(max(datas).date(), time()) + timedelta(days=1)
+        existentes = collection.find(
+            {
+                'usuario_id': usuario_id,
+                'data': {'$gte': inicio, '$lt': fim},
+                'hash_importacao': {'$exists': False}
+            },
+            {'_id': 0, 'data': 1, 'valor': 1, 'descricao': 1}
+        )
+        return Counter(
+            chave_conteudo(doc['data'], doc.get('valor', 0), doc.get('descricao'))
+            for doc in existentes
+            if isinstance(doc.get('data'), datetime)
+        )
+
+    @staticmethod
+    def inserir_lote(usuario_id, tipo, collection, documentos):
+        """
+        Insere `documentos` com um insert_many não ordenado e atualiza o resumo mensal
+        só com o que foi gravado. Retorna (inseridos, duplicados, erros), onde `erros`
+        é uma lista de (posição no lote, mensagem).
+        """
+        if not documentos:
+            return 0, 0, []
+
+        manuais = ImportacaoModel._lancamentos_manuais(usuario_id, collection, documentos)
+        posicoes = []
+        for posicao, doc in enumerate(documentos):
+            chave = chave_conteudo(doc['data'], doc['valor'], doc['descricao'])
+            if manuais[chave] > 0:
+                manuais[chave] -= 1
+            else:
+                posicoes.append(posicao)
+        ja_lancados = len(documentos) - len(posicoes)
+        if not posicoes:
+            return 0, ja_lancados, []
+
+        rejeitados = {}
+        try:
+            collection.insert_many([documentos[posicao] for posicao in posicoes], ordered=False)
+        except BulkWriteError as e:
+            for erro in e.details.get('writeErrors', []):
+                rejeitados[posicoes[erro['index']]] = erro
+
+        duplicados = sum(1 for erro in rejeitados.values() if erro.get('code') == _CHAVE_DUPLICADA)
+        erros = [
+            (posicao, erro.get('errmsg', 'Erro ao gravar'))
+            for posicao, erro in rejeitados.items()
+            if erro.get('code') != _CHAVE_DUPLICADA
+        ]
+
+        gravados = [documentos[posicao] for posicao in posicoes if posicao not in rejeitados]
+        if gravados:
+            ResumoMensalModel.registrar_varios(usuario_id, tipo, [(doc, 1) for doc in gravados])
+
+        return len(gravados), duplicados + ja_lancados, erros
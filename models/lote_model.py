@@ -0,0 +1,100 @@
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+from models.resumo_mensal_model import ResumoMensalModel
+from utils.cache_usuario import notificar_escrita
+
+class LoteModel:
+    """
+    Executa um lote de operações (criar/atualizar/deletar) em uma collection de
+    transações com um find dos documentos afetados e um bulk_write não ordenado.
+    """
+
+    @staticmethod
+    def executar(usuario_id, tipo, collection, operacoes, validar_atualizacao):
+        """
+        `operacoes`: lista de dicts {indice, op, id (ObjectId), documento (criar), dados (atualizar)}.
+        `validar_atualizacao(dados, existente)` devolve (campos para $set, erro), as mesmas
+        regras do endpoint individual.
+        Operações sobre o mesmo id são aplicadas em ordem sobre o estado do lote e
+        viram um único comando por documento. Retorna {indice: resultado}.
+        """
+        resultados = {}
+        ids = [op['id'] for op in operacoes if op['op'] != 'criar']
+        existentes = {}
+        if ids:
+            existentes = {
+                doc['_id']: doc
+                for doc in collection.find({'_id': {'$in': ids}, 'usuario_id': usuario_id})
+            }
+
+        # Estado de cada documento tocado: {_id: {'atual', 'set', 'deletar', 'indices'}}
+        estados = {}
+        comandos = []
+        # Para cada comando: (índices das operações de origem, alterações no resumo mensal)
+        origens = []
+
+        for op in operacoes:
+            indice = op['indice']
+
+            if op['op'] == 'criar':
+                documento = op['documento']
+                comandos.append(InsertOne(documento))
+                origens.append(([indice], [(documento, 1)]))
+                resultados[indice] = {'status': 201, 'id': str(documento['_id'])}
+                continue
+
+            estado = estados.get(op['id'])
+            if estado is None and op['id'] in existentes:
+                estado = estados[op['id']] = {
+                    'atual': dict(existentes[op['id']]), 'set': {}, 'deletar': False, 'indices': []
+                }
+            if estado is None or estado['deletar']:
+                resultados[indice] = {'status': 404, 'erro': 'Registro não encontrado'}
+                continue
+
+            if op['op'] == 'deletar':
+                estado['deletar'] = True
+            else:
+                campos, erro = validar_atualizacao(op.get('dados') or {}, estado['atual'])
+                if erro:
+                    resultados[indice] = {'status': 400, 'erro': erro}
+                    continue
+                estado['set'].update(campos)
+                estado['atual'].update(campos)
+
+            estado['indices'].append(indice)
+            resultados[indice] = {'status': 200, 'id': str(op['id'])}
+
+        for documento_id, estado in estados.items():
+            filtro = {'_id': documento_id, 'usuario_id': usuario_id}
+            anterior = existentes[documento_id]
+            if estado['deletar']:
+                comandos.append(DeleteOne(filtro))
+                origens.append((estado['indices'], [(anterior, -1)]))
+            elif estado['set']:
+                comandos.append(UpdateOne(filtro, {'$set': estado['set']}))
+                origens.append((estado['indices'], [(anterior, -1), (estado['atual'], 1)]))
+
+        falhas = set()
+        if comandos:
+            try:
+                collection.bulk_write(comandos, ordered=False)
+            except BulkWriteError as e:
+                for erro in e.details.get('writeErrors', []):
+                    falhas.add(erro['index'])
+                    for indice in origens[erro['index']][0]:
+                        resultados[indice] = {'status': 500, 'erro': erro.get('errmsg', 'Erro ao gravar')}
+
+        # Resumo mensal em um único bulk_write, só com o que foi gravado
+        alteracoes = [
+            alteracao
+            for posicao, (_, alteracoes_comando) in enumerate(origens)
+            if posicao not in falhas
+            for alteracao in alteracoes_comando
+        ]
+        if alteracoes:
+            ResumoMensalModel.registrar_varios(usuario_id, tipo, alteracoes)
+        if comandos:
+            notificar_escrita(usuario_id, tipo)
+
+        return resultados
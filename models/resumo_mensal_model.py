@@ -0,0 +1,235 @@
+from datetime import datetime, timezone
+from pymongo import UpdateOne, ReplaceOne
+from bson import ObjectId
+from config.database import (
+    get_resumo_mensal_collection, get_entradas_collection, get_saidas_collection, get_usuarios_collection
+)
+
+class ResumoMensalModel:
+    """
+    Resumo materializado por (usuario_id, ano, mes):
+
+        {usuario_id, ano, mes,
+         total_entradas, quantidade_entradas, total_saidas, quantidade_saidas,
+         categorias_entradas: {<categoria>: {total, quantidade}},
+         categorias_saidas:   {<categoria>: {total, quantidade}}}
+
+    Mantido com $inc (upsert) a cada escrita dos models de entrada/saída.
+    As duas escritas não são transacionais; `reconstruir` corrige qualquer divergência.
+
+    O resumo só vale para usuários com `resumo_mensal_em` (marcado por
+    `reconstruir` ou na criação da conta). Antes disso os $inc cobrem só as
+    escritas novas, então `obter` e `saldo` somam direto das transações.
+    """
+
+    CAMPO_CARREGADO = 'resumo_mensal_em'
+
+    @staticmethod
+    def _chave_categoria(categoria):
+        """Escapa '.' e '$' inicial, que não são válidos em caminhos de campo"""
+        chave = (categoria or 'Outros').replace('.', '．')
+        if chave.startswith('$'):
+            chave = '＄' + chave[1:]
+        return chave
+
+    @staticmethod
+    def _nome_categoria(chave):
+        return chave.replace('．', '.').replace('＄', '$', 1)
+
+    @staticmethod
+    def _ano_mes(data):
+        """Ano/mês em UTC (mesmo critério dos filtros de período)"""
+        if data.tzinfo is not None:
+            data = data.astimezone(timezone.utc)
+        return data.year, data.month
+
+    @staticmethod
+    def _operacao(usuario_id, tipo, data, valor, categoria, sinal):
+        ano, mes = ResumoMensalModel._ano_mes(data)
+        chave = ResumoMensalModel._chave_categoria(categoria)
+        return UpdateOne(
+            {'usuario_id': usuario_id, 'ano': ano, 'mes': mes},
+            {
+                '$inc': {
+                    f'total_{tipo}': sinal * float(valor),
+                    f'quantidade_{tipo}': sinal,
+                    f'categorias_{tipo}.{chave}.total': sinal * float(valor),
+                    f'categorias_{tipo}.{chave}.quantidade': sinal
+                },
+                '$set': {'atualizado_em': datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def registrar(usuario_id, tipo, documento, sinal=1):
+        """
+        Soma (sinal=1) ou subtrai (sinal=-1) um documento de entrada/saída do resumo.
+        `tipo` é 'entradas' ou 'saidas'.
+        """
+        ResumoMensalModel.registrar_varios(usuario_id, tipo, [(documento, sinal)])
+
+    @staticmethod
+    def substituir(usuario_id, tipo, anterior, atual):
+        """Troca a contribuição de um documento atualizado (remove a antiga, soma a nova)"""
+        ResumoMensalModel.registrar_varios(usuario_id, tipo, [(anterior, -1), (atual, 1)])
+
+    @staticmethod
+    def registrar_varios(usuario_id, tipo, alteracoes):
+        """Aplica uma lista de (documento, sinal) em um único bulk_write"""
+        operacoes = [
+            ResumoMensalModel._operacao(
+                usuario_id, tipo, documento['data'], documento.get('valor', 0),
+                documento.get('categoria'), sinal
+            )
+            for documento, sinal in alteracoes
+            if documento and isinstance(documento.get('data'), datetime)
+        ]
+        if operacoes:
+            get_resumo_mensal_collection().bulk_write(operacoes, ordered=True)
+
+    @staticmethod
+    def buscar(usuario_id, ano, mes):
+        """Busca o resumo do mês (None se não houver movimentação)"""
+        resumos = get_resumo_mensal_collection()
+        return resumos.find_one({'usuario_id': usuario_id, 'ano': ano, 'mes': mes})
+
+    @staticmethod
+    def categorias(resumo, tipo='saidas'):
+        """Lista [{categoria, total, quantidade}] do resumo, maior total primeiro"""
+        if not resumo:
+            return []
+        categorias = [
+            {
+                'categoria': ResumoMensalModel._nome_categoria(chave),
+                'total': valores.get('total', 0),
+                'quantidade': valores.get('quantidade', 0)
+            }
+            for chave, valores in resumo.get(f'categorias_{tipo}', {}).items()
+            if valores.get('quantidade', 0) > 0
+        ]
+        categorias.sort(key=lambda c: c['total'], reverse=True)
+        return categorias
+
+    @staticmethod
+    def reconstruir(usuario_id=None):
+        """
+        Recalcula os resumos a partir das transações (de um usuário ou de todos).
+        Cada (usuario_id, ano, mes) é substituído no lugar (ReplaceOne com upsert)
+        e só depois são removidos os meses que não têm mais transações, então o
+        resumo nunca fica vazio no meio da reconstrução. Um $inc concorrente que
+        chegue entre a leitura das transações e a substituição pode se perder:
+        rode fora do horário de uso (`python -m config.migrations reconstruir-resumo`).
+        Retorna a quantidade de resumos gerados.
+        """
+        resumos = get_resumo_mensal_collection()
+        filtro = {'usuario_id': usuario_id} if usuario_id else {}
+        documentos = ResumoMensalModel._agregar(filtro)
+
+        if documentos:
+            resumos.bulk_write([
+                ReplaceOne({'usuario_id': doc['usuario_id'], 'ano': doc['ano'], 'mes': doc['mes']}, doc, upsert=True)
+                for doc in documentos.values()
+            ], ordered=False)
+
+        obsoletos = [
+            resumo['_id']
+            for resumo in resumos.find(filtro, {'usuario_id': 1, 'ano': 1, 'mes': 1})
+            if (resumo.get('usuario_id'), resumo.get('ano'), resumo.get('mes')) not in documentos
+        ]
+        if obsoletos:
+            resumos.delete_many({'_id': {'$in': obsoletos}})
+
+        # A partir daqui os leitores confiam no resumo (o cache de autenticação
+        # pode levar até AUTH_USER_CACHE_TTL para ver a marca)
+        if not usuario_id or ObjectId.is_valid(usuario_id):
+            get_usuarios_collection().update_many(
+                {'_id': ObjectId(usuario_id)} if usuario_id else {},
+                {'$set': {ResumoMensalModel.CAMPO_CARREGADO: datetime.utcnow()}}
+            )
+        return len(documentos)
+
+    @staticmethod
+    def _agregar(filtro):
+        """Resumos {(usuario_id, ano, mes): documento} somados das transações que casam com `filtro`"""
+        pipeline = [
+            {'$match': {**filtro, 'data': {'$type': 'date', **filtro.get('data', {})}}},
+            {
+                '$group': {
+                    '_id': {
+                        'usuario_id': '$usuario_id',
+                        'ano': {'$year': '$data'},
+                        'mes': {'$month': '$data'},
+                        'categoria': '$categoria'
+                    },
+                    'total': {'$sum': '$valor'},
+                    'quantidade': {'$sum': 1}
+                }
+            }
+        ]
+
+        documentos = {}
+        for tipo, collection in (('entradas', get_entradas_collection()), ('saidas', get_saidas_collection())):
+            for grupo in collection.aggregate(pipeline):
+                chave = (grupo['_id']['usuario_id'], grupo['_id']['ano'], grupo['_id']['mes'])
+                doc = documentos.setdefault(chave, {
+                    'usuario_id': chave[0], 'ano': chave[1], 'mes': chave[2],
+                    'total_entradas': 0, 'quantidade_entradas': 0,
+                    'total_saidas': 0, 'quantidade_saidas': 0,
+                    'categorias_entradas': {}, 'categorias_saidas': {},
+                    'atualizado_em': datetime.utcnow()
+                })
+                doc[f'total_{tipo}'] += grupo['total']
+                doc[f'quantidade_{tipo}'] += grupo['quantidade']
+                # Sem categoria, '' e 'Outros' caem na mesma chave, como no $inc
+                categoria = ResumoMensalModel._chave_categoria(grupo['_id'].get('categoria'))
+                subtotal = doc[f'categorias_{tipo}'].setdefault(categoria, {'total': 0, 'quantidade': 0})
+                subtotal['total'] += grupo['total']
+                subtotal['quantidade'] += grupo['quantidade']
+        return documentos
+
+    @staticmethod
+    def carregado(usuario):
+        """True se os resumos do usuário já cobrem todo o histórico"""
+        return bool(usuario and usuario.get(ResumoMensalModel.CAMPO_CARREGADO))
+
+    @staticmethod
+    def obter(usuario, ano, mes):
+        """
+        Resumo do mês de `usuario` (documento do usuário): o materializado se
+        já foi carregado, senão somado das transações. None sem movimentação.
+        """
+        usuario_id = str(usuario['_id'])
+        if ResumoMensalModel.carregado(usuario):
+            return ResumoMensalModel.buscar(usuario_id, ano, mes)
+        inicio = datetime(ano, mes, 1)
+        fim = datetime(ano + mes // 12, mes % 12 + 1, 1)
+        documentos = ResumoMensalModel._agregar({'usuario_id': usuario_id, 'data': {'$gte': inicio, '$lt': fim}})
+        return documentos.get((usuario_id, ano, mes))
+
+    @staticmethod
+    def saldo(usuario):
+        """Saldo de todo o histórico de `usuario`, com o mesmo critério de `obter`"""
+        usuario_id = str(usuario['_id'])
+        if ResumoMensalModel.carregado(usuario):
+            return ResumoMensalModel.saldo_acumulado(usuario_id)
+        documentos = ResumoMensalModel._agregar({'usuario_id': usuario_id}).values()
+        return sum(doc['total_entradas'] - doc['total_saidas'] for doc in documentos)
+
+    @staticmethod
+    def saldo_acumulado(usuario_id):
+        """Saldo de todo o histórico do usuário (soma dos resumos)"""
+        resumos = get_resumo_mensal_collection()
+        resultado = list(resumos.aggregate([
+            {'$match': {'usuario_id': usuario_id}},
+            {
+                '$group': {
+                    '_id': None,
+                    'entradas': {'$sum': '$total_entradas'},
+                    'saidas': {'$sum': '$total_saidas'}
+                }
+            }
+        ]))
+        if not resultado:
+            return 0
+        return resultado[0]['entradas'] - resultado[0]['saidas']
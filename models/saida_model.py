@@ -1,18 +1,23 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from config.database import get_saidas_collection
+from utils.paginacao import paginar, filtro_periodo
+from models.resumo_mensal_model import ResumoMensalModel
+from utils import recorrencia
+from utils.cache_usuario import notificar_escrita
 
 class SaidaModel:
     
     @staticmethod
-    def criar(usuario_id, descricao, valor, categoria, data=None, eh_recorrente=False, data_primeira_recorrencia=None):
+    def montar(usuario_id, descricao, valor, categoria, data=None, eh_recorrente=False, data_primeira_recorrencia=None,
+               frequencia=None, data_fim_recorrencia=None):
         """
-        Cria uma nova saída.
+        Monta o documento de uma nova saída (sem gravar).
         - Se for recorrente, usa a data da primeira recorrência vinda do DatePicker.
+        - Recorrentes guardam a regra: frequencia (mensal/semanal/anual) e data_fim_recorrencia opcional.
         - Converte strings de data ISO (ex: '2025-11-05T00:00:00.000Z') para datetime.
         """
-        saidas = get_saidas_collection()
-
         # Se a saída for recorrente e vier a data da primeira recorrência, ela substitui 'data'
         if eh_recorrente and data_primeira_recorrencia:
             data = data_primeira_recorrencia
@@ -48,8 +53,28 @@ class SaidaModel:
         # Adiciona campo separado para registro de recorrência
         if eh_recorrente:
             nova_saida['data_primeira_recorrencia'] = data_primeira or data
+            nova_saida['frequencia'] = frequencia or recorrencia.FREQUENCIA_PADRAO
+            if data_fim_recorrencia:
+                if isinstance(data_fim_recorrencia, str):
+                    data_fim_recorrencia = datetime.fromisoformat(data_fim_recorrencia.replace("Z", ""))
+                nova_saida['data_fim_recorrencia'] = data_fim_recorrencia
+
+        return nova_saida
+    
+    @staticmethod
+    def criar(usuario_id, descricao, valor, categoria, data=None, eh_recorrente=False, data_primeira_recorrencia=None,
+              frequencia=None, data_fim_recorrencia=None):
+        """Cria uma nova saída (veja `montar` para as regras de data e recorrência)"""
+        saidas = get_saidas_collection()
+
+        nova_saida = SaidaModel.montar(
+            usuario_id, descricao, valor, categoria, data, eh_recorrente,
+            data_primeira_recorrencia, frequencia, data_fim_recorrencia
+        )
 
         resultado = saidas.insert_one(nova_saida)
+        ResumoMensalModel.registrar(usuario_id, 'saidas', nova_saida)
+        notificar_escrita(usuario_id, 'saidas')
         return resultado.inserted_id
     
     @staticmethod
@@ -58,6 +83,16 @@ class SaidaModel:
         saidas = get_saidas_collection()
         return list(saidas.find({'usuario_id': usuario_id}).sort('data', -1))
     
+    @staticmethod
+    def listar_paginado(usuario_id, limite, cursor=None, data_inicio=None, data_fim=None, categoria=None):
+        """
+        Lista saídas do usuário por página (keyset em data/_id).
+        Retorna (documentos, proximo_cursor).
+        """
+        saidas = get_saidas_collection()
+        filtro = filtro_periodo(usuario_id, data_inicio, data_fim, categoria)
+        return paginar(saidas, filtro, limite, cursor)
+    
     @staticmethod
     def buscar_por_id(saida_id, usuario_id):
         """Busca uma saída específica do usuário"""
@@ -71,20 +106,30 @@ class SaidaModel:
     def atualizar(saida_id, usuario_id, dados):
         """Atualiza uma saída"""
         saidas = get_saidas_collection()
-        saidas.update_one(
+        anterior = saidas.find_one_and_update(
             {'_id': ObjectId(saida_id), 'usuario_id': usuario_id},
-            {'$set': dados}
+            {'$set': dados},
+            return_document=ReturnDocument.BEFORE
         )
+        if anterior:
+            ResumoMensalModel.substituir(usuario_id, 'saidas', anterior, {**anterior, **dados})
+            notificar_escrita(usuario_id, 'saidas')
     
     @staticmethod
     def deletar(saida_id, usuario_id):
         """Deleta uma saída"""
         saidas = get_saidas_collection()
-        resultado = saidas.delete_one({
+        removida = saidas.find_one_and_delete({
             '_id': ObjectId(saida_id),
             'usuario_id': usuario_id
         })
-        return resultado.deleted_count > 0
+        
+        if not removida:
+            return False
+        
+        ResumoMensalModel.registrar(usuario_id, 'saidas', removida, sinal=-1)
+        notificar_escrita(usuario_id, 'saidas')
+        return True
     
     @staticmethod
     def buscar_por_periodo(usuario_id, data_inicio, data_fim):
@@ -95,6 +140,37 @@ class SaidaModel:
             'data': {'$gte': data_inicio, '$lt': data_fim}
         }))
     
+    @staticmethod
+    def listar_recorrentes(usuario_id):
+        """Lista as regras das saídas recorrentes do usuário (expandidas por utils.recorrencia)"""
+        saidas = get_saidas_collection()
+        return list(saidas.find(
+            {'usuario_id': usuario_id, 'eh_recorrente': True},
+            {
+                'descricao': 1, 'valor': 1, 'categoria': 1, 'data': 1, 'eh_recorrente': 1,
+                'data_primeira_recorrencia': 1, 'frequencia': 1, 'data_fim_recorrencia': 1
+            }
+        ))
+    
+    @staticmethod
+    def proximas_ocorrencias(usuario_id, quantidade, a_partir_de):
+        """Próximas ocorrências das saídas recorrentes: lista de (data, saida)"""
+        a_partir_de = a_partir_de.replace(hour=0, minute=0, second=0, microsecond=0)
+        return recorrencia.consultar(
+            usuario_id, SaidaModel.listar_recorrentes,
+            ('proximas', quantidade, a_partir_de),
+            lambda saidas: recorrencia.proximas(saidas, quantidade, a_partir_de)
+        )
+    
+    @staticmethod
+    def ocorrencias_no_intervalo(usuario_id, data_inicio, data_fim):
+        """Ocorrências das saídas recorrentes em [data_inicio, data_fim): lista de (data, saida)"""
+        return recorrencia.consultar(
+            usuario_id, SaidaModel.listar_recorrentes,
+            ('intervalo', data_inicio, data_fim),
+            lambda saidas: recorrencia.no_intervalo(saidas, data_inicio, data_fim)
+        )
+    
     @staticmethod
     def buscar_recorrentes_proximas(usuario_id, data_inicio, data_fim, limite=5):
         """Busca próximas saídas recorrentes"""
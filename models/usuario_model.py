@@ -1,8 +1,23 @@
 from datetime import datetime
 from bson import ObjectId
 from config.database import get_usuarios_collection
+from utils import metricas
+from collections import OrderedDict
+import threading
+import time
+import os
 import bcrypt
 
+# Cache dos usuários autenticados (usado por token_obrigatorio).
+# Invalidado nas escritas deste model; o TTL limita a defasagem entre workers.
+_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+_CACHE_MAX = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_estatisticas = {'hits': 0, 'misses': 0, 'invalidacoes': 0}
+
+metricas.registrar('cache_usuarios', lambda: {**_estatisticas, 'tamanho': len(_cache), 'ttl': _CACHE_TTL})
+
 class UsuarioModel:
     
     @staticmethod
@@ -16,7 +31,9 @@ class UsuarioModel:
             'cpf': cpf,
             'senha': bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt()),
             'respostas_questionario': {},
-            'data_criacao': datetime.utcnow()
+            'data_criacao': datetime.utcnow(),
+            # Conta nova: todas as transações passam pelo resumo mensal
+            'resumo_mensal_em': datetime.utcnow()
         }
         
         resultado = usuarios.insert_one(novo_usuario)
@@ -34,6 +51,34 @@ class UsuarioModel:
         usuarios = get_usuarios_collection()
         return usuarios.find_one({'_id': ObjectId(usuario_id)})
     
+    @staticmethod
+    def buscar_autenticado(usuario_id):
+        """Busca usuário por ID passando pelo cache LRU/TTL (usado na autenticação)"""
+        agora = time.monotonic()
+        with _cache_lock:
+            item = _cache.get(usuario_id)
+            if item and item[1] > agora:
+                _cache.move_to_end(usuario_id)
+                _estatisticas['hits'] += 1
+                return item[0]
+            _estatisticas['misses'] += 1
+        
+        usuario = UsuarioModel.buscar_por_id(usuario_id)
+        if usuario:
+            with _cache_lock:
+                _cache[usuario_id] = (usuario, agora + _CACHE_TTL)
+                _cache.move_to_end(usuario_id)
+                while len(_cache) > _CACHE_MAX:
+                    _cache.popitem(last=False)
+        return usuario
+    
+    @staticmethod
+    def invalidar_cache(usuario_id):
+        """Remove o usuário do cache de autenticação"""
+        with _cache_lock:
+            _estatisticas['invalidacoes'] += 1
+            _cache.pop(str(usuario_id), None)
+    
     @staticmethod
     def buscar_por_cpf(cpf):
         """Busca usuário por CPF"""
@@ -50,6 +95,7 @@ class UsuarioModel:
             {'_id': ObjectId(usuario_id)},
             {'$set': {'senha': senha_hash}}
         )
+        UsuarioModel.invalidar_cache(usuario_id)
     
     @staticmethod
     def salvar_questionario(usuario_id, respostas):
@@ -60,6 +106,24 @@ class UsuarioModel:
             {'_id': ObjectId(usuario_id)},
             {'$set': {'respostas_questionario': respostas}}
         )
+        UsuarioModel.invalidar_cache(usuario_id)
+    
+    @staticmethod
+    def atualizar_senha_por_email(email, nova_senha):
+        """Atualiza a senha pelo email (recuperação de senha). Retorna True se alterou"""
+        usuarios = get_usuarios_collection()
+        senha_hash = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt())
+        
+        usuario = usuarios.find_one_and_update(
+            {'email': email.lower()},
+            {'$set': {'senha': senha_hash}},
+            projection={'_id': 1}
+        )
+        if not usuario:
+            return False
+        
+        UsuarioModel.invalidar_cache(usuario['_id'])
+        return True
     
     @staticmethod
     def verificar_senha(senha, senha_hash):
@@ -9,6 +9,16 @@ analise_bp = Blueprint('analise', __name__)
 def calcular_balanco(usuario_id):
     return AnaliseController.calcular_balanco(usuario_id)
 
+@analise_bp.route('/balanco/serie', methods=['GET'])
+@token_obrigatorio
+def serie_balanco(usuario_id):
+    return AnaliseController.serie_balanco(usuario_id)
+
+@analise_bp.route('/previsao', methods=['GET'])
+@token_obrigatorio
+def previsao(usuario_id):
+    return AnaliseController.previsao(usuario_id)
+
 @analise_bp.route('/proximas-saidas', methods=['GET'])
 @token_obrigatorio
 def proximas_saidas(usuario_id):
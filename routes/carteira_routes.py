@@ -0,0 +1,30 @@
+from flask import Blueprint
+from controllers.carteira_controller import CarteiraController
+from utils.auth import token_obrigatorio
+
+carteira_bp = Blueprint('carteira', __name__)
+
+@carteira_bp.route('/carteira', methods=['GET'])
+@token_obrigatorio
+def listar_carteira(usuario_id):
+    return CarteiraController.listar(usuario_id)
+
+@carteira_bp.route('/carteira/lote', methods=['POST'])
+@token_obrigatorio
+def adicionar_lote(usuario_id):
+    return CarteiraController.adicionar_lote(usuario_id)
+
+@carteira_bp.route('/carteira/<ticker>/lote/<lote_id>', methods=['DELETE'])
+@token_obrigatorio
+def remover_lote(usuario_id, ticker, lote_id):
+    return CarteiraController.remover_lote(usuario_id, ticker, lote_id)
+
+@carteira_bp.route('/carteira/<ticker>', methods=['DELETE'])
+@token_obrigatorio
+def deletar_posicao(usuario_id, ticker):
+    return CarteiraController.deletar(usuario_id, ticker)
+
+@carteira_bp.route('/carteira/avaliacao', methods=['GET'])
+@token_obrigatorio
+def avaliar_carteira(usuario_id):
+    return CarteiraController.avaliar(usuario_id)
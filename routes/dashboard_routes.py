@@ -0,0 +1,10 @@
+from flask import Blueprint
+from controllers.dashboard_controller import DashboardController
+from utils.auth import token_obrigatorio
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@token_obrigatorio
+def carregar_dashboard(usuario_id):
+    return DashboardController.carregar(usuario_id)
@@ -0,0 +1,10 @@
+from flask import Blueprint
+from controllers.exportacao_controller import ExportacaoController
+from utils.auth import token_obrigatorio
+
+exportacao_bp = Blueprint('exportacao', __name__)
+
+@exportacao_bp.route('/exportar', methods=['GET'])
+@token_obrigatorio
+def exportar(usuario_id):
+    return ExportacaoController.exportar(usuario_id)
@@ -0,0 +1,10 @@
+from flask import Blueprint
+from controllers.importacao_controller import ImportacaoController
+from utils.auth import token_obrigatorio
+
+importacao_bp = Blueprint('importacao', __name__)
+
+@importacao_bp.route('/importar', methods=['POST'])
+@token_obrigatorio
+def importar_extrato(usuario_id):
+    return ImportacaoController.importar(usuario_id)
@@ -11,12 +11,25 @@ def listar_investimentos(usuario_id):
     return InvestimentoController.listar()
 
 
+@investimento_bp.route("/investimentos/visao-geral", methods=["GET"])
+@token_obrigatorio
+def visao_geral_investimentos(usuario_id):
+    """Cotações, ações em alta e Tesouro em uma chamada (buscas em paralelo)"""
+    return InvestimentoController.visao_geral()
+
+
 @investimento_bp.route("/investimentos/cotacao", methods=["GET"])
 def buscar_cotacao():
     """Busca cotação de um ou mais tickers (pública para facilitar testes)"""
     return InvestimentoController.cotacao()
 
 
+@investimento_bp.route("/investimentos/cotacao/stream", methods=["GET"])
+def transmitir_cotacoes():
+    """Cotações ao vivo via server-sent events (pública, como /cotacao)"""
+    return InvestimentoController.transmitir()
+
+
 @investimento_bp.route("/investimentos/em-alta", methods=["GET"])
 def investimentos_em_alta():
     """Retorna investimentos com maior valorização do dia (pública)"""
@@ -27,3 +40,9 @@ def investimentos_em_alta():
 def listar_tesouro():
     """Lista títulos do Tesouro Direto disponíveis (pública)"""
     return InvestimentoController.listar_tesouro()
+
+
+@investimento_bp.route("/investimentos/historico", methods=["GET"])
+def historico_investimento():
+    """Histórico de preços (OHLC) das cotações já buscadas (pública)"""
+    return InvestimentoController.historico()
@@ -0,0 +1,10 @@
+from flask import Blueprint
+from controllers.lote_controller import LoteController
+from utils.auth import token_obrigatorio
+
+lote_bp = Blueprint('lote', __name__)
+
+@lote_bp.route('/lote', methods=['POST'])
+@token_obrigatorio
+def sincronizar_lote(usuario_id):
+    return LoteController.sincronizar(usuario_id)
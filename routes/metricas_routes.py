@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify, request
+from utils.metricas import coletar
+import hmac
+import os
+
+metricas_bp = Blueprint('metricas', __name__)
+
+@metricas_bp.route('/metricas', methods=['GET'])
+def metricas():
+    """
+    Contadores internos (caches, pool de conexões, APIs externas).
+    Exige o header X-Metrics-Token igual a METRICS_TOKEN; sem METRICS_TOKEN
+    definido a rota não existe (404).
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if not token:
+        return jsonify({'erro': 'Rota não encontrada'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token):
+        return jsonify({'erro': 'Não autorizado'}), 401
+    return jsonify(coletar()), 200
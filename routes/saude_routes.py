@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from config.database import verificar_conexao
+
+saude_bp = Blueprint('saude', __name__)
+
+@saude_bp.route('/saude', methods=['GET'])
+def saude():
+    """Liveness: o processo está respondendo (não consulta o banco)"""
+    return jsonify({'status': 'ok'}), 200
+
+@saude_bp.route('/pronto', methods=['GET'])
+def pronto():
+    """Readiness: o MongoDB responde ao ping"""
+    ok, latencia_ms, erro = verificar_conexao()
+    if not ok:
+        return jsonify({'status': 'indisponivel', 'mongodb': {'ok': False, 'erro': erro}}), 503
+    return jsonify({'status': 'pronto', 'mongodb': {'ok': True, 'latencia_ms': latencia_ms}}), 200
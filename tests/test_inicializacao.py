@@ -0,0 +1,24 @@
+"""Orçamento de inicialização: importar app.py deve ser rápido, leve e sem I/O"""
+import unittest
+
+from config import inicializacao
+
+
+class TestInicializacao(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.duracao, cls.pesados, cls.conectou = inicializacao.medir(vezes=1)
+
+    def test_importacao_dentro_do_orcamento(self):
+        self.assertLessEqual(self.duracao, inicializacao.STARTUP_BUDGET_MS)
+
+    def test_importacao_nao_carrega_modulos_pesados(self):
+        self.assertEqual(self.pesados, [])
+
+    def test_importacao_nao_conecta_ao_banco(self):
+        self.assertFalse(self.conectou)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+"""
+Agendador em processo para tarefas de fundo (pré-carga de cotações etc.).
+
+Usa uma instância própria do `schedule` rodando em uma thread daemon. Tarefas
+marcadas com `so_no_pregao` só executam em dias úteis dentro de
+PREFETCH_HORARIO (horário de Brasília).
+
+As requisições externas feitas dentro de uma tarefa são descontadas de um
+orçamento por hora no momento do envio (`reservar_requisicao`, chamado por
+`utils.http_cliente` e `utils.http_async` antes de cada tentativa, inclusive
+repetições). Sem orçamento a requisição não sai e levanta OrcamentoEsgotado.
+
+Com vários processos só um executa as tarefas: o líder, que renova a cada
+AGENDADOR_LIDER_RENOVACAO segundos uma reserva de AGENDADOR_LIDER_TTL segundos
+no armazenamento (`utils.armazenamento`). Com CACHE_BACKEND=mongodb a reserva é
+compartilhada e o orçamento vale para o conjunto dos workers; com o backend em
+memória cada processo é líder de si mesmo, então rode a pré-carga em um
+processo só (PREFETCH_MERCADO=false nos demais). Contadores em
+`GET /api/metricas` como `agendador`.
+"""
+import contextvars
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import schedule
+
+from utils import metricas
+from utils.armazenamento import criar_armazenamento
+
+FUSO_MERCADO = ZoneInfo('America/Sao_Paulo')
+# Janela do pregão (B3) em que as tarefas de mercado rodam, ex. "09:45-18:30"
+PREFETCH_HORARIO = os.getenv('PREFETCH_HORARIO', '09:45-18:30')
+# Requisições externas por hora que as tarefas podem gastar
+PREFETCH_MAX_REQUISICOES_HORA = int(os.getenv('PREFETCH_MAX_REQUISICOES_HORA', '120'))
+AGENDADOR_LIDER_TTL = float(os.getenv('AGENDADOR_LIDER_TTL', '90'))
+AGENDADOR_LIDER_RENOVACAO = float(os.getenv('AGENDADOR_LIDER_RENOVACAO', '30'))
+
+
+class OrcamentoEsgotado(Exception):
+    """A tarefa foi pulada por falta de orçamento de requisições"""
+
+
+class OrcamentoRequisicoes:
+    """Token bucket: `capacidade` requisições por hora, repostas continuamente"""
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+        self.consumidas = 0
+        self.recusadas = 0
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.capacidade / 3600)
+        self._atualizado = agora
+
+    def disponivel(self):
+        with self._lock:
+            self._repor()
+            return int(self._tokens)
+
+    def tentar_consumir(self, quantidade=1):
+        """Reserva `quantidade` requisições; False (sem reservar nada) se não houver"""
+        with self._lock:
+            self._repor()
+            if self._tokens < quantidade:
+                self.recusadas += 1
+                return False
+            self._tokens -= quantidade
+            self.consumidas += quantidade
+            return True
+
+    def consumir(self, quantidade=1):
+        """Reserva `quantidade` requisições ou levanta OrcamentoEsgotado"""
+        if not self.tentar_consumir(quantidade):
+            raise OrcamentoEsgotado(f'{quantidade} requisição(ões) além do orçamento')
+
+
+orcamento = OrcamentoRequisicoes(PREFETCH_MAX_REQUISICOES_HORA)
+
+# Orçamento da tarefa em execução (None fora das tarefas). É um ContextVar para
+# acompanhar as chamadas feitas no event loop de `http_async` e em `to_thread`
+_orcamento_da_tarefa = contextvars.ContextVar('orcamento_da_tarefa', default=None)
+
+
+def reservar_requisicao():
+    """
+    Desconta uma requisição do orçamento se estiver dentro de uma tarefa do
+    agendador. Retorna False se o orçamento acabou; fora das tarefas, True.
+    """
+    orcamento_tarefa = _orcamento_da_tarefa.get()
+    return orcamento_tarefa is None or orcamento_tarefa.tentar_consumir()
+
+
+def cobrar_requisicao():
+    """Como `reservar_requisicao`, mas levanta OrcamentoEsgotado"""
+    if not reservar_requisicao():
+        raise OrcamentoEsgotado('Orçamento de requisições do agendador esgotado')
+
+_agenda = schedule.Scheduler()
+_parar = threading.Event()
+_thread = None
+_lock = threading.Lock()
+_estatisticas = {}
+
+_armazenamento = criar_armazenamento('agendador', max_itens=10)
+_SUFIXO_PROCESSO = uuid.uuid4().hex[:8]
+_lideranca = {'lider': False, 'verificado_em': None}
+
+
+def _janela_pregao():
+    inicio, fim = PREFETCH_HORARIO.split('-')
+    return (datetime.strptime(inicio.strip(), '%H:%M').time(),
+            datetime.strptime(fim.strip(), '%H:%M').time())
+
+
+def em_horario_de_mercado(agora=None):
+    """Dia útil (seg-sex) dentro de PREFETCH_HORARIO, no horário de Brasília"""
+    agora = (agora or datetime.now(FUSO_MERCADO)).astimezone(FUSO_MERCADO)
+    inicio, fim = _janela_pregao()
+    return agora.weekday() < 5 and inicio <= agora.time() <= fim
+
+
+def _executar(nome, funcao, so_no_pregao):
+    e = _estatisticas[nome]
+    if so_no_pregao and not em_horario_de_mercado():
+        e['fora_do_horario'] += 1
+        return
+    inicio = time.perf_counter()
+    contexto = _orcamento_da_tarefa.set(orcamento)
+    try:
+        funcao()
+        e['execucoes'] += 1
+    except OrcamentoEsgotado:
+        e['sem_orcamento'] += 1
+        return
+    except Exception as erro:
+        e['falhas'] += 1
+        e['ultimo_erro'] = str(erro)
+        print(f"⚠️ Tarefa {nome} falhou: {erro}")
+    finally:
+        _orcamento_da_tarefa.reset(contexto)
+    e['ultima_execucao'] = datetime.utcnow().isoformat() + 'Z'
+    e['duracao_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def agendar(nome, intervalo_segundos, funcao, so_no_pregao=True):
+    """Executa `funcao` a cada `intervalo_segundos` (e uma vez ao iniciar o agendador)"""
+    _agenda.clear(nome)
+    _estatisticas[nome] = {
+        'intervalo_s': intervalo_segundos, 'execucoes': 0, 'falhas': 0,
+        'fora_do_horario': 0, 'sem_orcamento': 0, 'ultima_execucao': None, 'duracao_ms': None, 'ultimo_erro': None,
+    }
+    _agenda.every(intervalo_segundos).seconds.do(_executar, nome, funcao, so_no_pregao).tag(nome)
+
+
+def _id_processo():
+    """Identifica o processo na reserva de líder (o pid é lido agora: com fork, cada worker tem o seu)"""
+    return f'{socket.gethostname()}:{os.getpid()}:{_SUFIXO_PROCESSO}'
+
+
+def _eh_lider():
+    """Renova (ou tenta obter) a reserva de líder a cada AGENDADOR_LIDER_RENOVACAO segundos"""
+    agora = time.monotonic()
+    verificado_em = _lideranca['verificado_em']
+    if verificado_em is None or agora - verificado_em >= AGENDADOR_LIDER_RENOVACAO:
+        try:
+            _lideranca['lider'] = _armazenamento.reservar('lider', _id_processo(), AGENDADOR_LIDER_TTL)
+        except Exception as erro:
+            print(f"⚠️ Agendador sem reserva de líder: {erro}")
+            _lideranca['lider'] = False
+        _lideranca['verificado_em'] = agora
+    return _lideranca['lider']
+
+
+def _rodar():
+    primeira = True
+    while not _parar.is_set():
+        if _eh_lider():
+            if primeira:
+                # Primeira rodada do líder já aquece o cache
+                _agenda.run_all()
+                primeira = False
+            else:
+                _agenda.run_pending()
+        _parar.wait(1)
+
+
+def iniciar():
+    """Inicia a thread do agendador (idempotente)"""
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _parar.clear()
+            _thread = threading.Thread(target=_rodar, name='agendador', daemon=True)
+            _thread.start()
+
+
+def parar():
+    _parar.set()
+
+
+metricas.registrar('agendador', lambda: {
+    'ativo': _thread is not None and _thread.is_alive(),
+    'em_horario_de_mercado': em_horario_de_mercado(),
+    'lider': _lideranca['lider'],
+    'orcamento_disponivel': orcamento.disponivel(),
+    'orcamento_por_hora': orcamento.capacidade,
+    'requisicoes_feitas': orcamento.consumidas,
+    'requisicoes_recusadas': orcamento.recusadas,
+    'tarefas': {nome: dict(e) for nome, e in _estatisticas.items()},
+})
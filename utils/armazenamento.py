@@ -0,0 +1,193 @@
+"""
+Armazenamento chave-valor com expiração, em memória ou compartilhado.
+
+Com mais de um processo (gunicorn com vários workers, instâncias da Vercel)
+o que fica em memória não é visto pelos outros: cada worker aquece o próprio
+cache e um código de recuperação gerado em um worker não existe no outro.
+CACHE_BACKEND escolhe a implementação:
+
+- `memoria` (padrão): dicionário do processo, para um worker só.
+- `mongodb`: collection `cache` do próprio banco, com índice TTL em
+  `expira_em` (migração 6). Leituras também filtram por `expira_em`, já que o
+  MongoDB remove os documentos vencidos só de minuto em minuto.
+
+Os valores precisam ser serializáveis em BSON (dict, list, str, números).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memoria').lower()
+
+
+class ArmazenamentoMemoria:
+    """Dicionário do processo com TTL por chave e limite de itens (LRU)"""
+
+    compartilhado = False
+
+    def __init__(self, max_itens=10000):
+        self.max_itens = max_itens
+        self._dados = OrderedDict()  # chave -> (valor, expira_em)
+        self._lock = threading.Lock()
+
+    def _ler(self, chave, agora):
+        """Chamar com o lock"""
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        if agora >= item[1]:
+            del self._dados[chave]
+            return None
+        return item[0]
+
+    def obter(self, chave):
+        with self._lock:
+            return self._ler(chave, time.monotonic())
+
+    def obter_varios(self, chaves):
+        with self._lock:
+            agora = time.monotonic()
+            valores = {chave: self._ler(chave, agora) for chave in chaves}
+        return {chave: valor for chave, valor in valores.items() if valor is not None}
+
+    def definir(self, chave, valor, ttl):
+        self.definir_varios({chave: valor}, ttl)
+
+    def definir_varios(self, valores, ttl):
+        with self._lock:
+            expira_em = time.monotonic() + ttl
+            for chave, valor in valores.items():
+                self._dados[chave] = (valor, expira_em)
+                self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def incrementar(self, chave, campo, quantidade=1):
+        """Soma `quantidade` em valor[campo] de forma atômica; retorna o valor novo ou None"""
+        with self._lock:
+            valor = self._ler(chave, time.monotonic())
+            if valor is None:
+                return None
+            valor[campo] = valor.get(campo, 0) + quantidade
+            return dict(valor)
+
+    def reservar(self, chave, dono, ttl):
+        """
+        Reserva `chave` para `dono` por `ttl` segundos se estiver livre, vencida
+        ou já for dele (renova). Retorna True se `dono` ficou com a reserva.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            valor = self._ler(chave, agora)
+            if valor is not None and valor.get('dono') != dono:
+                return False
+            self._dados[chave] = ({'dono': dono}, agora + ttl)
+            self._dados.move_to_end(chave)
+            return True
+
+    def limpar_expirados(self):
+        """Remove os itens vencidos; retorna quantos"""
+        with self._lock:
+            agora = time.monotonic()
+            vencidas = [chave for chave, (_, expira_em) in self._dados.items() if agora >= expira_em]
+            for chave in vencidas:
+                del self._dados[chave]
+        return len(vencidas)
+
+
+class ArmazenamentoMongo:
+    """Collection `cache` com índice TTL; as chaves levam o prefixo `namespace:`"""
+
+    compartilhado = True
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def _id(self, chave):
+        return f'{self.namespace}:{chave}'
+
+    @staticmethod
+    def _collection():
+        from config.database import get_cache_collection
+        return get_cache_collection()
+
+    def obter(self, chave):
+        doc = self._collection().find_one(
+            {'_id': self._id(chave), 'expira_em': {'$gt': datetime.utcnow()}}, {'valor': 1}
+        )
+        return doc['valor'] if doc else None
+
+    def obter_varios(self, chaves):
+        ids = {self._id(chave): chave for chave in chaves}
+        if not ids:
+            return {}
+        docs = self._collection().find(
+            {'_id': {'$in': list(ids)}, 'expira_em': {'$gt': datetime.utcnow()}}, {'valor': 1}
+        )
+        return {ids[doc['_id']]: doc['valor'] for doc in docs}
+
+    def definir(self, chave, valor, ttl):
+        self.definir_varios({chave: valor}, ttl)
+
+    def definir_varios(self, valores, ttl):
+        if not valores:
+            return
+        expira_em = datetime.utcnow() + timedelta(seconds=ttl)
+        self._collection().bulk_write([
+            UpdateOne({'_id': self._id(chave)}, {'$set': {'valor': valor, 'expira_em': expira_em}}, upsert=True)
+            for chave, valor in valores.items()
+        ], ordered=False)
+
+    def remover(self, chave):
+        self._collection().delete_one({'_id': self._id(chave)})
+
+    def incrementar(self, chave, campo, quantidade=1):
+        """$inc em valor.<campo> (atômico no servidor); retorna o valor novo ou None"""
+        doc = self._collection().find_one_and_update(
+            {'_id': self._id(chave), 'expira_em': {'$gt': datetime.utcnow()}},
+            {'$inc': {f'valor.{campo}': quantidade}},
+            projection={'valor': 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc['valor'] if doc else None
+
+    def reservar(self, chave, dono, ttl):
+        """
+        Reserva `chave` para `dono` por `ttl` segundos se estiver livre, vencida
+        ou já for dele (renova). Se outro dono tem a reserva válida o upsert
+        colide no _id e a reserva é negada.
+        """
+        agora = datetime.utcnow()
+        try:
+            self._collection().update_one(
+                {'_id': self._id(chave), '$or': [{'expira_em': {'$lte': agora}}, {'valor.dono': dono}]},
+                {'$set': {'valor': {'dono': dono}, 'expira_em': agora + timedelta(seconds=ttl)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def limpar_expirados(self):
+        """O índice TTL já remove os vencidos; adianta a limpeza"""
+        return self._collection().delete_many(
+            {'_id': {'$regex': f'^{self.namespace}:'}, 'expira_em': {'$lte': datetime.utcnow()}}
+        ).deleted_count
+
+
+def criar_armazenamento(namespace, max_itens=10000):
+    """Armazenamento do backend configurado em CACHE_BACKEND"""
+    if CACHE_BACKEND == 'mongodb':
+        return ArmazenamentoMongo(namespace)
+    if CACHE_BACKEND != 'memoria':
+        print(f"⚠️ CACHE_BACKEND={CACHE_BACKEND!r} desconhecido; usando memória")
+    return ArmazenamentoMemoria(max_itens)
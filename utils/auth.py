@@ -1,6 +1,6 @@
 import jwt
 from datetime import datetime, timedelta
-from flask import request, jsonify
+from flask import request, jsonify, g
 from functools import wraps
 from bson import ObjectId
 from models.usuario_model import UsuarioModel
@@ -37,10 +37,12 @@ def token_obrigatorio(f):
             dados = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
             usuario_id = dados['usuario_id']
             
-            # Verifica se usuário existe
-            usuario = UsuarioModel.buscar_por_id(usuario_id)
+            # Verifica se usuário existe (cache LRU/TTL; o documento fica em g.usuario
+            # para os controllers não buscarem de novo)
+            usuario = UsuarioModel.buscar_autenticado(usuario_id)
             if not usuario:
                 return jsonify({'erro': 'Usuário não encontrado'}), 401
+            g.usuario = usuario
             
             # Passa o usuario_id para a função
             return f(usuario_id, *args, **kwargs)
@@ -0,0 +1,347 @@
+"""
+Cache em memória com limite de itens (LRU), TTL, stale-while-revalidate e
+single-flight.
+
+- Cada item vale `ttl` segundos; depois disso ainda pode ser servido por
+  `janela_stale` segundos enquanto é recalculado em segundo plano.
+- Chamadas concorrentes para a mesma chave ausente esperam um único cálculo
+  (single-flight) em vez de consultarem a origem todas ao mesmo tempo.
+- Com um `armazenamento` compartilhado (`utils.armazenamento`, ex. MongoDB) ele
+  vira um segundo nível: antes de calcular, procura o valor gravado por outro
+  worker, e tudo que é calculado ou definido também é gravado lá.
+- `obter_varios_async`/`obter_ou_calcular_async` fazem o mesmo dentro de um
+  event loop (`utils.http_async`), com o cálculo em uma corrotina; o
+  single-flight vale entre as versões síncrona e assíncrona.
+- As estatísticas aparecem em `GET /api/metricas` com o nome do cache.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metricas
+
+# Renovações em segundo plano de todos os caches
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-renovacao')
+
+
+class _Voo:
+    """Cálculo em andamento de um conjunto de chaves"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valores = {}
+        self._aguardando = []  # (loop, future) de quem espera em um event loop
+        self._lock = threading.Lock()
+
+    def concluir(self, valores):
+        with self._lock:
+            self.valores = valores
+            self.evento.set()
+            aguardando, self._aguardando = self._aguardando, []
+        for loop, futuro in aguardando:
+            loop.call_soon_threadsafe(lambda f=futuro: f.done() or f.set_result(None))
+
+    async def aguardar(self, timeout):
+        """Espera sem bloquear o loop (nem ocupar uma thread)"""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        with self._lock:
+            if self.evento.is_set():
+                return
+            self._aguardando.append((loop, futuro))
+        try:
+            await asyncio.wait_for(futuro, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class CacheTTL:
+
+    def __init__(self, nome, max_itens=1000, ttl=300, janela_stale=0, espera_maxima=30, armazenamento=None):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.janela_stale = janela_stale
+        self.espera_maxima = espera_maxima
+        # Só faz sentido como segundo nível se for visto pelos outros processos
+        self.armazenamento = armazenamento if getattr(armazenamento, 'compartilhado', False) else None
+        self._dados = OrderedDict()  # chave -> (valor, expira_em, descartar_em)
+        self._voos = {}  # chave -> _Voo
+        self._tarefas = set()  # renovações assíncronas em andamento (referência forte)
+        self._lock = threading.Lock()
+        self._estatisticas = {
+            'hits': 0, 'misses': 0, 'stale': 0, 'coalescidas': 0,
+            'renovacoes': 0, 'falhas': 0, 'evictions': 0, 'expiradas': 0,
+            'hits_compartilhado': 0, 'erros_compartilhado': 0,
+        }
+        metricas.registrar(f'cache_{nome}', self.estatisticas)
+
+    def _ler(self, chave, agora):
+        """Retorna ('fresco'|'stale'|'ausente', valor). Chamar com o lock"""
+        item = self._dados.get(chave)
+        if item is None:
+            return 'ausente', None
+        valor, expira_em, descartar_em = item
+        if agora < expira_em:
+            self._dados.move_to_end(chave)
+            return 'fresco', valor
+        if agora < descartar_em:
+            self._dados.move_to_end(chave)
+            return 'stale', valor
+        del self._dados[chave]
+        self._estatisticas['expiradas'] += 1
+        return 'ausente', None
+
+    def _gravar(self, chave, valor, ttl, agora):
+        """Chamar com o lock"""
+        ttl = self.ttl if ttl is None else ttl
+        self._dados[chave] = (valor, agora + ttl, agora + ttl + self.janela_stale)
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.max_itens:
+            self._dados.popitem(last=False)
+            self._estatisticas['evictions'] += 1
+
+    def _ler_compartilhado(self, chaves):
+        """
+        ({chave: valor}, {chave: ttl restante}) dos itens ainda frescos no
+        armazenamento compartilhado. Erros nele não derrubam a consulta.
+        """
+        if self.armazenamento is None or not chaves:
+            return {}, {}
+        try:
+            itens = self.armazenamento.obter_varios(chaves)
+        except Exception as e:
+            with self._lock:
+                self._estatisticas['erros_compartilhado'] += 1
+            print(f"Erro ao ler cache compartilhado {self.nome}: {e}")
+            return {}, {}
+        agora = time.time()
+        valores, ttls = {}, {}
+        for chave, item in itens.items():
+            if item['fresco_ate'] > agora:
+                valores[chave] = item['valor']
+                ttls[chave] = item['fresco_ate'] - agora
+        if valores:
+            with self._lock:
+                self._estatisticas['hits_compartilhado'] += len(valores)
+        return valores, ttls
+
+    def _gravar_compartilhado(self, valores, ttl):
+        if self.armazenamento is None or not valores:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        fresco_ate = time.time() + ttl
+        try:
+            self.armazenamento.definir_varios(
+                {chave: {'valor': valor, 'fresco_ate': fresco_ate} for chave, valor in valores.items()},
+                ttl + self.janela_stale,
+            )
+        except Exception as e:
+            with self._lock:
+                self._estatisticas['erros_compartilhado'] += 1
+            print(f"Erro ao gravar cache compartilhado {self.nome}: {e}")
+
+    def obter(self, chave):
+        """Valor dentro do TTL ou None (não considera itens stale)"""
+        with self._lock:
+            estado, valor = self._ler(chave, time.monotonic())
+            if estado == 'fresco':
+                self._estatisticas['hits'] += 1
+                return valor
+            self._estatisticas['misses'] += 1
+
+        valores, ttls = self._ler_compartilhado([chave])
+        if chave not in valores:
+            return None
+        with self._lock:
+            self._gravar(chave, valores[chave], ttls[chave], time.monotonic())
+        return valores[chave]
+
+    def definir(self, chave, valor, ttl=None):
+        """Grava `valor` por `ttl` segundos (padrão do cache se None)"""
+        with self._lock:
+            self._gravar(chave, valor, ttl, time.monotonic())
+        self._gravar_compartilhado({chave: valor}, ttl)
+
+    def invalidar(self, chave):
+        """Remove daqui e do compartilhado (cópias locais de outros workers valem até o TTL)"""
+        with self._lock:
+            self._dados.pop(chave, None)
+        if self.armazenamento is not None:
+            try:
+                self.armazenamento.remover(chave)
+            except Exception as e:
+                print(f"Erro ao invalidar cache compartilhado {self.nome}: {e}")
+
+    def _calcular(self, chaves, calcular, ttl, voo, propagar):
+        """
+        Busca `chaves` no armazenamento compartilhado e executa `calcular` para
+        as que faltarem; grava o resultado e libera quem espera pelo voo.
+        """
+        valores, ttls = {}, {}
+        try:
+            valores, ttls = self._ler_compartilhado(chaves)
+            faltando = [chave for chave in chaves if chave not in valores]
+            if faltando:
+                calculados = calcular(faltando) or {}
+                self._gravar_compartilhado(
+                    {chave: valor for chave, valor in calculados.items() if valor is not None}, ttl
+                )
+                valores = {**calculados, **valores}
+        except Exception as e:
+            with self._lock:
+                self._estatisticas['falhas'] += 1
+            if propagar:
+                raise
+            print(f"Erro ao renovar cache {self.nome}: {e}")
+        finally:
+            self._concluir(chaves, valores, ttls, ttl, voo)
+        return valores
+
+    async def _calcular_async(self, chaves, calcular, ttl, voo, propagar):
+        """`_calcular` com `calcular` corrotina; o armazenamento compartilhado roda em thread"""
+        valores, ttls = {}, {}
+        try:
+            if self.armazenamento is not None:
+                valores, ttls = await asyncio.to_thread(self._ler_compartilhado, chaves)
+            faltando = [chave for chave in chaves if chave not in valores]
+            if faltando:
+                calculados = await calcular(faltando) or {}
+                novos = {chave: valor for chave, valor in calculados.items() if valor is not None}
+                if self.armazenamento is not None and novos:
+                    await asyncio.to_thread(self._gravar_compartilhado, novos, ttl)
+                valores = {**calculados, **valores}
+        except Exception as e:
+            with self._lock:
+                self._estatisticas['falhas'] += 1
+            if propagar:
+                raise
+            print(f"Erro ao renovar cache {self.nome}: {e}")
+        finally:
+            # Também se a corrotina for cancelada (prazo): libera quem espera
+            self._concluir(chaves, valores, ttls, ttl, voo)
+        return valores
+
+    def _concluir(self, chaves, valores, ttls, ttl, voo):
+        """Grava o resultado de um voo e libera quem espera por ele"""
+        agora = time.monotonic()
+        with self._lock:
+            for chave in chaves:
+                if valores.get(chave) is not None:
+                    self._gravar(chave, valores[chave], ttls.get(chave, ttl), agora)
+                if self._voos.get(chave) is voo:
+                    del self._voos[chave]
+        voo.concluir(valores)
+
+    def _separar(self, chaves):
+        """
+        Classifica as chaves: devolve (resultado já disponível, chaves a calcular
+        agora, voo delas, chaves stale a renovar, voo delas, {chave: voo alheio}).
+        """
+        resultado = {}
+        proprias, renovar, esperar = [], [], {}
+
+        with self._lock:
+            agora = time.monotonic()
+            for chave in dict.fromkeys(chaves):
+                estado, valor = self._ler(chave, agora)
+                if estado == 'fresco':
+                    self._estatisticas['hits'] += 1
+                    resultado[chave] = valor
+                elif estado == 'stale':
+                    self._estatisticas['stale'] += 1
+                    resultado[chave] = valor
+                    if chave not in self._voos:
+                        renovar.append(chave)
+                elif chave in self._voos:
+                    self._estatisticas['coalescidas'] += 1
+                    esperar[chave] = self._voos[chave]
+                else:
+                    self._estatisticas['misses'] += 1
+                    proprias.append(chave)
+
+            voo_proprio = _Voo() if proprias else None
+            for chave in proprias:
+                self._voos[chave] = voo_proprio
+            voo_renovacao = _Voo() if renovar else None
+            for chave in renovar:
+                self._voos[chave] = voo_renovacao
+            if renovar:
+                self._estatisticas['renovacoes'] += 1
+
+        return resultado, proprias, voo_proprio, renovar, voo_renovacao, esperar
+
+    def obter_varios(self, chaves, calcular, ttl=None):
+        """
+        Retorna {chave: valor} das `chaves` encontradas.
+        `calcular(lista de chaves)` devolve {chave: valor} para as ausentes; valores
+        None ou chaves fora do dict não são gravados. Itens stale são devolvidos na
+        hora e renovados em segundo plano; chaves já sendo calculadas por outra
+        thread não são recalculadas, a chamada espera o resultado dela.
+        """
+        resultado, proprias, voo_proprio, renovar, voo_renovacao, esperar = self._separar(chaves)
+
+        if renovar:
+            _executor.submit(self._calcular, renovar, calcular, ttl, voo_renovacao, False)
+
+        if proprias:
+            valores = self._calcular(proprias, calcular, ttl, voo_proprio, True)
+            resultado.update({chave: valores[chave] for chave in proprias if valores.get(chave) is not None})
+
+        for chave, voo in esperar.items():
+            voo.evento.wait(self.espera_maxima)
+            if voo.valores.get(chave) is not None:
+                resultado[chave] = voo.valores[chave]
+
+        return resultado
+
+    def obter_ou_calcular(self, chave, calcular, ttl=None):
+        """Versão de uma chave: `calcular()` sem argumentos; retorna o valor ou None"""
+        return self.obter_varios([chave], lambda chaves: {chave: calcular()}, ttl).get(chave)
+
+    async def obter_varios_async(self, chaves, calcular, ttl=None):
+        """
+        `obter_varios` para rodar em um event loop: `calcular(lista de chaves)` é
+        uma corrotina, a renovação dos itens stale vira uma tarefa no mesmo loop e
+        a espera por cálculos de outras threads não bloqueia o loop.
+        """
+        resultado, proprias, voo_proprio, renovar, voo_renovacao, esperar = self._separar(chaves)
+
+        if renovar:
+            tarefa = asyncio.ensure_future(self._calcular_async(renovar, calcular, ttl, voo_renovacao, False))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+
+        if proprias:
+            valores = await self._calcular_async(proprias, calcular, ttl, voo_proprio, True)
+            resultado.update({chave: valores[chave] for chave in proprias if valores.get(chave) is not None})
+
+        voos = {id(voo): voo for voo in esperar.values()}
+        await asyncio.gather(*(voo.aguardar(self.espera_maxima) for voo in voos.values()))
+        for chave, voo in esperar.items():
+            if voo.valores.get(chave) is not None:
+                resultado[chave] = voo.valores[chave]
+
+        return resultado
+
+    async def obter_ou_calcular_async(self, chave, calcular, ttl=None):
+        """Versão de uma chave: `calcular()` é uma corrotina sem argumentos"""
+        async def calcular_chave(chaves):
+            return {chave: await calcular()}
+        return (await self.obter_varios_async([chave], calcular_chave, ttl)).get(chave)
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self._estatisticas['hits'] + self._estatisticas['misses'] + self._estatisticas['stale']
+            return {
+                **self._estatisticas,
+                'taxa_acerto': round((self._estatisticas['hits'] + self._estatisticas['stale']) / consultas, 3)
+                if consultas else 0.0,
+                'tamanho': len(self._dados),
+                'max_itens': self.max_itens,
+                'ttl': self.ttl,
+                'janela_stale': self.janela_stale,
+                'compartilhado': type(self.armazenamento).__name__ if self.armazenamento else None,
+            }
@@ -0,0 +1,102 @@
+"""
+Cache em memória de resultados calculados por usuário.
+
+Cada cache declara de quais dados depende ('entradas', 'saidas', 'carteira')
+e é invalidado pelos models sempre que o usuário escreve neles, via
+`notificar_escrita(usuario_id, tipo)`.
+
+Os resultados ficam no processo, mas a validade não depende só dele:
+
+- Com CACHE_BACKEND=mongodb, cada escrita grava uma versão nova de
+  (usuario_id, tipo) no armazenamento compartilhado. Antes de devolver um
+  resultado o cache lê as versões do usuário (uma consulta por `_id`) e
+  recalcula se alguma mudou, então a escrita feita em outro worker vale na
+  hora.
+- Em qualquer backend um resultado vence após CACHE_USUARIO_TTL segundos
+  (padrão 300), o que limita a defasagem se a versão não puder ser gravada.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from utils.armazenamento import criar_armazenamento
+
+CACHE_USUARIO_TTL = float(os.getenv('CACHE_USUARIO_TTL', '300'))
+# Bem maior que o TTL dos resultados: uma versão vencida some junto com o que ela validava
+_VERSOES_TTL = 7 * 24 * 3600
+
+_caches = []
+_versoes = criar_armazenamento('versoes_usuario')
+
+
+def _versao(usuario_id, tipos):
+    """Versões compartilhadas de `tipos` do usuário (None com o backend em memória)"""
+    if not _versoes.compartilhado:
+        return None
+    chaves = [f'{usuario_id}:{tipo}' for tipo in sorted(tipos)]
+    valores = _versoes.obter_varios(chaves)
+    return tuple(valores.get(chave) for chave in chaves)
+
+
+class CacheUsuario:
+    """Cache LRU por usuário, com no máximo `max_chaves` resultados por usuário"""
+
+    def __init__(self, depende_de, max_usuarios=1000, max_chaves=32, ttl=None):
+        self.depende_de = set(depende_de)
+        self.max_usuarios = max_usuarios
+        self.max_chaves = max_chaves
+        self.ttl = CACHE_USUARIO_TTL if ttl is None else ttl
+        self._dados = OrderedDict()  # usuario_id -> {chave: (resultado, expira_em, versao)}
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação: resultados calculados antes dela não são guardados
+        self._geracao = 0
+        _caches.append(self)
+
+    def obter(self, usuario_id, chave, calcular):
+        """Retorna o valor em cache ou executa `calcular()` e guarda o resultado"""
+        # Lida antes de calcular: uma escrita durante o cálculo deixa o resultado já vencido
+        versao = _versao(usuario_id, self.depende_de)
+        with self._lock:
+            geracao = self._geracao
+            valores = self._dados.get(usuario_id)
+            if valores is not None:
+                self._dados.move_to_end(usuario_id)
+                item = valores.get(chave)
+                if item is not None and item[1] > time.monotonic() and item[2] == versao:
+                    return item[0]
+
+        resultado = calcular()
+
+        with self._lock:
+            if geracao != self._geracao:
+                return resultado
+            valores = self._dados.setdefault(usuario_id, {})
+            if chave not in valores and len(valores) >= self.max_chaves:
+                valores.clear()
+            valores[chave] = (resultado, time.monotonic() + self.ttl, versao)
+            self._dados.move_to_end(usuario_id)
+            while len(self._dados) > self.max_usuarios:
+                self._dados.popitem(last=False)
+
+        return resultado
+
+    def invalidar(self, usuario_id):
+        """Descarta tudo que está em cache para o usuário"""
+        with self._lock:
+            self._geracao += 1
+            self._dados.pop(usuario_id, None)
+
+
+def notificar_escrita(usuario_id, tipo):
+    """Invalida os caches que dependem do tipo escrito ('entradas', 'saidas' ou 'carteira')"""
+    for cache in _caches:
+        if tipo in cache.depende_de:
+            cache.invalidar(usuario_id)
+    if _versoes.compartilhado:
+        try:
+            _versoes.definir(f'{usuario_id}:{tipo}', uuid.uuid4().hex, _VERSOES_TTL)
+        except Exception as e:
+            # A escrita do usuário já foi feita; os outros workers esperam o TTL
+            print(f"⚠️ Falha ao publicar versão do cache de usuário: {e}")
@@ -0,0 +1,164 @@
+"""
+Avaliação de carteira vetorizada.
+
+As posições viram arrays (quantidade, custo, preço) e o histórico vira uma
+matriz dias x tickers, então valor, lucro, alocação e a série diária saem de
+operações numpy/pandas sobre todas as posições de uma vez.
+
+`AvaliacaoCarteira` guarda o último cálculo de um usuário: `atualizar_precos`
+só recalcula as posições cujo preço mudou, e os fechamentos dos dias
+anteriores ficam guardados até a virada do dia (só o ponto de hoje muda).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+FUSO_MERCADO = 'America/Sao_Paulo'
+
+
+def _hoje():
+    """Data de hoje no fuso do mercado (Timestamp sem fuso)"""
+    return pd.Timestamp.now(tz=FUSO_MERCADO).normalize().tz_localize(None)
+
+
+def _arredondar(valores, casas=2):
+    """Array -> lista com None no lugar de NaN"""
+    return [None if np.isnan(v) else round(float(v), casas) for v in valores]
+
+
+class AvaliacaoCarteira:
+
+    def __init__(self, posicoes):
+        """`posicoes`: documentos de CarteiraModel.listar"""
+        self.tickers = [p['ticker'] for p in posicoes]
+        self.quantidades = np.array([p.get('quantidade', 0) for p in posicoes], dtype=float)
+        self.custos = np.array([p.get('custo_total', 0) for p in posicoes], dtype=float)
+        # Sem cotação a posição vale o custo
+        self.precos = np.full(len(self.tickers), np.nan)
+        self.valores = self.custos.copy()
+        self.lotes = pd.DataFrame(
+            [
+                {'ticker': p['ticker'], 'dia': lote['data'], 'quantidade': lote['quantidade']}
+                for p in posicoes for lote in p.get('lotes', [])
+            ],
+            columns=['ticker', 'dia', 'quantidade'],
+        )
+        if not self.lotes.empty:
+            self.lotes['dia'] = pd.to_datetime(self.lotes['dia']).dt.normalize()
+        self._fechamentos = {}  # (inicio, hoje) -> DataFrame dias x tickers dos dias fechados
+        self.lock = threading.Lock()
+
+    def atualizar_precos(self, precos):
+        """
+        Aplica {ticker: preço} recalculando só as posições cujo preço mudou.
+        Retorna quantas posições foram recalculadas.
+        """
+        novos = np.array([precos.get(ticker, np.nan) for ticker in self.tickers], dtype=float)
+        mudou = ~((novos == self.precos) | (np.isnan(novos) & np.isnan(self.precos)))
+        if mudou.any():
+            self.precos[mudou] = novos[mudou]
+            self.valores[mudou] = np.where(
+                np.isnan(novos[mudou]), self.custos[mudou], self.quantidades[mudou] * novos[mudou]
+            )
+        return int(mudou.sum())
+
+    def posicoes(self):
+        """Linhas por posição e totais da carteira"""
+        valor_total = self.valores.sum()
+        custo_total = self.custos.sum()
+        lucros = self.valores - self.custos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precos_medios = np.where(self.quantidades > 0, self.custos / self.quantidades, np.nan)
+            lucros_pct = np.where(self.custos > 0, lucros / self.custos * 100, np.nan)
+            alocacoes = self.valores / valor_total * 100 if valor_total > 0 else np.zeros(len(self.tickers))
+
+        colunas = {
+            'quantidade': _arredondar(self.quantidades, 6),
+            'preco_medio': _arredondar(precos_medios),
+            'custo': _arredondar(self.custos),
+            'preco': _arredondar(self.precos),
+            'valor': _arredondar(self.valores),
+            'lucro': _arredondar(lucros),
+            'lucro_percentual': _arredondar(lucros_pct),
+            'alocacao_percentual': _arredondar(alocacoes),
+        }
+        linhas = [
+            {'ticker': ticker, **{nome: valores[i] for nome, valores in colunas.items()}}
+            for i, ticker in enumerate(self.tickers)
+        ]
+        totais = {
+            'custo': round(float(custo_total), 2),
+            'valor': round(float(valor_total), 2),
+            'lucro': round(float(valor_total - custo_total), 2),
+            'lucro_percentual': round(float((valor_total - custo_total) / custo_total * 100), 2)
+            if custo_total > 0 else None,
+        }
+        return linhas, totais
+
+    def _quantidades_por_dia(self, dias):
+        """Quantidade de cada ticker ao fim de cada dia (lotes acumulados)"""
+        if self.lotes.empty:
+            return pd.DataFrame(0.0, index=dias, columns=self.tickers)
+        acumulado = (
+            self.lotes.pivot_table(index='dia', columns='ticker', values='quantidade', aggfunc='sum')
+            .reindex(columns=self.tickers)
+            .fillna(0)
+            .cumsum()
+        )
+        # Lotes anteriores ao período entram pela soma acumulada antes do corte
+        return acumulado.reindex(acumulado.index.union(dias)).ffill().fillna(0).reindex(dias)
+
+    def serie(self, inicio, buscar_fechamentos):
+        """
+        Valor diário da carteira e retorno diário ponderado no tempo (compras
+        não contam como ganho) desde `inicio`, com hoje pelos preços atuais.
+        `buscar_fechamentos(inicio, fim)` devolve [{ticker, data, fechamento}]
+        e só é chamado uma vez por dia para cada início.
+        """
+        hoje = _hoje()
+        inicio = pd.Timestamp(inicio).normalize()
+        chave = (inicio, hoje)
+        if chave not in self._fechamentos:
+            # Na virada do dia os fechamentos guardados deixam de valer
+            self._fechamentos = {k: v for k, v in self._fechamentos.items() if k[1] == hoje}
+            registros = pd.DataFrame(buscar_fechamentos(inicio, hoje), columns=['ticker', 'data', 'fechamento'])
+            if registros.empty:
+                fechados = pd.DataFrame(columns=self.tickers, dtype=float)
+            else:
+                registros['dia'] = (
+                    pd.to_datetime(registros['data'], utc=True)
+                    .dt.tz_convert(FUSO_MERCADO).dt.tz_localize(None).dt.normalize()
+                )
+                fechados = (
+                    registros[registros['dia'] < hoje]
+                    .pivot_table(index='dia', columns='ticker', values='fechamento', aggfunc='last')
+                    .reindex(columns=self.tickers)
+                )
+            self._fechamentos[chave] = fechados
+
+        hoje_linha = pd.DataFrame([self.precos], index=[hoje], columns=self.tickers)
+        precos = pd.concat([self._fechamentos[chave], hoje_linha]).astype(float).ffill()
+        if precos.empty:
+            return []
+
+        quantidades = self._quantidades_por_dia(precos.index)
+        valores = (precos * quantidades).sum(axis=1)
+        anteriores = quantidades.shift(1)
+        base = (anteriores * precos.shift(1)).sum(axis=1)
+        ganho = (anteriores * precos.diff()).sum(axis=1)
+        retornos = (ganho / base.replace(0, np.nan)).to_numpy()
+        acumulados = np.cumprod(1 + np.nan_to_num(retornos)) - 1
+
+        return [
+            {
+                'data': dia.strftime('%Y-%m-%d'),
+                'valor': valor,
+                'retorno_percentual': retorno,
+                'retorno_acumulado_percentual': acumulado,
+            }
+            for dia, valor, retorno, acumulado in zip(
+                precos.index, _arredondar(valores.to_numpy()),
+                _arredondar(retornos * 100, 4), _arredondar(acumulados * 100, 4),
+            )
+        ]
@@ -0,0 +1,125 @@
+"""
+Circuit breaker por upstream (Brapi, Tesouro).
+
+Guarda o resultado das últimas CIRCUITO_JANELA chamadas. Quando pelo menos
+CIRCUITO_MINIMO_CHAMADAS foram feitas e a taxa de falha passa de
+CIRCUITO_TAXA_FALHA, o circuito abre: por CIRCUITO_TEMPO_ABERTO segundos as
+chamadas levantam CircuitoAberto na hora, sem esperar o timeout do upstream.
+Depois disso fica meio-aberto: uma única chamada de teste passa; se der certo o
+circuito fecha, se falhar abre de novo. Estados em `GET /api/metricas` como
+`circuitos`.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from utils import metricas
+
+CIRCUITO_JANELA = int(os.getenv('CIRCUITO_JANELA', '20'))
+CIRCUITO_MINIMO_CHAMADAS = int(os.getenv('CIRCUITO_MINIMO_CHAMADAS', '5'))
+CIRCUITO_TAXA_FALHA = float(os.getenv('CIRCUITO_TAXA_FALHA', '0.5'))
+CIRCUITO_TEMPO_ABERTO = float(os.getenv('CIRCUITO_TEMPO_ABERTO', '30'))
+
+FECHADO, ABERTO, MEIO_ABERTO = 'fechado', 'aberto', 'meio_aberto'
+
+
+class CircuitoAberto(Exception):
+    """O upstream está com o circuito aberto; a chamada nem foi feita"""
+
+    def __init__(self, nome, retomada_em):
+        super().__init__(f'Circuito {nome} aberto (nova tentativa em {retomada_em:.0f}s)')
+        self.nome = nome
+        self.retomada_em = retomada_em
+
+
+class Disjuntor:
+
+    def __init__(self, nome, janela=CIRCUITO_JANELA, minimo_chamadas=CIRCUITO_MINIMO_CHAMADAS,
+                 taxa_falha=CIRCUITO_TAXA_FALHA, tempo_aberto=CIRCUITO_TEMPO_ABERTO):
+        self.nome = nome
+        self.minimo_chamadas = minimo_chamadas
+        self.taxa_falha = taxa_falha
+        self.tempo_aberto = tempo_aberto
+        self.estado = FECHADO
+        self._resultados = deque(maxlen=janela)  # True = falha
+        self._aberto_em = 0.0
+        self._sondagem_em = None  # início da chamada de teste no meio-aberto
+        self._lock = threading.Lock()
+        self._estatisticas = {'aberturas': 0, 'rejeitadas': 0, 'ultima_abertura': None}
+
+    def permitir(self):
+        """
+        Libera uma chamada ou levanta CircuitoAberto.
+        Retorna True quando a chamada é o teste do meio-aberto (quem chama deve
+        fazer uma tentativa só).
+        """
+        with self._lock:
+            agora = time.monotonic()
+            if self.estado == FECHADO:
+                return False
+            if self.estado == ABERTO and agora - self._aberto_em >= self.tempo_aberto:
+                self.estado = MEIO_ABERTO
+                self._sondagem_em = None
+            if self.estado == MEIO_ABERTO:
+                # Uma sondagem por vez; uma que nunca respondeu (cancelada) expira
+                if self._sondagem_em is None or agora - self._sondagem_em >= self.tempo_aberto:
+                    self._sondagem_em = agora
+                    return True
+                retomada = self.tempo_aberto - (agora - self._sondagem_em)
+            else:
+                retomada = self.tempo_aberto - (agora - self._aberto_em)
+            self._estatisticas['rejeitadas'] += 1
+            raise CircuitoAberto(self.nome, retomada)
+
+    def registrar(self, falhou):
+        """Resultado de uma chamada liberada por `permitir`"""
+        with self._lock:
+            if self.estado == MEIO_ABERTO:
+                if falhou:
+                    self._abrir()
+                else:
+                    self.estado = FECHADO
+                    self._resultados.clear()
+                return
+            if self.estado == ABERTO:
+                return
+            self._resultados.append(falhou)
+            falhas = sum(self._resultados)
+            if (len(self._resultados) >= self.minimo_chamadas
+                    and falhas / len(self._resultados) >= self.taxa_falha):
+                self._abrir()
+
+    def _abrir(self):
+        """Chamar com o lock"""
+        self.estado = ABERTO
+        self._aberto_em = time.monotonic()
+        self._sondagem_em = None
+        self._resultados.clear()
+        self._estatisticas['aberturas'] += 1
+        self._estatisticas['ultima_abertura'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        print(f"⚠️ Circuito {self.nome} aberto por {self.tempo_aberto:.0f}s")
+
+    def resumo(self):
+        with self._lock:
+            return {
+                'estado': self.estado,
+                'chamadas_na_janela': len(self._resultados),
+                'falhas_na_janela': sum(self._resultados),
+                **self._estatisticas,
+            }
+
+
+_disjuntores = {}
+_lock = threading.Lock()
+
+
+def obter(nome):
+    """Disjuntor do upstream `nome` (criado no primeiro uso)"""
+    with _lock:
+        if nome not in _disjuntores:
+            _disjuntores[nome] = Disjuntor(nome)
+        return _disjuntores[nome]
+
+
+metricas.registrar('circuitos', lambda: {nome: d.resumo() for nome, d in list(_disjuntores.items())})
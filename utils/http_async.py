@@ -0,0 +1,136 @@
+"""
+Camada assíncrona para chamar várias APIs externas ao mesmo tempo.
+
+As views do Flask são síncronas, então um event loop dedicado roda em uma
+thread de fundo com um `httpx.AsyncClient` compartilhado (o pool de conexões
+sobrevive entre requisições). A view monta as corrotinas e chama
+`reunir({...}, prazo)`: todas rodam em paralelo e a requisição custa o tempo
+da mais lenta, não a soma. Timeouts, tentativas e métricas são os mesmos de
+`utils.http_cliente`.
+"""
+import asyncio
+import atexit
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturoTimeout
+from importlib.util import find_spec
+
+import httpx
+
+from utils import agendador, circuito, http_cliente
+
+_loop = None
+_cliente = None
+_lock = threading.Lock()
+
+
+def _iniciar_loop():
+    """Cria o event loop na thread de fundo na primeira chamada"""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='http-async', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _obter_cliente():
+    """AsyncClient do loop de fundo (só é usado dentro dele)"""
+    global _cliente
+    if _cliente is None:
+        _cliente = httpx.AsyncClient(
+            http2=find_spec('h2') is not None,
+            limits=httpx.Limits(
+                max_connections=http_cliente.HTTP_MAX_CONEXOES,
+                max_keepalive_connections=http_cliente.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=http_cliente.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            headers={'User-Agent': 'gefi-api'},
+        )
+    return _cliente
+
+
+async def get(upstream, url, **kwargs):
+    """
+    Versão assíncrona de `http_cliente.get` (mesmo timeout, tentativas,
+    circuito, orçamento do agendador e métricas)
+    """
+    config = http_cliente.configuracao(upstream)
+    kwargs.setdefault('timeout', config['timeout'])
+    tentativas = 1 if circuito.obter(upstream).permitir() else config['tentativas']
+    agendador.cobrar_requisicao()
+    inicio = time.perf_counter()
+
+    for tentativa in range(1, tentativas + 1):
+        ultima = tentativa == tentativas
+        try:
+            response = await _obter_cliente().get(url, **kwargs)
+        except asyncio.CancelledError:
+            # Estourou o prazo do `reunir`: conta como falha para o circuito
+            http_cliente.registrar_chamada(upstream, inicio, erro='Cancelada (prazo)', tentativas=tentativa)
+            raise
+        except httpx.TransportError as e:
+            if ultima or not agendador.reservar_requisicao():
+                http_cliente.registrar_chamada(upstream, inicio, erro=f'{type(e).__name__}: {e}', tentativas=tentativa)
+                raise
+            await asyncio.sleep(http_cliente.espera_backoff(tentativa))
+            continue
+
+        if (response.status_code in http_cliente.STATUS_REPETIR and not ultima
+                and agendador.reservar_requisicao()):
+            await asyncio.sleep(http_cliente.espera_backoff(tentativa, response))
+            continue
+
+        http_cliente.registrar_chamada(upstream, inicio, status=response.status_code, tentativas=tentativa)
+        return response
+
+
+async def _com_prazo(corrotina, prazo):
+    try:
+        return await asyncio.wait_for(corrotina, prazo)
+    except Exception as e:
+        return e
+
+
+async def _reunir(corrotinas, prazo):
+    nomes = list(corrotinas)
+    resultados = await asyncio.gather(*(_com_prazo(corrotinas[nome], prazo) for nome in nomes))
+    return dict(zip(nomes, resultados))
+
+
+def reunir(corrotinas, prazo):
+    """
+    Executa `corrotinas` ({nome: corrotina}) em paralelo, cada uma com até `prazo`
+    segundos. Chamável de código síncrono. Retorna {nome: resultado}; quem falhou
+    ou estourou o prazo vem com a exceção no lugar do resultado.
+    """
+    if not corrotinas:
+        return {}
+    futuro = asyncio.run_coroutine_threadsafe(_reunir(corrotinas, prazo), _iniciar_loop())
+    try:
+        # Folga para o gather devolver as exceções de prazo
+        return futuro.result(prazo + 1)
+    except FuturoTimeout:
+        futuro.cancel()
+        return {nome: asyncio.TimeoutError() for nome in corrotinas}
+
+
+def fechar():
+    """Fecha o AsyncClient e para o loop de fundo (registrado no atexit)"""
+    global _loop, _cliente
+    with _lock:
+        if _loop is None:
+            return
+        if _cliente is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(_cliente.aclose(), _loop).result(5)
+            except Exception:
+                pass
+            _cliente = None
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
+
+
+atexit.register(fechar)
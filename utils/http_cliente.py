@@ -0,0 +1,170 @@
+"""
+Cliente HTTP compartilhado para as APIs externas (Brapi, Tesouro).
+
+Um único `httpx.Client` por processo mantém as conexões abertas (keep-alive)
+entre requisições, evitando um handshake TCP+TLS a cada cache miss. Usa HTTP/2
+quando o pacote `h2` está instalado. Cada upstream tem seu timeout, e falhas
+transitórias (erro de rede, 429, 5xx) são repetidas com backoff exponencial
+com jitter. Cada upstream tem um circuit breaker (`utils.circuito`): com o
+circuito aberto a chamada falha na hora em vez de esperar o timeout. Latência
+e erros por upstream aparecem em `GET /api/metricas` como `http_upstreams`.
+"""
+import atexit
+import os
+import random
+import threading
+import time
+from collections import deque
+from importlib.util import find_spec
+
+import httpx
+
+from utils import agendador, circuito, metricas
+
+# Timeout total (s) e tentativas por upstream
+UPSTREAMS = {
+    'brapi': {'timeout': float(os.getenv('BRAPI_TIMEOUT', '10')), 'tentativas': 3},
+    'tesouro': {'timeout': float(os.getenv('TESOURO_TIMEOUT', '15')), 'tentativas': 2},
+}
+_PADRAO = {'timeout': 10.0, 'tentativas': 2}
+
+HTTP_MAX_CONEXOES = int(os.getenv('HTTP_MAX_CONEXOES', '20'))
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', '10'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+# Backoff: base * 2^(tentativa-1), com jitter "full" e teto
+BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.2'))
+BACKOFF_MAXIMO = float(os.getenv('HTTP_BACKOFF_MAXIMO', '2'))
+
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+# Latências guardadas por upstream para o p95
+_AMOSTRAS = 200
+
+_cliente = None
+_lock = threading.Lock()
+_estatisticas = {}
+
+
+def _obter_cliente():
+    """Cria o cliente na primeira chamada (nada de I/O na importação)"""
+    global _cliente
+    if _cliente is None:
+        with _lock:
+            if _cliente is None:
+                _cliente = httpx.Client(
+                    http2=find_spec('h2') is not None,
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONEXOES,
+                        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                    ),
+                    headers={'User-Agent': 'gefi-api'},
+                )
+    return _cliente
+
+
+def fechar():
+    """Fecha as conexões do cliente compartilhado (registrado no atexit)"""
+    global _cliente
+    with _lock:
+        if _cliente is not None:
+            _cliente.close()
+            _cliente = None
+
+
+atexit.register(fechar)
+
+
+def registrar_chamada(upstream, inicio, status=None, erro=None, tentativas=1):
+    """Conta a chamada nas métricas e no circuit breaker do upstream"""
+    latencia = (time.perf_counter() - inicio) * 1000
+    falhou = erro is not None or (status is not None and (status >= 500 or status == 429))
+    circuito.obter(upstream).registrar(falhou)
+    with _lock:
+        e = _estatisticas.setdefault(upstream, {
+            'requisicoes': 0, 'erros': 0, 'repeticoes': 0, 'status': {},
+            'latencia_total_ms': 0.0, 'latencia_maxima_ms': 0.0,
+            'latencias': deque(maxlen=_AMOSTRAS), 'ultimo_erro': None,
+        })
+        e['requisicoes'] += 1
+        e['repeticoes'] += tentativas - 1
+        e['latencia_total_ms'] += latencia
+        e['latencia_maxima_ms'] = max(e['latencia_maxima_ms'], latencia)
+        e['latencias'].append(latencia)
+        if status is not None:
+            e['status'][str(status)] = e['status'].get(str(status), 0) + 1
+        if falhou:
+            e['erros'] += 1
+            e['ultimo_erro'] = erro or f'HTTP {status}'
+
+
+def _resumo():
+    with _lock:
+        resumo = {}
+        for upstream, e in _estatisticas.items():
+            latencias = sorted(e['latencias'])
+            resumo[upstream] = {
+                'requisicoes': e['requisicoes'],
+                'erros': e['erros'],
+                'repeticoes': e['repeticoes'],
+                'status': dict(e['status']),
+                'latencia_media_ms': round(e['latencia_total_ms'] / e['requisicoes'], 1),
+                'latencia_p95_ms': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))], 1),
+                'latencia_maxima_ms': round(e['latencia_maxima_ms'], 1),
+                'ultimo_erro': e['ultimo_erro'],
+            }
+        return resumo
+
+
+metricas.registrar('http_upstreams', _resumo)
+
+
+def espera_backoff(tentativa, response=None):
+    """Backoff exponencial com jitter; respeita Retry-After (em segundos) quando vier"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAXIMO)
+    return random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** (tentativa - 1)))
+
+
+def configuracao(upstream):
+    """Timeout e tentativas do upstream (padrão para nomes desconhecidos)"""
+    return UPSTREAMS.get(upstream, _PADRAO)
+
+
+def get(upstream, url, stream=False, **kwargs):
+    """
+    GET pelo cliente compartilhado com o timeout e as tentativas do `upstream`.
+    Retorna o httpx.Response da última tentativa (inclusive 4xx/5xx), levanta
+    a exceção de rede da última tentativa ou CircuitoAberto sem chamar o upstream.
+    Dentro de uma tarefa do agendador cada tentativa gasta uma requisição do
+    orçamento: sem orçamento levanta OrcamentoEsgotado (ou não repete).
+    Com `stream=True` o corpo não é lido: use `response.iter_bytes()` e feche
+    a resposta com `response.close()`.
+    """
+    config = configuracao(upstream)
+    kwargs.setdefault('timeout', config['timeout'])
+    # No meio-aberto a chamada de teste não repete
+    tentativas = 1 if circuito.obter(upstream).permitir() else config['tentativas']
+    agendador.cobrar_requisicao()
+    inicio = time.perf_counter()
+
+    for tentativa in range(1, tentativas + 1):
+        ultima = tentativa == tentativas
+        try:
+            cliente = _obter_cliente()
+            response = cliente.send(cliente.build_request('GET', url, **kwargs), stream=stream)
+        except httpx.TransportError as e:
+            if ultima or not agendador.reservar_requisicao():
+                registrar_chamada(upstream, inicio, erro=f'{type(e).__name__}: {e}', tentativas=tentativa)
+                raise
+            time.sleep(espera_backoff(tentativa))
+            continue
+
+        if response.status_code in STATUS_REPETIR and not ultima and agendador.reservar_requisicao():
+            response.close()
+            time.sleep(espera_backoff(tentativa, response))
+            continue
+
+        registrar_chamada(upstream, inicio, status=response.status_code, tentativas=tentativa)
+        return response
@@ -0,0 +1,215 @@
+"""
+Leitura em streaming de extratos bancários (CSV e OFX).
+
+Os parsers são geradores: leem o arquivo aos pedaços e produzem uma linha
+normalizada por vez, então a memória não depende do tamanho do extrato.
+Cada linha vira {linha, tipo ('entradas'|'saidas'), data, descricao, valor,
+categoria, id_externo} ou {linha, erro}.
+"""
+import codecs
+import csv
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+
+TAMANHO_BLOCO = 64 * 1024
+
+# Nomes de coluna aceitos no CSV (sem acento, minúsculos)
+_COLUNAS = {
+    'data': ('data', 'date', 'data lancamento', 'data movimento', 'dt'),
+    'descricao': ('descricao', 'historico', 'description', 'memo', 'lancamento'),
+    'valor': ('valor', 'quantia', 'amount', 'valor (r$)'),
+    'categoria': ('categoria', 'category'),
+    'tipo': ('tipo', 'type', 'natureza'),
+}
+_TIPOS_ENTRADA = ('entrada', 'receita', 'credito', 'c', 'credit')
+_TIPOS_SAIDA = ('saida', 'despesa', 'debito', 'd', 'debit')
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _ler_valor(texto):
+    """Aceita '1234.56', '1.234,56', '-1,5', 'R$ 10,00'"""
+    texto = re.sub(r'[^\d,.\-+]', '', texto or '')
+    if ',' in texto and '.' in texto:
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif ',' in texto:
+        texto = texto.replace(',', '.')
+    return float(texto)
+
+
+def _ler_data(texto):
+    texto = (texto or '').strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(texto[:10] if formato == '%Y-%m-%d' else texto, formato)
+        except ValueError:
+            continue
+    raise ValueError(f'Data inválida: {texto}')
+
+
+def _montar(numero, data, descricao, valor, categoria=None, tipo=None, id_externo=None):
+    """Normaliza uma transação; o sinal do valor define o tipo quando não informado"""
+    if tipo in _TIPOS_ENTRADA:
+        tipo = 'entradas'
+    elif tipo in _TIPOS_SAIDA:
+        tipo = 'saidas'
+    else:
+        tipo = 'saidas' if valor < 0 else 'entradas'
+
+    descricao = (descricao or '').strip()
+    if not descricao:
+        return {'linha': numero, 'erro': 'Descrição é obrigatória'}
+    if abs(valor) <= 0:
+        return {'linha': numero, 'erro': 'Valor deve ser maior que zero'}
+
+    return {
+        'linha': numero,
+        'tipo': tipo,
+        'data': data,
+        'descricao': descricao,
+        'valor': round(abs(valor), 2),
+        'categoria': (categoria or '').strip() or 'Outros',
+        'id_externo': id_externo,
+    }
+
+
+def _linhas_texto(arquivo):
+    """Decodifica o stream binário em linhas, bloco a bloco (UTF-8, com fallback latin-1)"""
+    decodificador = codecs.getincrementaldecoder('utf-8-sig')(errors='strict')
+    resto = ''
+    latin1 = False
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO)
+        if not bloco:
+            break
+        if latin1:
+            texto = bloco.decode('latin-1')
+        else:
+            try:
+                texto = decodificador.decode(bloco)
+            except UnicodeDecodeError:
+                # Extratos de bancos brasileiros costumam vir em latin-1
+                latin1 = True
+                texto = bloco.decode('latin-1')
+        resto += texto
+        *linhas, resto = resto.split('\n')
+        for linha in linhas:
+            yield linha.rstrip('\r') + '\n'
+    if resto:
+        yield resto
+
+
+def ler_csv(arquivo):
+    """Gera as transações de um CSV com cabeçalho (delimitador ';' ou ',')"""
+    linhas = _linhas_texto(arquivo)
+    cabecalho = next(linhas, '')
+    delimitador = ';' if cabecalho.count(';') >= cabecalho.count(',') else ','
+    colunas = [_normalizar(c) for c in next(csv.reader([cabecalho], delimiter=delimitador), [])]
+
+    indices = {}
+    for campo, nomes in _COLUNAS.items():
+        for posicao, coluna in enumerate(colunas):
+            if coluna in nomes:
+                indices[campo] = posicao
+                break
+
+    faltando = [campo for campo in ('data', 'descricao', 'valor') if campo not in indices]
+    if faltando:
+        raise ValueError(f'Colunas obrigatórias ausentes no CSV: {", ".join(faltando)}')
+
+    leitor = csv.reader(linhas, delimiter=delimitador)
+    for registro in leitor:
+        # line_num conta a partir da linha após o cabeçalho
+        numero = leitor.line_num + 1
+        if not any(valor.strip() for valor in registro):
+            continue
+        campos = {
+            nome: registro[posicao] if posicao < len(registro) else None
+            for nome, posicao in indices.items()
+        }
+        try:
+            yield _montar(
+                numero,
+                _ler_data(campos['data']),
+                campos['descricao'],
+                _ler_valor(campos['valor']),
+                campos.get('categoria'),
+                _normalizar(campos.get('tipo')) or None,
+            )
+        except ValueError as e:
+            yield {'linha': numero, 'erro': str(e) or 'Linha inválida'}
+
+
+def _tags_ofx(arquivo):
+    """Gera (tag, valor) do OFX (SGML ou XML) sem carregar o arquivo inteiro"""
+    resto = ''
+    for linha in _linhas_texto(arquivo):
+        resto += linha
+        partes = resto.split('<')
+        resto = partes.pop()
+        for parte in partes:
+            if '>' not in parte:
+                continue
+            tag, _, valor = parte.partition('>')
+            yield tag.strip().upper(), valor.strip()
+    if '>' in resto:
+        tag, _, valor = resto.partition('>')
+        yield tag.strip().upper(), valor.strip()
+
+
+def ler_ofx(arquivo):
+    """Gera as transações (<STMTTRN>) de um arquivo OFX"""
+    atual = None
+    numero = 0
+    for tag, valor in _tags_ofx(arquivo):
+        if tag == 'STMTTRN':
+            atual = {}
+        elif tag == '/STMTTRN' and atual is not None:
+            numero += 1
+            try:
+                data = datetime.strptime(atual.get('DTPOSTED', '')[:8], '%Y%m%d')
+                yield _montar(
+                    numero,
+                    data,
+                    atual.get('MEMO') or atual.get('NAME'),
+                    _ler_valor(atual.get('TRNAMT')),
+                    id_externo=atual.get('FITID'),
+                )
+            except ValueError:
+                yield {'linha': numero, 'erro': 'Transação OFX inválida'}
+            atual = None
+        elif atual is not None and not tag.startswith('/'):
+            atual[tag] = valor
+
+
+def chave_conteudo(data, valor, descricao):
+    """(dia, valor, descrição normalizada): compara uma linha do extrato com um lançamento manual"""
+    return data.strftime('%Y-%m-%d'), f"{float(valor):.2f}", _normalizar(descricao)
+
+
+def hash_transacao(usuario_id, transacao, ocorrencia):
+    """
+    Hash do conteúdo da transação para deduplicação entre importações.
+    `ocorrencia` diferencia transações idênticas no mesmo arquivo (dois cafés
+    iguais no mesmo dia), então reimportar o arquivo gera os mesmos hashes.
+    """
+    if transacao.get('id_externo'):
+        base = f"{usuario_id}|{transacao['tipo']}|fitid|{transacao['id_externo']}"
+    else:
+        base = '|'.join([
+            str(usuario_id),
+            transacao['tipo'],
+            transacao['data'].strftime('%Y-%m-%d'),
+            f"{transacao['valor']:.2f}",
+            _normalizar(transacao['descricao']),
+            str(ocorrencia),
+        ])
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
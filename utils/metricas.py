@@ -0,0 +1,24 @@
+"""
+Registro simples de métricas do processo.
+
+Cada componente registra uma função que devolve um dict com seus contadores;
+`GET /api/metricas` junta tudo em um único JSON.
+"""
+
+_fontes = {}
+
+
+def registrar(nome, coletor):
+    """Registra (ou substitui) a função que coleta as métricas de `nome`"""
+    _fontes[nome] = coletor
+
+
+def coletar():
+    """Executa todos os coletores registrados"""
+    metricas = {}
+    for nome, coletor in list(_fontes.items()):
+        try:
+            metricas[nome] = coletor()
+        except Exception as e:
+            metricas[nome] = {'erro': str(e)}
+    return metricas
@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import DESCENDING
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+
+def codificar_cursor(data, documento_id):
+    """Gera o token opaco do cursor a partir do último (data, _id) da página"""
+    bruto = json.dumps({'d': data.isoformat(), 'i': str(documento_id)})
+    return base64.urlsafe_b64encode(bruto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Converte o token do cursor em (data, ObjectId). Levanta ValueError se inválido"""
+    try:
+        preenchido = token + '=' * (-len(token) % 4)
+        bruto = json.loads(base64.urlsafe_b64decode(preenchido.encode('ascii')))
+        return datetime.fromisoformat(bruto['d']), ObjectId(bruto['i'])
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def normalizar_limite(limite):
+    """Aplica o limite padrão e o teto de itens por página"""
+    if not limite or limite <= 0:
+        return LIMITE_PADRAO
+    return min(limite, LIMITE_MAXIMO)
+
+
+def paginar(collection, filtro, limite, cursor=None):
+    """
+    Paginação por keyset ordenada por (data, _id) decrescentes.
+    Usa o índice (usuario_id, data, _id), então o custo por página não depende
+    do tamanho do histórico do usuário.
+    Retorna (documentos, proximo_cursor ou None).
+    """
+    filtro = dict(filtro)
+    if cursor:
+        data, documento_id = decodificar_cursor(cursor)
+        filtro['$or'] = [
+            {'data': {'$lt': data}},
+            {'data': data, '_id': {'$lt': documento_id}}
+        ]
+
+    documentos = list(
+        collection.find(filtro)
+        .sort([('data', DESCENDING), ('_id', DESCENDING)])
+        .limit(limite + 1)
+    )
+
+    proximo = None
+    if len(documentos) > limite:
+        documentos = documentos[:limite]
+        ultimo = documentos[-1]
+        proximo = codificar_cursor(ultimo['data'], ultimo['_id'])
+
+    return documentos, proximo
+
+
+def filtro_periodo(usuario_id, data_inicio=None, data_fim=None, categoria=None):
+    """Monta o filtro base do usuário com período e categoria opcionais"""
+    filtro = {'usuario_id': usuario_id}
+    if data_inicio or data_fim:
+        filtro['data'] = {}
+        if data_inicio:
+            filtro['data']['$gte'] = data_inicio
+        if data_fim:
+            filtro['data']['$lt'] = data_fim
+    if categoria:
+        filtro['categoria'] = categoria
+    return filtro
+
+
+def _ler_data(valor, campo):
+    try:
+        return datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'Parâmetro "{campo}" deve ser uma data ISO (YYYY-MM-DD)')
+
+
+def parametros_periodo(args):
+    """
+    Lê inicio, fim e categoria da query string. `fim` só com a data
+    (YYYY-MM-DD) inclui o dia inteiro, já que o filtro usa $lt.
+    Levanta ValueError com mensagem para o cliente se alguma data for inválida.
+    """
+    inicio = args.get('inicio')
+    fim = (args.get('fim') or '').strip()
+    categoria = (args.get('categoria') or '').strip()
+
+    data_fim = _ler_data(fim, 'fim') if fim else None
+    if data_fim and len(fim) == 10:
+        data_fim += timedelta(days=1)
+
+    return {
+        'data_inicio': _ler_data(inicio, 'inicio') if inicio else None,
+        'data_fim': data_fim,
+        'categoria': categoria or None,
+    }
+
+
+def parametros_listagem(args):
+    """
+    Lê limite, cursor, inicio, fim e categoria da query string.
+    Levanta ValueError com mensagem para o cliente se algum for inválido.
+    """
+    try:
+        limite = int(args.get('limite', LIMITE_PADRAO))
+    except ValueError:
+        raise ValueError('Parâmetro "limite" deve ser um número inteiro')
+
+    cursor = args.get('cursor') or None
+    if cursor:
+        decodificar_cursor(cursor)
+
+    return {
+        'limite': normalizar_limite(limite),
+        'cursor': cursor,
+        **parametros_periodo(args),
+    }
@@ -0,0 +1,96 @@
+"""
+Projeção de fluxo de caixa.
+
+Combina a média e a tendência linear mensal de cada categoria (entradas e
+saídas não recorrentes) com as ocorrências das saídas recorrentes na janela
+projetada. Todas as categorias são ajustadas de uma vez com numpy.
+"""
+import numpy as np
+import pandas as pd
+
+# Meses completos de histórico usados no ajuste
+JANELA_HISTORICO = 24
+# Abaixo disso a tendência é ignorada e só a média é usada
+MINIMO_MESES_TENDENCIA = 3
+
+
+def _projetar_colunas(matriz, meses):
+    """
+    Ajusta média + inclinação por coluna (mínimos quadrados) e projeta `meses` à frente.
+    `matriz` tem um mês por linha e uma categoria por coluna.
+    """
+    n = matriz.shape[0]
+    medias = matriz.mean(axis=0)
+
+    if n >= MINIMO_MESES_TENDENCIA:
+        x = np.arange(n, dtype=float)
+        x_centro = x - x.mean()
+        inclinacoes = (x_centro[:, None] * (matriz - medias)).sum(axis=0) / (x_centro ** 2).sum()
+    else:
+        inclinacoes = np.zeros(matriz.shape[1])
+
+    x_futuro = np.arange(n, n + meses, dtype=float) - (n - 1) / 2
+    projecao = medias + inclinacoes * x_futuro[:, None]
+    return np.clip(projecao, 0, None)
+
+
+def projetar(historico, recorrencias, inicio_previsao, meses, saldo_inicial=0.0):
+    """
+    historico: [{tipo, ano, mes, categoria, total}] de meses completos
+    recorrencias: [(data, saida)] das saídas recorrentes na janela projetada
+    inicio_previsao: primeiro dia do primeiro mês projetado
+    Retorna arrays paralelos por mês e o detalhamento por categoria.
+    """
+    periodos_futuros = pd.period_range(pd.Period(inicio_previsao, freq='M'), periods=meses, freq='M')
+    por_categoria = {}
+    entradas = np.zeros(meses)
+    saidas = np.zeros(meses)
+
+    if historico:
+        df = pd.DataFrame(historico)
+        df['periodo'] = pd.PeriodIndex(
+            pd.to_datetime({'year': df['ano'], 'month': df['mes'], 'day': 1}), freq='M'
+        )
+        ultimo = periodos_futuros[0] - 1
+        primeiro = max(df['periodo'].min(), ultimo - (JANELA_HISTORICO - 1))
+
+        if primeiro <= ultimo:
+            tabela = (
+                df[df['periodo'] >= primeiro]
+                .pivot_table(index='periodo', columns=['tipo', 'categoria'], values='total',
+                             aggfunc='sum', fill_value=0.0)
+                .reindex(pd.period_range(primeiro, ultimo, freq='M'), fill_value=0.0)
+            )
+            projecao = _projetar_colunas(tabela.to_numpy(dtype=float), meses)
+
+            for indice, (tipo, categoria) in enumerate(tabela.columns):
+                serie = projecao[:, indice]
+                if tipo == 'entradas':
+                    entradas += serie
+                else:
+                    saidas += serie
+                por_categoria.setdefault(tipo, {})[categoria] = serie
+
+    recorrentes = np.zeros(meses)
+    if recorrencias:
+        posicoes = np.array([
+            (data.year - inicio_previsao.year) * 12 + data.month - inicio_previsao.month
+            for data, _ in recorrencias
+        ])
+        valores = np.array([float(saida.get('valor', 0)) for _, saida in recorrencias])
+        dentro = (posicoes >= 0) & (posicoes < meses)
+        np.add.at(recorrentes, posicoes[dentro], valores[dentro])
+
+    saldo = entradas - saidas - recorrentes
+    return {
+        'meses': [str(periodo) for periodo in periodos_futuros],
+        'entradas': np.round(entradas, 2).tolist(),
+        'saidas': np.round(saidas, 2).tolist(),
+        'saidas_recorrentes': np.round(recorrentes, 2).tolist(),
+        'saldo': np.round(saldo, 2).tolist(),
+        'saldo_acumulado': np.round(saldo_inicial + np.cumsum(saldo), 2).tolist(),
+        'por_categoria': {
+            tipo: {categoria: np.round(serie, 2).tolist() for categoria, serie in categorias.items()}
+            for tipo, categorias in por_categoria.items()
+        }
+    }
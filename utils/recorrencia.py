@@ -0,0 +1,110 @@
+"""
+Expansão preguiçosa de saídas recorrentes.
+
+Uma saída recorrente guarda apenas a regra (data_primeira_recorrencia,
+frequencia e data_fim_recorrencia opcional); as ocorrências são geradas sob
+demanda por geradores, então nunca materializamos séries infinitas.
+"""
+import calendar
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice, takewhile
+from utils.cache_usuario import CacheUsuario
+
+FREQUENCIAS = ('mensal', 'semanal', 'anual')
+FREQUENCIA_PADRAO = 'mensal'
+
+
+def _somar_meses(data, meses):
+    """Soma meses preservando o dia (limitado ao último dia do mês: 31/01 -> 29/02)"""
+    total = data.month - 1 + meses
+    ano, mes = data.year + total // 12, total % 12 + 1
+    dia = min(data.day, calendar.monthrange(ano, mes)[1])
+    return data.replace(year=ano, month=mes, day=dia)
+
+
+def _n_esima(inicio, frequencia, n):
+    if frequencia == 'semanal':
+        return inicio + timedelta(weeks=n)
+    if frequencia == 'anual':
+        return _somar_meses(inicio, 12 * n)
+    return _somar_meses(inicio, n)
+
+
+def _indice_inicial(inicio, frequencia, a_partir_de):
+    """Índice da primeira ocorrência >= a_partir_de, sem percorrer as anteriores"""
+    if a_partir_de <= inicio:
+        return 0
+    if frequencia == 'semanal':
+        n = (a_partir_de - inicio).days // 7
+    elif frequencia == 'anual':
+        n = a_partir_de.year - inicio.year
+    else:
+        n = (a_partir_de.year - inicio.year) * 12 + a_partir_de.month - inicio.month
+    n = max(n - 1, 0)
+    while _n_esima(inicio, frequencia, n) < a_partir_de:
+        n += 1
+    return n
+
+
+def ocorrencias(saida, a_partir_de=None):
+    """Gera as datas de ocorrência da saída, em ordem, a partir de `a_partir_de`"""
+    inicio = saida.get('data_primeira_recorrencia') or saida.get('data')
+    if not isinstance(inicio, datetime):
+        return
+
+    frequencia = saida.get('frequencia') or FREQUENCIA_PADRAO
+    data_fim = saida.get('data_fim_recorrencia')
+
+    if not saida.get('eh_recorrente'):
+        if (a_partir_de is None or inicio >= a_partir_de) and (data_fim is None or inicio <= data_fim):
+            yield inicio
+        return
+
+    n = _indice_inicial(inicio, frequencia, a_partir_de) if a_partir_de else 0
+    while True:
+        data = _n_esima(inicio, frequencia, n)
+        if data_fim and data > data_fim:
+            return
+        yield data
+        n += 1
+
+
+def _rotular(saida, indice, a_partir_de):
+    for data in ocorrencias(saida, a_partir_de):
+        yield data, indice, saida
+
+
+def _mesclar(saidas, a_partir_de):
+    """Mescla as ocorrências de várias saídas em uma única sequência ordenada por data"""
+    geradores = [_rotular(saida, indice, a_partir_de) for indice, saida in enumerate(saidas)]
+    return heapq.merge(*geradores, key=lambda item: (item[0], item[1]))
+
+
+def proximas(saidas, quantidade, a_partir_de):
+    """As próximas `quantidade` ocorrências: lista de (data, saida)"""
+    return [(data, saida) for data, _, saida in islice(_mesclar(saidas, a_partir_de), quantidade)]
+
+
+def no_intervalo(saidas, inicio, fim):
+    """Todas as ocorrências em [inicio, fim): lista de (data, saida)"""
+    return [
+        (data, saida)
+        for data, _, saida in takewhile(lambda item: item[0] < fim, _mesclar(saidas, inicio))
+    ]
+
+
+# Regras recorrentes e consultas já respondidas, por usuário.
+# Invalidado pelo SaidaModel a cada escrita do usuário (em qualquer worker com
+# CACHE_BACKEND=mongodb; ver utils.cache_usuario).
+_cache = CacheUsuario(depende_de=('saidas',))
+
+
+def consultar(usuario_id, carregar, chave, calcular):
+    """
+    Resolve `calcular(saidas)` usando o cache do usuário.
+    `carregar(usuario_id)` busca as saídas recorrentes quando não estão em cache;
+    `chave` identifica a consulta (use datas truncadas para que ela se repita).
+    """
+    saidas = _cache.obter(usuario_id, 'saidas', lambda: carregar(usuario_id))
+    return _cache.obter(usuario_id, chave, lambda: calcular(saidas))
@@ -0,0 +1,133 @@
+"""
+Leitura e índice dos títulos do Tesouro Direto.
+
+- `itens_da_lista(partes)` lê a lista `"data": [...]` da resposta da API aos
+  pedaços, à medida que os bytes chegam, sem montar o JSON inteiro em memória
+  (só o título que está sendo lido fica no buffer).
+- `IndiceTesouro` organiza os títulos por tipo (Selic, IPCA+, Prefixado...) e
+  vencimento, para filtrar com busca binária em vez de percorrer a lista.
+"""
+import codecs
+import json
+import re
+from bisect import bisect_right
+from datetime import date, datetime
+
+# chave normalizada -> nome exibido
+TIPOS = {
+    'selic': 'Selic',
+    'ipca': 'IPCA+',
+    'prefixado': 'Prefixado',
+    'renda': 'Renda+',
+    'educa': 'Educa+',
+}
+
+_INICIO_LISTA = re.compile(r'"data"\s*:\s*\[')
+# Guardado entre pedaços enquanto a lista não começa (caso o marcador venha partido)
+_CAUDA = 32
+
+
+def itens_da_lista(partes):
+    """
+    Gera os objetos da primeira lista `"data": [...]` de um JSON recebido em
+    `partes` (iterável de bytes). Os itens precisam ser objetos ou listas.
+    Levanta ValueError se o conteúdo terminar no meio da lista.
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    json_decoder = json.JSONDecoder()
+    buffer = ''
+    dentro = False
+
+    for parte in partes:
+        buffer += decodificador.decode(parte)
+        if not dentro:
+            inicio = _INICIO_LISTA.search(buffer)
+            if inicio is None:
+                buffer = buffer[-_CAUDA:]
+                continue
+            buffer = buffer[inicio.end():]
+            dentro = True
+
+        posicao = 0
+        while True:
+            while posicao < len(buffer) and buffer[posicao] in ' \t\r\n,':
+                posicao += 1
+            if posicao >= len(buffer):
+                break
+            if buffer[posicao] == ']':
+                return
+            try:
+                item, posicao = json_decoder.raw_decode(buffer, posicao)
+            except json.JSONDecodeError:
+                # Item ainda incompleto: espera o próximo pedaço
+                break
+            yield item
+        buffer = buffer[posicao:]
+
+    if dentro:
+        raise ValueError('Resposta do Tesouro terminou no meio da lista de títulos')
+
+
+def classificar(nome):
+    """Chave do tipo do título pelo nome ('Tesouro IPCA+ 2035' -> 'ipca') ou None"""
+    nome = (nome or '').lower()
+    for chave in ('selic', 'ipca', 'prefixado', 'renda', 'educa'):
+        if chave in nome:
+            return chave
+    return None
+
+
+def normalizar_tipo(valor):
+    """Parâmetro `tipo` da query ('IPCA+', 'selic'...) -> chave de TIPOS ou None"""
+    chave = (valor or '').strip().lower().replace('+', '')
+    return chave if chave in TIPOS else None
+
+
+def data_vencimento(valor):
+    """Vencimento em 'YYYY-MM-DD[...]' ou 'DD/MM/YYYY' -> date (None se não der)"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or '').strip()
+    for formato, tamanho in (('%Y-%m-%d', 10), ('%d/%m/%Y', 10)):
+        try:
+            return datetime.strptime(texto[:tamanho], formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+class IndiceTesouro:
+    """Títulos agrupados por tipo e ordenados por vencimento"""
+
+    def __init__(self, titulos):
+        self.titulos = titulos
+        grupos = {}
+        for titulo in titulos:
+            vencimento = data_vencimento(titulo.get('vencimento'))
+            tipo = classificar(titulo.get('nome') or titulo.get('codigo'))
+            for chave in {None, tipo}:
+                grupos.setdefault(chave, []).append((vencimento, titulo))
+
+        # chave -> (vencimentos ordenados, títulos na mesma ordem, títulos sem data)
+        self._grupos = {}
+        for chave, itens in grupos.items():
+            com_data = sorted((item for item in itens if item[0] is not None), key=lambda item: item[0])
+            self._grupos[chave] = (
+                [vencimento for vencimento, _ in com_data],
+                [titulo for _, titulo in com_data],
+                [titulo for vencimento, titulo in itens if vencimento is None],
+            )
+
+    def filtrar(self, tipo=None, vencimento_ate=None):
+        """
+        Títulos do `tipo` (chave de TIPOS) com vencimento até `vencimento_ate`
+        (date). Sem filtros devolve a lista original.
+        """
+        if tipo is None and vencimento_ate is None:
+            return self.titulos
+        vencimentos, titulos, sem_data = self._grupos.get(tipo, ([], [], []))
+        if vencimento_ate is None:
+            return titulos + sem_data
+        return titulos[:bisect_right(vencimentos, vencimento_ate)]
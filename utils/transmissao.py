@@ -0,0 +1,175 @@
+"""
+Transmissão de cotações ao vivo (server-sent events).
+
+Um `Publicador` por processo reparte cada cotação nova entre todas as
+assinaturas que seguem aquele ticker:
+
+- `publicar(cotacoes)` é chamado por quem busca na Brapi (prefetch, renovação
+  do cache); só preços que mudaram são repassados.
+- Enquanto houver assinaturas, uma thread pede a cada SSE_INTERVALO segundos a
+  união dos tickers assinados pelo cache, então uma busca atende todo mundo.
+- Backpressure: cada assinatura guarda só a última cotação pendente de cada
+  ticker. Um cliente lento recebe o preço mais recente, não a fila inteira, e
+  quem publica nunca espera por ele.
+- Limites: no máximo SSE_MAX_CONEXOES streams por processo (cada um ocupa uma
+  thread do servidor), encerrados após SSE_TEMPO_OCIOSO segundos sem cotação
+  nova ou SSE_DURACAO_MAXIMA segundos de conexão; o EventSource do navegador
+  reconecta sozinho.
+
+Contadores em `GET /api/metricas` como `transmissao`.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SSE_MAX_CONEXOES = int(os.getenv('SSE_MAX_CONEXOES', '50'))
+SSE_MAX_TICKERS = int(os.getenv('SSE_MAX_TICKERS', '20'))
+SSE_INTERVALO = float(os.getenv('SSE_INTERVALO', '15'))
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', '20'))
+SSE_TEMPO_OCIOSO = float(os.getenv('SSE_TEMPO_OCIOSO', '300'))
+SSE_DURACAO_MAXIMA = float(os.getenv('SSE_DURACAO_MAXIMA', '1800'))
+
+
+class LimiteAssinaturas(Exception):
+    """Já há SSE_MAX_CONEXOES streams abertos neste processo"""
+
+
+def formatar_evento(evento, dados, id=None):
+    """Mensagem SSE (`event`, `id` opcional e `data` em JSON)"""
+    linhas = [f'event: {evento}']
+    if id is not None:
+        linhas.append(f'id: {id}')
+    linhas.append(f'data: {json.dumps(dados, ensure_ascii=False, default=str)}')
+    return '\n'.join(linhas) + '\n\n'
+
+
+class Assinatura:
+
+    def __init__(self, tickers):
+        self.tickers = frozenset(tickers)
+        self.encerrada = False
+        self._pendentes = OrderedDict()  # ticker -> última cotação ainda não entregue
+        self._condicao = threading.Condition()
+
+    def _entregar(self, ticker, quote):
+        """Guarda a cotação; devolve True se substituiu uma não entregue"""
+        with self._condicao:
+            substituiu = ticker in self._pendentes
+            self._pendentes.pop(ticker, None)
+            self._pendentes[ticker] = quote
+            self._condicao.notify()
+        return substituiu
+
+    def _encerrar(self):
+        with self._condicao:
+            self.encerrada = True
+            self._condicao.notify()
+
+    def aguardar(self, timeout):
+        """Cotações pendentes ({ticker: cotação}); vazio se nada chegou em `timeout`"""
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._pendentes or self.encerrada, timeout)
+            pendentes, self._pendentes = self._pendentes, OrderedDict()
+        return pendentes
+
+
+class Publicador:
+
+    def __init__(self, nome, buscar, intervalo=SSE_INTERVALO, max_assinaturas=SSE_MAX_CONEXOES):
+        """`buscar(tickers)` devolve {ticker: cotação} (normalmente pelo cache)"""
+        self.nome = nome
+        self.buscar = buscar
+        self.intervalo = intervalo
+        self.max_assinaturas = max_assinaturas
+        self._assinaturas = {}  # ticker -> set de Assinatura
+        self._total = 0
+        self._precos = {}  # ticker -> último preço publicado
+        self._thread = None
+        self._lock = threading.Lock()
+        self._estatisticas = {
+            'publicadas': 0, 'substituidas': 0, 'recusadas': 0, 'buscas': 0, 'erros_busca': 0,
+        }
+
+    def assinar(self, tickers):
+        """Nova Assinatura para `tickers` ou LimiteAssinaturas"""
+        assinatura = Assinatura(tickers)
+        with self._lock:
+            if self._total >= self.max_assinaturas:
+                self._estatisticas['recusadas'] += 1
+                raise LimiteAssinaturas(f'Limite de {self.max_assinaturas} streams atingido')
+            self._total += 1
+            for ticker in assinatura.tickers:
+                self._assinaturas.setdefault(ticker, set()).add(assinatura)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._bombear, name=f'transmissao-{self.nome}', daemon=True)
+                self._thread.start()
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            if assinatura.encerrada:
+                return
+            self._total -= 1
+            for ticker in assinatura.tickers:
+                assinantes = self._assinaturas.get(ticker)
+                if assinantes is not None:
+                    assinantes.discard(assinatura)
+                    if not assinantes:
+                        del self._assinaturas[ticker]
+        assinatura._encerrar()
+
+    def tickers(self):
+        with self._lock:
+            return list(self._assinaturas)
+
+    def publicar(self, cotacoes):
+        """Repassa às assinaturas as cotações cujo preço mudou desde a última publicação"""
+        with self._lock:
+            entregas = []
+            for ticker, quote in cotacoes.items():
+                preco = quote.get('preco')
+                if preco is None or self._precos.get(ticker) == preco:
+                    continue
+                assinantes = self._assinaturas.get(ticker)
+                if assinantes:
+                    # Só guarda o preço de quem é seguido: o resto não precisa de comparação
+                    self._precos[ticker] = preco
+                    entregas.extend((assinatura, ticker, quote) for assinatura in assinantes)
+            for ticker in [t for t in self._precos if t not in self._assinaturas]:
+                del self._precos[ticker]
+
+        substituidas = sum(assinatura._entregar(ticker, quote) for assinatura, ticker, quote in entregas)
+        with self._lock:
+            self._estatisticas['publicadas'] += len(entregas)
+            self._estatisticas['substituidas'] += substituidas
+
+    def _bombear(self):
+        """Renova os tickers assinados enquanto houver assinaturas"""
+        while True:
+            time.sleep(self.intervalo)
+            tickers = self.tickers()
+            if not tickers:
+                with self._lock:
+                    if not self._assinaturas:
+                        self._thread = None
+                        return
+                continue
+            try:
+                self.publicar(self.buscar(tickers))
+                with self._lock:
+                    self._estatisticas['buscas'] += 1
+            except Exception as e:
+                print(f'Erro ao renovar cotações da transmissão: {e}')
+                with self._lock:
+                    self._estatisticas['erros_busca'] += 1
+
+    def resumo(self):
+        with self._lock:
+            return {
+                'assinaturas': self._total,
+                'tickers': len(self._assinaturas),
+                'max_assinaturas': self.max_assinaturas,
+                **self._estatisticas,
+            }
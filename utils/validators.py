@@ -1,4 +1,5 @@
 import re
+from datetime import datetime
 
 def validar_email(email):
     """Valida formato de email"""
@@ -12,4 +13,15 @@ def validar_cpf(cpf):
 
 def validar_senha(senha):
     """Valida se a senha tem no mínimo 6 caracteres"""
-    return len(senha) >= 6
\ No newline at end of file
+    return len(senha) >= 6
+
+def validar_valor(valor):
+    """Valida se o valor é numérico e maior que zero"""
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor > 0
+
+def converter_data(valor):
+    """Converte data ISO (aceita sufixo 'Z') em datetime; retorna None se inválida"""
+    try:
+        return datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None